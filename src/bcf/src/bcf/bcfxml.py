@@ -19,30 +19,39 @@
 
 import os.path
 import zipfile
-import tempfile
 from xml.dom import minidom
 
 
 def load(filepath):
-    filepath = extract_project(filepath)
-    if os.path.isfile(os.path.join(filepath, "bcf.version")):
-        version_path = os.path.join(filepath, "bcf.version")
-        version_id = get_version(version_path)
-        # TODO: we actually coded it for 2.1, let's check the difference between 2.0 and 2.1
-        if version_id == "2.1" or version_id == "2.0":
-            from bcf.v2.bcfxml import BcfXml
-
-            bcfxml = BcfXml()
-            bcfxml.filepath = filepath
-            return bcfxml
-        elif version_id == "3.0":
-            from bcf.v3.bcfxml import BcfXml
-
-            bcfxml = BcfXml()
-            bcfxml.filepath = filepath
-            return bcfxml
-        else:
-            raise Exception(f"Version {version_id} not supported.")
+    if not filepath:
+        return
+    # The archive is read in place, rather than extracted, so that large archives load quickly.
+    # It is then kept open by the loaded BcfXml, so it is only closed here if it is not loaded.
+    archive = zipfile.ZipFile(filepath)
+    bcfxml = None
+    try:
+        if "bcf.version" in archive.namelist():
+            with archive.open("bcf.version") as version_file:
+                version_id = get_version(version_file)
+            # TODO: we actually coded it for 2.1, let's check the difference between 2.0 and 2.1
+            if version_id == "2.1" or version_id == "2.0":
+                from bcf.v2.bcfxml import BcfXml
+
+                bcfxml = BcfXml()
+                bcfxml.load_archive(archive)
+            elif version_id == "3.0":
+                from bcf.v3.bcfxml import BcfXml
+
+                bcfxml = BcfXml()
+                bcfxml.load_archive(archive)
+            else:
+                raise Exception(f"Version {version_id} not supported.")
+    except:
+        archive.close()
+        raise
+    if bcfxml is None:
+        archive.close()
+    return bcfxml
 
 
 def get_version(version_path):
@@ -50,12 +59,3 @@ def get_version(version_path):
     version_el = xmlparse.getElementsByTagName("Version")[0]
     version = version_el.getAttribute("VersionId")
     return version
-
-
-def extract_project(filepath):
-    if not filepath:
-        return
-    zip_file = zipfile.ZipFile(filepath)
-    filepath = tempfile.mkdtemp()
-    zip_file.extractall(filepath)
-    return filepath
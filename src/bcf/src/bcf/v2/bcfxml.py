@@ -27,6 +27,7 @@ import bcf.v2.data
 from datetime import datetime
 from xml.dom import minidom
 from xmlschema import XMLSchema
+from functools import lru_cache
 from contextlib import contextmanager
 from shutil import copyfile
 
@@ -34,6 +35,12 @@ from shutil import copyfile
 cwd = os.path.dirname(os.path.realpath(__file__))
 
 
+@lru_cache(maxsize=None)
+def get_schema(xsd):
+    # Compiling a schema is far slower than validating a document, so each is only compiled once per process
+    return XMLSchema(os.path.join(cwd, "xsd", xsd))
+
+
 @contextmanager
 def cd(newdir):
     prevdir = os.getcwd()
@@ -44,6 +51,37 @@ def cd(newdir):
         os.chdir(prevdir)
 
 
+class TopicHandler(bcf.v2.data.Topic):
+    """A topic which is parsed from its markup when its attributes are first read
+
+    Listing topics therefore reads no markup. The header, comments and
+    viewpoints are each parsed on their own first access, as reading the
+    header and viewpoints also extracts the topic's files.
+    """
+
+    def __init__(self, bcfxml, guid):
+        # The attributes of the topic are deliberately left unset, so that reading them calls __getattr__
+        self.bcfxml = bcfxml
+        self.guid = guid
+        self.is_loaded = False
+
+    def __getattr__(self, name):
+        if name.startswith("_") or "bcfxml" not in self.__dict__:
+            raise AttributeError(name)
+        if name == "header":
+            self.header = self.bcfxml.get_header(self.guid)
+        elif name == "comments":
+            self.comments = self.bcfxml.get_comments(self.guid)
+        elif name == "viewpoints":
+            self.viewpoints = self.bcfxml.get_viewpoints(self.guid)
+        elif not self.is_loaded:
+            self.is_loaded = True
+            self.bcfxml.load_topic(self)
+        if name not in self.__dict__:
+            raise AttributeError(name)
+        return self.__dict__[name]
+
+
 class BcfXml:
     def __init__(self):
         self.filepath = None
@@ -52,6 +90,14 @@ class BcfXml:
         self.project = bcf.v2.data.Project()
         self.version = "2.1"
         self.topics = {}
+        self.archive = None
+        # Topic guid to the names of its files in the archive
+        self.archive_topics = {}
+        # Topics whose files were extracted to the working directory, which then takes precedence over the archive
+        self.extracted_topics = set()
+        self.deleted_topics = set()
+        # Topic guid to its parsed markup
+        self.markups = {}
 
     def new_project(self):
         self.project.project_id = str(uuid.uuid4())
@@ -63,6 +109,48 @@ class BcfXml:
         self.edit_project()
         self.edit_version()
 
+    def load_archive(self, archive):
+        """Loads a BCF archive without extracting it
+
+        Only the project and version files are extracted up front. Markups
+        and viewpoints are parsed straight from the archive when accessed,
+        and the remaining files of a topic, such as snapshots, are only
+        extracted to the working directory when the topic is opened or
+        modified.
+
+        :param archive: The opened BCF zip archive
+        :type archive: zipfile.ZipFile
+        """
+        if self.filepath:
+            self.close_project()
+        self.topics = {}
+        self.filepath = tempfile.mkdtemp()
+        self.archive = archive
+        self.extracted_topics = set()
+        self.deleted_topics = set()
+        self.markups = {}
+        self.index_archive()
+        for name in self.archive.namelist():
+            if "/" not in name:
+                self.archive.extract(name, self.filepath)
+
+    def index_archive(self):
+        self.archive_topics = {}
+        for name in self.archive.namelist():
+            guid, separator, filename = name.partition("/")
+            if separator and filename:
+                self.archive_topics.setdefault(guid, []).append(name)
+
+    def extract_topic(self, guid):
+        if guid in self.extracted_topics:
+            return
+        self.extracted_topics.add(guid)
+        if guid in self.deleted_topics:
+            return
+        os.makedirs(os.path.join(self.filepath, guid), exist_ok=True)
+        for name in self.archive_topics.get(guid, []):
+            self.archive.extract(name, self.filepath)
+
     def get_project(self, filepath=None):
         if not filepath:
             return self.project
@@ -84,12 +172,27 @@ class BcfXml:
             f.write(self.document.toprettyxml(encoding="utf-8"))
 
     def save_project(self, filepath):
-        with cd(self.filepath):
-            zip_file = zipfile.ZipFile(filepath, "w", zipfile.ZIP_DEFLATED)
-            for root, dirs, files in os.walk("./"):
-                for file in files:
-                    zip_file.write(os.path.join(root, file))
-            zip_file.close()
+        # The loaded archive may be overwritten, so the new archive is written alongside it first
+        fd, temp_filepath = tempfile.mkstemp(suffix=".bcf", dir=os.path.dirname(os.path.abspath(filepath)))
+        os.close(fd)
+        with zipfile.ZipFile(temp_filepath, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            # Topics which were never extracted are copied straight from the loaded archive
+            for guid, names in self.archive_topics.items():
+                if guid in self.extracted_topics or guid in self.deleted_topics:
+                    continue
+                for name in names:
+                    zip_file.writestr(self.archive.getinfo(name), self.archive.read(name))
+            with cd(self.filepath):
+                for root, dirs, files in os.walk("./"):
+                    for file in files:
+                        zip_file.write(os.path.join(root, file))
+        if self.archive and os.path.abspath(self.archive.filename) == os.path.abspath(filepath):
+            self.archive.close()
+            os.replace(temp_filepath, filepath)
+            self.archive = zipfile.ZipFile(filepath)
+            self.index_archive()
+        else:
+            os.replace(temp_filepath, filepath)
 
     def get_version(self):
         data = self._read_xml("bcf.version", "version.xsd")
@@ -105,23 +208,38 @@ class BcfXml:
 
     def get_topics(self):
         self.topics = {}
-        topics = []
-        subdirs = []
-        for (dirpath, dirnames, filenames) in os.walk(self.filepath):
-            subdirs = dirnames
-            break
-        for subdir in subdirs:
+        for guid in self.get_topic_guids():
+            self.topics[guid] = self.get_topic(guid)
+        return self.topics
+
+    def get_topic_guids(self):
+        guids = set()
+        for guid, names in self.archive_topics.items():
+            if guid in self.extracted_topics or guid in self.deleted_topics:
+                continue
+            if guid + "/markup.bcf" in names:
+                guids.add(guid)
+        for subdir in next(os.walk(self.filepath))[1]:
+            if os.path.exists(os.path.join(self.filepath, subdir, "markup.bcf")):
+                guids.add(subdir)
+        results = []
+        for guid in sorted(guids):
             try:
-                uuid.UUID(subdir)
+                uuid.UUID(guid)
             except ValueError:
                 continue
-            if not os.path.exists(os.path.join(self.filepath, subdir, "markup.bcf")):
-                continue
-            self.topics[subdir] = self.get_topic(subdir)
-        return self.topics
+            results.append(guid)
+        return results
+
+    def get_markup(self, guid):
+        data = self.markups.get(guid)
+        if data is None:
+            data = self.markups[guid] = self._read_xml(os.path.join(guid, "markup.bcf"), "markup.xsd")
+        return data
 
     def get_header(self, guid):
-        data = self._read_xml(os.path.join(guid, "markup.bcf"), "markup.xsd")
+        self.extract_topic(guid)
+        data = self.get_markup(guid)
         if "Header" not in data:
             return
         header = bcf.v2.data.Header()
@@ -143,11 +261,21 @@ class BcfXml:
         return header
 
     def get_topic(self, guid):
-        if guid in self.topics:
-            return self.topics[guid]
-        data = self._read_xml(os.path.join(guid, "markup.bcf"), "markup.xsd")
+        if guid not in self.topics:
+            self.topics[guid] = TopicHandler(self, guid)
+        return self.topics[guid]
+
+    def load_topic(self, handler):
+        """Reads the markup of a topic into its handler
+
+        Attributes already set on the handler are kept, and the header,
+        comments and viewpoints are left to be loaded separately.
+
+        :param handler: The topic to load
+        :type handler: TopicHandler
+        """
+        data = self.get_markup(handler.guid)
         topic = bcf.v2.data.Topic()
-        self.topics[guid] = topic
 
         mandatory_keys = {
             "guid": "@Guid",
@@ -208,7 +336,9 @@ class BcfXml:
                 related_topic = bcf.v2.data.RelatedTopic()
                 related_topic.guid = item["@Guid"]
                 topic.related_topics.append(related_topic)
-        return topic
+        for key, value in vars(topic).items():
+            if key not in vars(handler) and key not in ("header", "comments", "viewpoints"):
+                setattr(handler, key, value)
 
     def add_topic(self, topic=None):
         if topic is None:
@@ -218,10 +348,13 @@ class BcfXml:
         if not topic.title:
             topic.title = "New Topic"
         os.mkdir(os.path.join(self.filepath, topic.guid))
+        self.extracted_topics.add(topic.guid)
+        self.deleted_topics.discard(topic.guid)
         self.edit_topic(topic)
         return topic
 
     def edit_topic(self, topic):
+        self.extract_topic(topic.guid)
         if not topic.creation_date:
             topic.creation_date = datetime.utcnow().isoformat()
             topic.creation_author = self.author
@@ -295,6 +428,7 @@ class BcfXml:
 
         with open(os.path.join(self.filepath, topic.guid, "markup.bcf"), "wb") as f:
             f.write(self.document.toprettyxml(encoding="utf-8"))
+        self.markups.pop(topic.guid, None)
 
     def write_header(self, header, root):
         if not header or not header.files:
@@ -360,7 +494,10 @@ class BcfXml:
     def delete_topic(self, guid):
         if guid in self.topics:
             del self.topics[guid]
-        shutil.rmtree(os.path.join(self.filepath, guid))
+        self.markups.pop(guid, None)
+        self.deleted_topics.add(guid)
+        self.extracted_topics.discard(guid)
+        shutil.rmtree(os.path.join(self.filepath, guid), ignore_errors=True)
 
     def write_viewpoints(self, viewpoints, root, topic):
         for viewpoint in viewpoints.values():
@@ -495,6 +632,7 @@ class BcfXml:
                 self._create_element(component_el, key, text=value)
 
     def add_viewpoint(self, topic, viewpoint=None):
+        self.extract_topic(topic.guid)
         if not viewpoint:
             viewpoint = bcf.v2.data.Viewpoint()
         if not viewpoint.guid:
@@ -512,6 +650,7 @@ class BcfXml:
         self.edit_topic(topic)
 
     def delete_viewpoint(self, guid, topic):
+        self.extract_topic(topic.guid)
         if guid not in topic.viewpoints:
             return
         viewpoint = topic.viewpoints[guid]
@@ -533,6 +672,7 @@ class BcfXml:
         self.edit_topic(topic)
 
     def delete_file(self, topic, index):
+        self.extract_topic(topic.guid)
         if not topic.header:
             return
         f = topic.header.files.pop(index)
@@ -542,6 +682,7 @@ class BcfXml:
         self.edit_topic(topic)
 
     def delete_bim_snippet(self, topic):
+        self.extract_topic(topic.guid)
         if not topic.bim_snippet:
             return
         if topic.bim_snippet.reference and not topic.bim_snippet.is_external:
@@ -552,6 +693,7 @@ class BcfXml:
         self.edit_topic(topic)
 
     def delete_document_reference(self, topic, index):
+        self.extract_topic(topic.guid)
         document_reference = topic.document_references[index]
         if document_reference.referenced_document and not document_reference.is_external:
             filepath = os.path.join(self.filepath, topic.guid, document_reference.referenced_document)
@@ -561,6 +703,7 @@ class BcfXml:
         self.edit_topic(topic)
 
     def add_document_reference(self, topic, document_reference):
+        self.extract_topic(topic.guid)
         if os.path.exists(document_reference.referenced_document):
             topic_filepath = os.path.join(self.filepath, topic.guid)
             filename = os.path.basename(document_reference.referenced_document)
@@ -575,6 +718,7 @@ class BcfXml:
         self.edit_topic(topic)
 
     def add_bim_snippet(self, topic, bim_snippet):
+        self.extract_topic(topic.guid)
         if topic.bim_snippet:
             self.delete_bim_snippet(topic)
         if os.path.exists(bim_snippet.reference):
@@ -589,6 +733,7 @@ class BcfXml:
         self.edit_topic(topic)
 
     def add_file(self, topic, header_file):
+        self.extract_topic(topic.guid)
         if os.path.exists(header_file.reference):
             topic_filepath = os.path.join(self.filepath, topic.guid)
             header_file.filename = os.path.basename(header_file.reference)
@@ -603,7 +748,7 @@ class BcfXml:
 
     def get_comments(self, guid):
         comments = {}
-        data = self._read_xml(os.path.join(guid, "markup.bcf"), "markup.xsd")
+        data = self.get_markup(guid)
         if "Comment" not in data:
             return comments
         for item in data["Comment"]:
@@ -624,8 +769,9 @@ class BcfXml:
         return comments
 
     def get_viewpoints(self, guid):
+        self.extract_topic(guid)
         viewpoints = {}
-        data = self._read_xml(os.path.join(guid, "markup.bcf"), "markup.xsd")
+        data = self.get_markup(guid)
         if "Viewpoints" not in data:
             return viewpoints
         for item in data["Viewpoints"]:
@@ -763,12 +909,24 @@ class BcfXml:
         return component
 
     def close_project(self):
+        if self.archive:
+            self.archive.close()
+            self.archive = None
+        self.archive_topics = {}
+        self.extracted_topics = set()
+        self.deleted_topics = set()
+        self.markups = {}
         shutil.rmtree(self.filepath)
 
     def _read_xml(self, filename, xsd):
-        schema = XMLSchema(os.path.join(cwd, "xsd", xsd))
+        schema = get_schema(xsd)
         filepath = os.path.join(self.filepath, filename)
-        (data, errors) = schema.to_dict(filepath, validation="lax")
+        guid = filename.split(os.sep)[0]
+        if self.archive and guid not in self.extracted_topics and not os.path.exists(filepath):
+            with self.archive.open(filename.replace(os.sep, "/")) as f:
+                (data, errors) = schema.to_dict(f, validation="lax")
+        else:
+            (data, errors) = schema.to_dict(filepath, validation="lax")
         for error in errors:
             self.logger.error(error)
         return data
@@ -21,8 +21,6 @@ import bpy
 import json
 import numpy as np
 import datetime
-import zipfile
-import tempfile
 import addon_utils
 import ifcopenshell
 import ifcopenshell.api
@@ -48,17 +46,7 @@ class IfcExporter:
             self.sync_all_objects()
             self.sync_edited_objects()
         extension = self.ifc_export_settings.output_file.split(".")[-1]
-        if extension == "ifczip":
-            with tempfile.TemporaryDirectory() as unzipped_path:
-                filename, ext = os.path.splitext(os.path.basename(self.ifc_export_settings.output_file))
-                tmp_name = "{}.ifc".format(filename)
-                tmp_file = os.path.join(unzipped_path, tmp_name)
-                self.file.write(tmp_file)
-                with zipfile.ZipFile(
-                    self.ifc_export_settings.output_file, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=9
-                ) as zf:
-                    zf.write(tmp_file)
-        elif extension == "ifc":
+        if extension in ("ifc", "ifczip"):
             self.file.write(self.ifc_export_settings.output_file)
         elif extension == "ifcjson":
             import ifcjson
@@ -137,15 +137,29 @@ def refresh_ui_data():
             pass
 
 
-def purge_module_data():
+def purge_module_data(ids=None):
+    """Purges cached module data
+
+    :param ids: If provided, only data affected by changes to instances with
+        these ids is invalidated, where modules support it. Otherwise, all
+        module data is purged.
+    :type ids: set[int]
+    """
     from blenderbim.bim import modules
 
     refresh_ui_data()
+    invalidated_ids = None
+    if ids is not None and IfcStore.get_file():
+        invalidated_ids = ifcopenshell.api.get_invalidated_ids(IfcStore.get_file(), ids)
     for name, value in modules.items():
         try:
-            getattr(getattr(getattr(ifcopenshell.api, name), "data"), "Data").purge()
+            data = getattr(getattr(getattr(ifcopenshell.api, name), "data"), "Data")
         except AttributeError:
-            pass
+            data = None
+        if data and invalidated_ids is not None and hasattr(data, "invalidate"):
+            data.invalidate(invalidated_ids)
+        elif data:
+            data.purge()
 
         try:
             getattr(value, "prop").purge()
@@ -172,8 +186,9 @@ def undo_pre(scene):
 def undo_post(scene):
     if IfcStore.last_transaction != bpy.context.scene.BIMProperties.last_transaction:
         IfcStore.last_transaction = bpy.context.scene.BIMProperties.last_transaction
+        IfcStore.affected_ids = set()
         IfcStore.undo()
-        purge_module_data()
+        purge_module_data(ids=IfcStore.affected_ids)
     IfcStore.update_undo_redo_stack_objects()
     IfcStore.reload_linked_elements(objects=[bpy.data.objects.get(o) for o in IfcStore.undo_redo_stack_objects])
 
@@ -187,8 +202,9 @@ def redo_pre(scene):
 def redo_post(scene):
     if IfcStore.last_transaction != bpy.context.scene.BIMProperties.last_transaction:
         IfcStore.last_transaction = bpy.context.scene.BIMProperties.last_transaction
+        IfcStore.affected_ids = set()
         IfcStore.redo()
-        purge_module_data()
+        purge_module_data(ids=IfcStore.affected_ids)
     IfcStore.update_undo_redo_stack_objects()
     IfcStore.reload_linked_elements(objects=[bpy.data.objects.get(o) for o in IfcStore.undo_redo_stack_objects])
 
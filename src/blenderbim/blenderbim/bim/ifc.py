@@ -20,11 +20,8 @@ import os
 import bpy
 import uuid
 import hashlib
-import zipfile
-import tempfile
 import ifcopenshell
 import blenderbim.bim.handler
-from pathlib import Path
 
 
 class IfcStore:
@@ -43,6 +40,7 @@ class IfcStore:
     library_file = None
     element_listeners = set()
     undo_redo_stack_objects = set()
+    affected_ids = set()
     current_transaction = ""
     last_transaction = ""
     history = []
@@ -104,16 +102,7 @@ class IfcStore:
     @staticmethod
     def load_file(path):
         extension = path.split(".")[-1]
-        if extension.lower() == "ifczip":
-            with tempfile.TemporaryDirectory() as unzipped_path:
-                with zipfile.ZipFile(path, "r") as zip_ref:
-                    zip_ref.extractall(unzipped_path)
-                for filename in Path(unzipped_path).glob("**/*.ifc"):
-                    IfcStore.file = ifcopenshell.open(filename)
-                    return
-        elif extension.lower() == "ifcxml":
-            IfcStore.file = ifcopenshell.file(ifcopenshell.ifcopenshell_wrapper.parse_ifcxml(path))
-        elif extension.lower() == "ifc":
+        if extension.lower() in ("ifc", "ifczip", "ifcxml"):
             IfcStore.file = ifcopenshell.open(path)
 
     @staticmethod
@@ -280,7 +269,9 @@ class IfcStore:
         if is_top_level_operator:
             IfcStore.get_file().end_transaction()
             IfcStore.add_transaction_operation(
-                operator, rollback=lambda d: IfcStore.get_file().undo(), commit=lambda d: IfcStore.get_file().redo()
+                operator,
+                rollback=lambda d: IfcStore.affected_ids.update(IfcStore.get_file().undo()),
+                commit=lambda d: IfcStore.affected_ids.update(IfcStore.get_file().redo()),
             )
             IfcStore.end_transaction(operator)
             blenderbim.bim.handler.refresh_ui_data()
@@ -89,7 +89,10 @@ class TestRunner:
         ids_handler = IDSHandler()
         logger.addHandler(ids_handler)
         ids_file = ifcopenshell.ids.ids.open(args["feature"])
-        ids_file.validate(IfcStore.file, logger)
+        if args.get("processes", 1) > 1:
+            ids_file.validate_parallel(logger=logger, processes=args["processes"], ifc_file=IfcStore.file)
+        else:
+            ids_file.validate(IfcStore.file, logger)
 
         tmpdir = tempfile.mkdtemp()
         report_json = os.path.join(tmpdir, "report.json")
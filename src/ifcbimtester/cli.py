@@ -18,6 +18,7 @@ parser.add_argument("--steps", type=str, help="Specify a custom step definition
 parser.add_argument("--schema-file", type=str, help="Path to a custom IFC schema, used with --schema-name")
 parser.add_argument("--schema-name", type=str, help="The name of a custom IFC schema, used with --schema-file")
 parser.add_argument("--lang", type=str, help="Specify a language e.g. en/de/fr/it", default="")
+parser.add_argument("--processes", type=int, help="Specify the number of processes used to test an IDS", default=1)
 
 args = vars(parser.parse_args())
 
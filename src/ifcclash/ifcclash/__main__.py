@@ -29,10 +29,13 @@ parser.add_argument("input", type=str, help="A JSON dataset describing a series
 parser.add_argument(
     "-o", "--output", type=str, help="The JSON diff file to output. Defaults to output.json", default="output.json"
 )
+parser.add_argument("-p", "--processes", type=int, help="The number of processes to use. Defaults to 1", default=None)
 args = parser.parse_args()
 
 settings = ClashSettings()
 settings.output = args.output
+if args.processes:
+    settings.processes = args.processes
 settings.logger = logging.getLogger("Clash")
 settings.logger.setLevel(logging.DEBUG)
 handler = logging.StreamHandler(sys.stdout)
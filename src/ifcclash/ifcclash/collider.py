@@ -16,106 +16,199 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcClash.  If not, see <http://www.gnu.org/licenses/>.
 
+import hashlib
+import multiprocessing
 import hppfcl
 import numpy as np
 import ifcopenshell
+import ifcopenshell.geom
+
+# The collider of the current narrowphase, inherited by forked workers
+shared_collider = None
+
+
+def collide_pairs(args):
+    return shared_collider.collide_pairs(*args)
 
 
 class Collider:
-    def __init__(self, logger):
+    def __init__(self, logger, processes=1):
         self.logger = logger
         self.groups = {}
-        self.tree = ifcopenshell.geom.tree()
+        # Elements sharing a mapped representation have identical local geometry
+        self.bvhs = {}
+        self.processes = processes
 
     def create_group(self, name):
         self.logger.info(f"Creating group {name}")
-        self.groups[name] = {"elements": {}, "objects": {}}
+        self.groups[name] = {"elements": {}, "objects": {}, "ids": [], "boxes": []}
 
     def create_objects(self, name, ifc_file, iterator, elements):
         import time
 
         start = time.time()
         self.logger.info(f"Adding objects {name}")
-        assert iterator.initialize()
-        while True:
-            self.tree.add_element(iterator.get_native())
-            shape = iterator.get()
-            self.create_object(name, shape.guid, shape)
-            if not iterator.next():
-                break
-        self.logger.info(f"Tree finished {time.time() - start}")
+        for batch in iterator.batches():
+            for i, guid in enumerate(batch.guids):
+                self.create_object(name, guid, batch.verts_of(i), batch.faces_of(i), batch.matrices[i])
+        self.logger.info(f"Objects finished {time.time() - start}")
         start = time.time()
         self.groups[name]["elements"].update({e.GlobalId: e for e in elements})
         self.logger.info(f"Element metadata finished {time.time() - start}")
-        start = time.time()
 
-    def create_object(self, group_name, id, shape):
-        obj = hppfcl.CollisionObject(
-            self.create_bvh(shape.geometry), self.create_transform(shape.transformation.matrix.data)
+    def create_object(self, group_name, id, verts, faces, matrix):
+        if not len(faces):
+            return
+        obj = hppfcl.CollisionObject(self.create_bvh(verts, faces), self.create_transform(matrix))
+        group = self.groups[group_name]
+        group["objects"][id] = obj
+        group["ids"].append(id)
+        world_verts = verts @ matrix[:3, :3].T + matrix[:3, 3]
+        group["boxes"].append(np.concatenate((world_verts.min(axis=0), world_verts.max(axis=0))))
+
+    def collide_internal(self, name, tolerance=0.0, clearance=0.0):
+        return self.collide_narrowphase(
+            name, name, self.collide_broadphase(name, name, clearance), tolerance=tolerance, clearance=clearance
         )
-        self.groups[group_name]["objects"][id] = obj
 
-    def collide_internal(self, name):
-        return self.collide_narrowphase(name, name, self.collide_broadphase(name, name))
+    def collide_group(self, name1, name2, tolerance=0.0, clearance=0.0):
+        return self.collide_narrowphase(
+            name1, name2, self.collide_broadphase(name1, name2, clearance), tolerance=tolerance, clearance=clearance
+        )
 
-    def collide_group(self, name1, name2):
-        return self.collide_narrowphase(name1, name2, self.collide_broadphase(name1, name2))
+    def collide_broadphase(self, name1, name2, clearance=0.0, chunk_size=256):
+        """Finds pairs of elements with overlapping axis aligned bounding boxes
 
-    def collide_broadphase(self, name1, name2):
+        Boxes of the first group are sorted along X and compared in chunks
+        against the boxes of the second group which overlap the chunk along X.
+        """
         import time
 
         start = time.time()
         self.logger.info("Starting broadphase")
+        ids1, boxes1 = self.groups[name1]["ids"], np.array(self.groups[name1]["boxes"]).reshape((-1, 6))
+        ids2, boxes2 = self.groups[name2]["ids"], np.array(self.groups[name2]["boxes"]).reshape((-1, 6))
+        boxes1 = boxes1 + np.array([-clearance] * 3 + [clearance] * 3)
+        order1 = np.argsort(boxes1[:, 0])
+        order2 = np.argsort(boxes2[:, 0])
+        min_x2 = boxes2[order2, 0]
         potential_collisions = []
-        checked_collisions = set()
-        for id, element in self.groups[name1]["elements"].items():
-            checked_collisions.add(id)
-            box_filter = self.tree.select_box(element)
-            pairs = [
-                {"id1": id, "id2": e.GlobalId}
-                for e in box_filter
-                if e.GlobalId not in checked_collisions and e.GlobalId in self.groups[name2]["elements"]
-            ]
-            potential_collisions.extend(pairs)
+        for chunk_start in range(0, len(order1), chunk_size):
+            chunk = order1[chunk_start : chunk_start + chunk_size]
+            chunk_boxes = boxes1[chunk]
+            candidates = order2[: np.searchsorted(min_x2, chunk_boxes[:, 3].max(), side="right")]
+            candidates = candidates[boxes2[candidates, 3] >= chunk_boxes[:, 0].min()]
+            if not len(candidates):
+                continue
+            candidate_boxes = boxes2[candidates]
+            overlaps = np.logical_and(
+                chunk_boxes[:, None, :3] <= candidate_boxes[None, :, 3:],
+                chunk_boxes[:, None, 3:] >= candidate_boxes[None, :, :3],
+            ).all(axis=2)
+            for i, j in zip(*np.nonzero(overlaps)):
+                id1, id2 = ids1[chunk[i]], ids2[candidates[j]]
+                if name1 == name2 and chunk[i] >= candidates[j]:
+                    continue
+                elif id1 == id2:
+                    continue
+                potential_collisions.append({"id1": id1, "id2": id2})
         self.logger.info(f"Finished broadphase {time.time() - start}")
         return potential_collisions
 
-    def collide_narrowphase(self, name1, name2, potential_collisions):
+    def collide_narrowphase(self, name1, name2, potential_collisions, tolerance=0.0, clearance=0.0):
+        """Checks pairs of elements for collisions, in parallel where possible
+
+        :param tolerance: Collisions which penetrate less than this distance are ignored
+        :param clearance: If non-zero, elements which are closer than this
+            distance are reported even if they do not collide.
+        """
+        global shared_collider
         import time
 
         start = time.time()
         self.logger.info("Starting narrowphase")
+        pairs = [(data["id1"], data["id2"]) for data in potential_collisions]
+        # Collision objects cannot be pickled, so workers must inherit them by forking
+        if self.processes > 1 and len(pairs) > 1000 and "fork" in multiprocessing.get_all_start_methods():
+            chunk_size = max(1, len(pairs) // (self.processes * 16))
+            chunks = [
+                (name1, name2, pairs[i : i + chunk_size], tolerance, clearance)
+                for i in range(0, len(pairs), chunk_size)
+            ]
+            collisions = []
+            shared_collider = self
+            try:
+                with multiprocessing.get_context("fork").Pool(self.processes) as pool:
+                    for results in pool.imap(collide_pairs, chunks):
+                        collisions.extend(results)
+            finally:
+                shared_collider = None
+        else:
+            collisions = self.collide_pairs(name1, name2, pairs, tolerance, clearance)
+        self.logger.info(f"Finished narrowphase {time.time() - start}")
+        return collisions
+
+    def collide_pairs(self, name1, name2, pairs, tolerance=0.0, clearance=0.0):
         collisions = []
-        for data in potential_collisions:
+        objects1 = self.groups[name1]["objects"]
+        objects2 = self.groups[name2]["objects"]
+        for id1, id2 in pairs:
+            if clearance:
+                result = hppfcl.DistanceResult()
+                distance = hppfcl.distance(objects1[id1], objects2[id2], hppfcl.DistanceRequest(), result)
+                if distance >= clearance:
+                    continue
+                p1, p2 = np.array(result.getNearestPoint1()), np.array(result.getNearestPoint2())
+                normal = p2 - p1
+                length = np.linalg.norm(normal)
+                collisions.append(
+                    {
+                        "id1": id1,
+                        "id2": id2,
+                        "normal": (normal / length if length else normal).tolist(),
+                        "position": p1.tolist(),
+                        "penetration_depth": max(0.0, -float(distance)),
+                        "distance": float(distance),
+                    }
+                )
+                continue
             result = hppfcl.CollisionResult()
-            hppfcl.collide(
-                self.groups[name1]["objects"][data["id1"]],
-                self.groups[name2]["objects"][data["id2"]],
-                hppfcl.CollisionRequest(),
-                result,
+            hppfcl.collide(objects1[id1], objects2[id2], hppfcl.CollisionRequest(), result)
+            if not result.isCollision():
+                continue
+            contact = result.getContacts()[0]
+            if tolerance and abs(contact.penetration_depth) < tolerance:
+                continue
+            collisions.append(
+                {
+                    "id1": id1,
+                    "id2": id2,
+                    "normal": [float(x) for x in contact.normal],
+                    "position": [float(x) for x in contact.pos],
+                    "penetration_depth": float(contact.penetration_depth),
+                }
             )
-            if result.isCollision():
-                collisions.append({"id1": data["id1"], "id2": data["id2"], "collision": result})
-        self.logger.info(f"Finished narrowphase {time.time() - start}")
         return collisions
 
     def create_transform(self, m):
-        mat = np.array([[m[0], m[3], m[6], m[9]], [m[1], m[4], m[7], m[10]], [m[2], m[5], m[8], m[11]], [0, 0, 0, 1]])
-        mat.transpose()
-        return hppfcl.Transform3f(mat[:3, :3], mat[:3, 3])
-
-    def create_bvh(self, mesh):
-        v = mesh.verts
-        f = mesh.faces
-        mesh_verts = np.array([[v[i], v[i + 1], v[i + 2]] for i in range(0, len(v), 3)])
-        mesh_faces = [(int(f[i]), int(f[i + 1]), int(f[i + 2])) for i in range(0, len(f), 3)]
-
-        bvh = hppfcl.BVHModelOBB()
-        bvh.beginModel(len(mesh_faces), len(mesh_verts))
-        vertices = hppfcl.StdVec_Vec3f()
-        [vertices.append(v) for v in mesh_verts]
-        triangles = hppfcl.StdVec_Triangle()
-        [triangles.append(hppfcl.Triangle(f[0], f[1], f[2])) for f in mesh_faces]
-        bvh.addSubModel(vertices, triangles)
+        return hppfcl.Transform3f(np.array(m[:3, :3]), np.array(m[:3, 3]))
+
+    def create_bvh(self, verts, faces):
+        key = hashlib.sha1(verts.tobytes() + faces.tobytes()).digest()
+        bvh = self.bvhs.get(key)
+        if bvh is not None:
+            return bvh
+
+        bvh = self.bvhs[key] = hppfcl.BVHModelOBB()
+        bvh.beginModel(len(faces), len(verts))
+        if hasattr(bvh, "addVertices"):
+            bvh.addVertices(np.array(verts, dtype=np.float64))
+            bvh.addTriangles(np.array(faces, dtype=np.int64))
+        else:
+            vertices = hppfcl.StdVec_Vec3f()
+            [vertices.append(v) for v in np.array(verts)]
+            triangles = hppfcl.StdVec_Triangle()
+            [triangles.append(hppfcl.Triangle(int(f[0]), int(f[1]), int(f[2]))) for f in faces]
+            bvh.addSubModel(vertices, triangles)
         bvh.endModel()
         return bvh
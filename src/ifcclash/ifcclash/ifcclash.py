@@ -36,7 +36,7 @@ class Clasher:
         self.settings = settings
         self.geom_settings = ifcopenshell.geom.settings()
         self.clash_sets = []
-        self.collider = collider.Collider(self.settings.logger)
+        self.collider = collider.Collider(self.settings.logger, self.settings.processes)
         self.selector = ifcopenshell.util.selector.Selector()
         self.ifcs = {}
 
@@ -46,6 +46,8 @@ class Clasher:
             self.process_clash_set(clash_set)
 
     def process_clash_set(self, clash_set):
+        tolerance = clash_set.get("tolerance", 0.0)
+        clearance = clash_set.get("clearance", 0.0)
         self.collider.create_group("a")
         for source in clash_set["a"]:
             source["ifc"] = self.load_ifc(source["file"])
@@ -56,9 +58,9 @@ class Clasher:
             for source in clash_set["b"]:
                 source["ifc"] = self.load_ifc(source["file"])
                 self.add_collision_objects("b", source["ifc"], source.get("mode", None), source.get("selector", None))
-            results = self.collider.collide_group("a", "b")
+            results = self.collider.collide_group("a", "b", tolerance=tolerance, clearance=clearance)
         else:
-            results = self.collider.collide_internal("a")
+            results = self.collider.collide_internal("a", tolerance=tolerance, clearance=clearance)
 
         processed_results = {}
         for result in results:
@@ -68,7 +70,6 @@ class Clasher:
             else:
                 element2 = self.get_element(clash_set["a"], result["id2"])
 
-            contact = result["collision"].getContacts()[0]
             processed_results[f"{result['id1']}-{result['id2']}"] = {
                 "a_global_id": result["id1"],
                 "b_global_id": result["id2"],
@@ -76,10 +77,12 @@ class Clasher:
                 "b_ifc_class": element2.is_a(),
                 "a_name": element1.Name,
                 "b_name": element2.Name,
-                "normal": list(contact.normal),
-                "position": list(contact.pos),
-                "penetration_depth": contact.penetration_depth,
+                "normal": result["normal"],
+                "position": result["position"],
+                "penetration_depth": result["penetration_depth"],
             }
+            if "distance" in result:
+                processed_results[f"{result['id1']}-{result['id2']}"]["distance"] = result["distance"]
         clash_set["clashes"] = processed_results
 
     def load_ifc(self, path):
@@ -296,3 +299,5 @@ class ClashSettings:
     def __init__(self):
         self.logger = None
         self.output = "clashes.json"
+        # Collisions are only checked in forked processes if this is raised
+        self.processes = 1
@@ -0,0 +1,83 @@
+import pytest
+import logging
+import numpy as np
+from ifcclash import collider
+from ifcclash import ifcclash
+
+CUBE_VERTS = np.array(
+    [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]], dtype=np.float64
+)
+CUBE_FACES = np.array(
+    [
+        [0, 2, 1],
+        [0, 3, 2],
+        [4, 5, 6],
+        [4, 6, 7],
+        [0, 1, 5],
+        [0, 5, 4],
+        [1, 2, 6],
+        [1, 6, 5],
+        [2, 3, 7],
+        [2, 7, 6],
+        [3, 0, 4],
+        [3, 4, 7],
+    ],
+    dtype=np.int64,
+)
+
+
+def create_cubes(cube_collider, name, total):
+    cube_collider.create_group(name)
+    for i in range(total):
+        matrix = np.eye(4)
+        matrix[0, 3] = i * 0.01
+        cube_collider.create_object(name, f"cube{i}", CUBE_VERTS, CUBE_FACES, matrix)
+
+
+class TestCollider:
+    def test_defaulting_to_a_single_process(self):
+        assert collider.Collider(logging.getLogger("Clash")).processes == 1
+        assert collider.Collider(logging.getLogger("Clash"), 2).processes == 2
+
+    def test_colliding_in_parallel_finds_the_same_collisions(self):
+        serial = collider.Collider(logging.getLogger("Clash"), processes=1)
+        parallel = collider.Collider(logging.getLogger("Clash"), processes=2)
+        # Every pair of cubes overlaps, which is enough pairs to be checked in parallel
+        create_cubes(serial, "cubes", 50)
+        create_cubes(parallel, "cubes", 50)
+        collisions = serial.collide_internal("cubes")
+        assert len(collisions) == 50 * 49 // 2
+        assert parallel.collide_internal("cubes") == collisions
+        assert collider.shared_collider is None
+
+    def test_colliding_groups_in_parallel_finds_the_same_collisions(self):
+        serial = collider.Collider(logging.getLogger("Clash"), processes=1)
+        parallel = collider.Collider(logging.getLogger("Clash"), processes=2)
+        for cube_collider in (serial, parallel):
+            create_cubes(cube_collider, "a", 40)
+            create_cubes(cube_collider, "b", 40)
+        collisions = serial.collide_group("a", "b", clearance=0.5)
+        assert len(collisions) == 40 * 39
+        assert parallel.collide_group("a", "b", clearance=0.5) == collisions
+
+    def test_releasing_the_shared_collider_when_colliding_in_parallel_fails(self, monkeypatch):
+        parallel = collider.Collider(logging.getLogger("Clash"), processes=2)
+        create_cubes(parallel, "cubes", 50)
+
+        def collide_pairs(*args):
+            raise ValueError("Failed")
+
+        # Workers are forked after patching, so they inherit the failing method
+        monkeypatch.setattr(parallel, "collide_pairs", collide_pairs)
+        with pytest.raises(ValueError):
+            parallel.collide_internal("cubes")
+        assert collider.shared_collider is None
+
+
+class TestClasher:
+    def test_using_the_processes_of_the_settings(self):
+        settings = ifcclash.ClashSettings()
+        assert settings.processes == 1
+        settings.logger = logging.getLogger("Clash")
+        settings.processes = 3
+        assert ifcclash.Clasher(settings).collider.processes == 3
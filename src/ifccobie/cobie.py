@@ -26,8 +26,12 @@ import argparse
 import datetime
 import logging
 import ifcopenshell
+import ifcopenshell.util.fm
 import ifcopenshell.util.selector
 
+# Distinguishes an uncached value from a cached None
+uncached = object()
+
 
 class IfcCobieParser:
     def __init__(self, logger, selector):
@@ -86,6 +90,11 @@ class IfcCobieParser:
             
         self.type_assets = self.selector.parse(self.file, type_query)
         self.component_assets = self.selector.parse(self.file, component_query)
+        self.component_asset_ids = {e.id() for e in self.component_assets}
+        # Rows are read from relationships indexed once up front, rather than
+        # walking the inverse attributes of each asset for every column.
+        self.index = ifcopenshell.util.fm.ExtractionIndex(self.file)
+        self.emails = {}
         self.get_contacts()
         self.get_facilities()
         self.get_floors()
@@ -665,23 +674,18 @@ class IfcCobieParser:
         self.logger.error("The connected object relationship %s is not a component asset for %s", key, connection)
 
     def is_object_a_component_asset(self, obj):
-        return obj in self.component_assets
+        return obj is not None and obj.id() in self.component_asset_ids
 
     def get_space_name_from_component(self, component):
-        for relationship in component.ContainedInStructure:
-            if relationship.RelatingStructure.is_a("IfcSpace") and relationship.RelatingStructure.Name:
-                return relationship.RelatingStructure.Name
+        for structure in self.index.get_containers(component):
+            if structure.is_a("IfcSpace") and structure.Name:
+                return structure.Name
         self.logger.error("A related space name could not be determined for %s", component)
 
     def get_type_name_from_object(self, object):
-        if self.file.schema == "IFC2X3":
-            for relationship in object.IsDefinedBy:
-                if relationship.is_a("IfcRelDefinesByType") and relationship.RelatingType.Name:
-                    return relationship.RelatingType.Name
-        else:
-            for relationship in object.IsTypedBy:
-                if relationship.RelatingType.Name:
-                    return relationship.RelatingType.Name
+        type = self.index.get_type(object)
+        if type and type.Name:
+            return type.Name
         self.logger.error("A related type name could not be determined for %s", object)
 
     def get_expected_life_from_type(self, type):
@@ -737,13 +741,9 @@ class IfcCobieParser:
         return self.get_property_from_qto(qto, "FinishCeilingHeight", "LengthValue")
 
     def get_qto_from_object(self, object, name):
-        for relationship in object.IsDefinedBy:
-            if (
-                relationship.is_a("IfcRelDefinesByProperties")
-                and relationship.RelatingPropertyDefinition.is_a("IfcQuantitySet")
-                and relationship.RelatingPropertyDefinition.Name == name
-            ):
-                return relationship.RelatingPropertyDefinition
+        qto = self.index.get_qto(object, name)
+        if qto:
+            return qto
         self.logger.warning("The qto %s was not found for %s", name, object)
 
     def get_property_from_qto(self, qto, name, attribute):
@@ -754,9 +754,9 @@ class IfcCobieParser:
         return "n/a"
 
     def get_property_from_pset(self, pset, name, default=None):
-        for prop in pset.HasProperties:
-            if prop.Name == name:
-                return prop.NominalValue.wrappedValue
+        prop = self.index.get_property(pset, name)
+        if prop:
+            return prop.NominalValue.wrappedValue
         self.logger.warning("The property %s was not found for %s", name, pset)
         return default
 
@@ -771,19 +771,9 @@ class IfcCobieParser:
         return "n/a"
 
     def get_pset_from_object(self, object, name):
-        if object.is_a("IfcTypeObject"):
-            if object.HasPropertySets:
-                for pset in object.HasPropertySets:
-                    if pset.is_a("IfcPropertySet") and pset.Name == name:
-                        return pset
-        else:
-            for relationship in object.IsDefinedBy:
-                if (
-                    relationship.is_a("IfcRelDefinesByProperties")
-                    and relationship.RelatingPropertyDefinition.is_a("IfcPropertySet")
-                    and relationship.RelatingPropertyDefinition.Name == name
-                ):
-                    return relationship.RelatingPropertyDefinition
+        pset = self.index.get_pset(object, name)
+        if pset:
+            return pset
         self.logger.warning("The pset %s was not found for %s", name, object)
 
     def get_height_from_storey(self, storey):
@@ -891,17 +881,13 @@ class IfcCobieParser:
     def get_category_from_object(self, object, picklist):
         class_identification = None
         class_name = None
-        for association in object.HasAssociations:
-            if not association.is_a("IfcRelAssociatesClassification"):
-                continue
-            if not association.RelatingClassification.is_a("IfcClassificationReference"):
-                continue
+        reference = self.index.get_classification(object)
+        if reference:
             if self.file.schema == "IFC2X3":
-                class_identification = association.RelatingClassification.ItemReference
+                class_identification = reference.ItemReference
             else:
-                class_identification = association.RelatingClassification.Identification
-            class_name = association.RelatingClassification.Name
-            break
+                class_identification = reference.Identification
+            class_name = reference.Name
         if not class_identification or class_name:
             self.logger.error("The classification has invalid identification and name for %s", object)
         result = "{}:{}".format(class_identification, class_name)
@@ -930,6 +916,12 @@ class IfcCobieParser:
         return result
 
     def get_email_from_history(self, history):
+        email = self.emails.get(history.id(), uncached)
+        if email is uncached:
+            email = self.emails[history.id()] = self.get_email_from_owning_user(history)
+        return email
+
+    def get_email_from_owning_user(self, history):
         person = history.OwningUser.ThePerson
         organisation = history.OwningUser.TheOrganization
         email = self.get_email_from_person_or_organisation(person)
@@ -1505,15 +1497,17 @@ class CobieWriter:
         )
 
     def write_data(self, sheet, data, primary_key, fieldnames, colours, custom_data={}):
-        self.sheet_data[sheet] = {"headers": fieldnames + list(custom_data.keys()), "colours": colours, "rows": []}
+        # Rows are generated lazily, so only the sheet currently being written is held in memory
+        self.sheet_data[sheet] = {
+            "headers": fieldnames + list(custom_data.keys()),
+            "colours": colours,
+            "rows": self.get_rows(data, primary_key, fieldnames + list(custom_data.keys())),
+        }
+
+    def get_rows(self, data, primary_key, fieldnames):
         for name, row in data.items():
             row[primary_key] = name
-            values = []
-            for fieldname in fieldnames:
-                values.append(row[fieldname])
-            for fieldname in custom_data.keys():
-                values.append(row[fieldname])
-            self.sheet_data[sheet]["rows"].append(values)
+            yield [row[fieldname] for fieldname in fieldnames]
 
 
 class CobieCsvWriter(CobieWriter):
@@ -1534,7 +1528,8 @@ class CobieXlsWriter(CobieWriter):
         from xlsxwriter import Workbook
 
         super().write()
-        self.workbook = Workbook(self.filename + ".xlsx")
+        # Rows are flushed to disk as they are written, as each sheet is written in row order
+        self.workbook = Workbook(self.filename + ".xlsx", {"constant_memory": True})
 
         self.cell_formats = {}
         for key, value in self.colours.items():
@@ -1547,23 +1542,12 @@ class CobieXlsWriter(CobieWriter):
 
     def write_worksheet(self, name):
         worksheet = self.workbook.add_worksheet(name)
-        r = 0
-        c = 0
-        for header in self.sheet_data[name]["headers"]:
-            cell = worksheet.write(r, c, header, self.cell_formats["s"])
-            c += 1
-        c = 0
-        r += 1
-        for row in self.sheet_data[name]["rows"]:
-            c = 0
-            for col in row:
-                if c >= len(self.sheet_data[name]["colours"]):
-                    cell_format = "p"
-                else:
-                    cell_format = self.sheet_data[name]["colours"][c]
-                cell = worksheet.write(r, c, col, self.cell_formats[cell_format])
-                c += 1
-            r += 1
+        worksheet.write_row(0, 0, self.sheet_data[name]["headers"], self.cell_formats["s"])
+        colours = self.sheet_data[name]["colours"]
+        for r, row in enumerate(self.sheet_data[name]["rows"], 1):
+            for c, col in enumerate(row):
+                cell_format = colours[c] if c < len(colours) else "p"
+                worksheet.write(r, c, col, self.cell_formats[cell_format])
 
 
 class CobieOdsWriter(CobieWriter):
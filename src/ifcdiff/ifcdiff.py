@@ -24,22 +24,37 @@ import ifcopenshell
 from deepdiff import DeepDiff
 import time
 import json
+import hashlib
 import argparse
 import decimal
 
 
 class IfcDiff:
-    def __init__(self, old_file, new_file, output_file, inverse_classes=None):
+    def __init__(self, old_file, new_file, output_file, inverse_classes=None, logger=None, progress=None):
+        """Compares two revisions of an IFC file
+
+        :param old_file: The path to the old file, or an opened ifcopenshell.file
+        :param new_file: The path to the new file, or an opened ifcopenshell.file
+        :param logger: A logging.Logger for messages, which are printed if not provided
+        :param progress: A callback receiving the number of elements diffed so far and the total
+        """
         self.old_file = old_file
         self.new_file = new_file
         self.output_file = output_file
         self.change_register = {}
-        self.representation_ids = []
         self.inverse_classes = inverse_classes
         self.precision = 2
+        self.logger = logger
+        self.progress = progress
+
+    def log(self, message):
+        if self.logger:
+            self.logger.info(message)
+        else:
+            print(message)
 
     def diff(self):
-        print("# IFC Diff")
+        self.log("# IFC Diff")
         self.load()
 
         self.precision = self.get_precision()
@@ -52,29 +67,58 @@ class IfcDiff:
         same_elements = new_elements - self.added_elements
         total_same_elements = len(same_elements)
 
-        print(" - {} item(s) were deleted".format(len(self.deleted_elements)))
-        print(" - {} item(s) were added".format(len(self.added_elements)))
-        print(" - {} item(s) were retained between the old and new IFC file".format(total_same_elements))
+        self.log(" - {} item(s) were deleted".format(len(self.deleted_elements)))
+        self.log(" - {} item(s) were added".format(len(self.added_elements)))
+        self.log(" - {} item(s) were retained between the old and new IFC file".format(total_same_elements))
 
         start = time.time()
         total_diffed = 0
 
+        # Hashes are memoised per instance, so shared subgraphs such as
+        # mapped representations are only hashed once per file.
+        data_hashers = (
+            ContentHasher(self.precision, ("Representation", "OwnerHistory", "ObjectPlacement")),
+            ContentHasher(self.precision, ("Representation", "OwnerHistory", "ObjectPlacement")),
+        )
+        geometry_hashers = (
+            ContentHasher(self.precision, ("OwnerHistory", "GlobalId")),
+            ContentHasher(self.precision, ("OwnerHistory", "GlobalId")),
+        )
+        relationship_hashers = (
+            ContentHasher(self.precision, self.relationship_exclusions),
+            ContentHasher(self.precision, self.relationship_exclusions),
+        )
+
         for global_id in same_elements:
             total_diffed += 1
-            print("{}/{} diffed ...".format(total_diffed, total_same_elements), end="\r", flush=True)
+            if self.progress:
+                self.progress(total_diffed, total_same_elements)
+            elif not self.logger:
+                print("{}/{} diffed ...".format(total_diffed, total_same_elements), end="\r", flush=True)
             old_element = self.old.by_id(global_id)
             new_element = self.new.by_id(global_id)
-            self.diff_element(old_element, new_element)
-            self.diff_element_inverse_relationships(old_element, new_element)
 
-            representation_id = self.get_representation_id(new_element)
-            if representation_id in self.representation_ids:
-                continue
-            self.representation_ids.append(representation_id)
-            self.diff_element_geometry(old_element, new_element)
+            # Detailed diffs are only produced for elements whose hashes differ
+            if data_hashers[0].hash_instance(old_element) != data_hashers[1].hash_instance(new_element):
+                self.diff_element(old_element, new_element)
 
-        print(" - {} item(s) were changed either geometrically or with data".format(len(self.change_register.keys())))
-        print("# Diff finished in {:.2f} seconds".format(time.time() - start))
+            if self.inverse_classes:
+                old_relationships = self.get_relationships(self.old, old_element)
+                new_relationships = self.get_relationships(self.new, new_element)
+                if relationship_hashers[0].hash_set(old_relationships) != relationship_hashers[1].hash_set(
+                    new_relationships
+                ):
+                    self.diff_element_inverse_relationships(old_element, new_element)
+
+            if self.get_geometry_hash(geometry_hashers[0], old_element) != self.get_geometry_hash(
+                geometry_hashers[1], new_element
+            ):
+                self.diff_element_geometry(old_element, new_element)
+
+        self.log(
+            " - {} item(s) were changed either geometrically or with data".format(len(self.change_register.keys()))
+        )
+        self.log("# Diff finished in {:.2f} seconds".format(time.time() - start))
 
     def export(self):
         with open(self.output_file, "w", encoding="utf-8") as diff_file:
@@ -90,10 +134,16 @@ class IfcDiff:
             )
 
     def load(self):
-        print("Loading old file ...")
-        self.old = ifcopenshell.open(self.old_file)
-        print("Loading new file ...")
-        self.new = ifcopenshell.open(self.new_file)
+        if isinstance(self.old_file, ifcopenshell.file):
+            self.old = self.old_file
+        else:
+            self.log("Loading old file ...")
+            self.old = ifcopenshell.open(self.old_file)
+        if isinstance(self.new_file, ifcopenshell.file):
+            self.new = self.new_file
+        else:
+            self.log("Loading new file ...")
+            self.new = ifcopenshell.open(self.new_file)
 
     def get_precision(self):
         try:
@@ -124,17 +174,19 @@ class IfcDiff:
         if diff and new_element.GlobalId:
             self.change_register.setdefault(new_element.GlobalId, {}).update(diff)
 
+    relationship_exclusions = ("GlobalId", "OwnerHistory", "RelatedObjects", "RelatingObject", "RelatingDefinitions")
+
+    def get_relationships(self, ifc_file, element):
+        relationships = ifc_file.get_inverse(element)
+        if self.inverse_classes[0] == "all":
+            return relationships
+        return [x for x in relationships if x.is_a() in self.inverse_classes]
+
     def diff_element_inverse_relationships(self, old_element, new_element):
         if not self.inverse_classes:
             return
-        old_relationships_all = self.old.get_inverse(old_element)
-        new_relationships_all = self.new.get_inverse(new_element)
-        if self.inverse_classes[0] == "all":
-            old_relationships = old_relationships_all
-            new_relationships = new_relationships_all
-        else:
-            old_relationships = [x for x in old_relationships_all if x.is_a() in self.inverse_classes]
-            new_relationships = [x for x in new_relationships_all if x.is_a() in self.inverse_classes]
+        old_relationships = self.get_relationships(self.old, old_element)
+        new_relationships = self.get_relationships(self.new, new_element)
 
         diff = DeepDiff(
             old_relationships,
@@ -155,62 +207,78 @@ class IfcDiff:
         if diff and new_element.GlobalId:
             self.change_register.setdefault(new_element.GlobalId, {}).update(diff)
 
+    def get_geometry_hash(self, hasher, element):
+        h = hashlib.sha1(hasher.hash_value(element.ObjectPlacement))
+        h.update(hasher.hash_value(element.Representation))
+        for rel in getattr(element, "HasOpenings", None) or []:
+            h.update(hasher.hash_instance(rel.RelatedOpeningElement))
+        for rel in getattr(element, "HasProjections", None) or []:
+            h.update(hasher.hash_instance(rel.RelatedFeatureElement))
+        return h.digest()
+
     def diff_element_geometry(self, old_element, new_element):
-        try:
-            DeepDiff(
-                old_element.ObjectPlacement,
-                new_element.ObjectPlacement,
-                terminate_on_first=True,
-                significant_digits=self.precision,
-                ignore_string_type_changes=True,
-                ignore_numeric_type_changes=True,
-                exclude_regex_paths=r"root.*id$",
-            )
-            DeepDiff(
-                old_element.Representation,
-                new_element.Representation,
-                terminate_on_first=True,
-                skip_after_n=1000,  # Arbitrary value to "skim" check
-                significant_digits=self.precision,
-                ignore_string_type_changes=True,
-                ignore_numeric_type_changes=True,
-                exclude_regex_paths=r"root.*id$",
-            )
-            DeepDiff(
-                old_element.HasOpenings,
-                new_element.HasOpenings,
-                terminate_on_first=True,
-                significant_digits=self.precision,
-                ignore_string_type_changes=True,
-                ignore_numeric_type_changes=True,
-                exclude_regex_paths=r"root.*id$",
-            )
-            DeepDiff(
-                old_element.HasProjections,
-                new_element.HasProjections,
-                terminate_on_first=True,
-                significant_digits=self.precision,
-                ignore_string_type_changes=True,
-                ignore_numeric_type_changes=True,
-                exclude_regex_paths=r"root.*id$",
-            )
-        except:
-            if new_element.GlobalId:
-                return self.change_register.setdefault(new_element.GlobalId, {}).update({"has_geometry_change": True})
-
-    def get_representation_id(self, element):
-        if not element.Representation:
-            return None
-        for representation in element.Representation.Representations:
-            if not representation.is_a("IfcShapeRepresentation"):
-                continue
-            if (
-                representation.RepresentationIdentifier == "Body"
-                and representation.RepresentationType != "MappedRepresentation"
-            ):
-                return representation.id()
-            elif representation.RepresentationIdentifier == "Body":
-                return representation.Items[0].MappingSource.MappedRepresentation.id()
+        if new_element.GlobalId:
+            self.change_register.setdefault(new_element.GlobalId, {}).update({"has_geometry_change": True})
+
+
+class ContentHasher:
+    """Computes canonical hashes of instance subgraphs
+
+    Hashes do not depend on STEP ids. Floats and integers are compared up to
+    the precision, strings regardless of their type, and attributes whose
+    names contain any of the excluded substrings are ignored at every depth.
+    Hashes of instances are memoised, so each file is hashed in a single
+    bottom-up pass no matter how often subgraphs are shared.
+    """
+
+    def __init__(self, precision, exclusions=()):
+        self.precision = precision
+        self.exclusions = exclusions
+        self.hashes = {}
+        self.attributes = {}
+
+    def get_attributes(self, element):
+        ifc_class = element.is_a()
+        attributes = self.attributes.get(ifc_class)
+        if attributes is None:
+            attributes = self.attributes[ifc_class] = [
+                i
+                for i in range(len(element))
+                if not any(exclusion in element.attribute_name(i) for exclusion in self.exclusions)
+            ]
+        return attributes
+
+    def hash_instance(self, element):
+        if element is None:
+            return b"$"
+        if not element.id():
+            return self.hash_value(element)
+        digest = self.hashes.get(element.id())
+        if digest is None:
+            h = hashlib.sha1(element.is_a().encode("utf-8"))
+            for i in self.get_attributes(element):
+                h.update(self.hash_value(element[i]))
+            digest = self.hashes[element.id()] = h.digest()
+        return digest
+
+    def hash_set(self, elements):
+        return hashlib.sha1(b"".join(sorted(self.hash_instance(e) for e in elements))).digest()
+
+    def hash_value(self, value):
+        if value is None:
+            return b"$;"
+        elif isinstance(value, ifcopenshell.entity_instance):
+            if value.id():
+                return b"#" + self.hash_instance(value)
+            return b"@" + value.is_a().encode("utf-8") + self.hash_value(value.wrappedValue)
+        elif isinstance(value, (tuple, list)):
+            return b"(" + b",".join(self.hash_value(v) for v in value) + b")"
+        elif isinstance(value, bool):
+            return repr(value).encode("utf-8") + b";"
+        elif isinstance(value, (int, float)):
+            # Numeric types are not distinguished, so integers are hashed as floats. Adding zero avoids -0.
+            return ("%.*f;" % (self.precision, round(value, self.precision) + 0.0)).encode("utf-8")
+        return str(value).encode("utf-8") + b";"
 
 
 class DiffEncoder(json.JSONEncoder):
@@ -0,0 +1,117 @@
+import logging
+import ifcopenshell
+import ifcopenshell.guid
+from ifcdiff import IfcDiff, ContentHasher
+
+WALL_GUID = "0WalL0000000000000000A"
+
+
+class counting_diff(IfcDiff):
+    """Counts the detailed diffs, which are only needed where hashes differ"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.detailed_diffs = 0
+        self.relationship_diffs = 0
+
+    def diff_element(self, old_element, new_element):
+        self.detailed_diffs += 1
+        super().diff_element(old_element, new_element)
+
+    def diff_element_inverse_relationships(self, old_element, new_element):
+        self.relationship_diffs += 1
+        super().diff_element_inverse_relationships(old_element, new_element)
+
+
+def create_model(name="Wall", depth=3.0, fire_rating="1HR", padding=0):
+    ifc_file = ifcopenshell.file(schema="IFC4")
+    # Unrelated instances shift the STEP ids of everything created after them
+    for i in range(padding):
+        ifc_file.createIfcCartesianPoint((float(i), 0.0, 0.0))
+    origin = ifc_file.createIfcAxis2Placement3D(ifc_file.createIfcCartesianPoint((0.0, 0.0, 0.0)))
+    context = ifc_file.createIfcGeometricRepresentationContext(None, "Model", 3, 1.0e-5, origin)
+    profile = ifc_file.createIfcRectangleProfileDef("AREA", None, None, 1.0, 1.0)
+    solid = ifc_file.createIfcExtrudedAreaSolid(profile, None, ifc_file.createIfcDirection((0.0, 0.0, 1.0)), depth)
+    representation = ifc_file.createIfcShapeRepresentation(context, "Body", "SweptSolid", [solid])
+    wall = ifc_file.createIfcWall(
+        WALL_GUID,
+        Name=name,
+        ObjectPlacement=ifc_file.createIfcLocalPlacement(None, origin),
+        Representation=ifc_file.createIfcProductDefinitionShape(None, None, [representation]),
+    )
+    value = ifc_file.createIfcPropertySingleValue("FireRating", None, ifc_file.createIfcLabel(fire_rating), None)
+    pset = ifc_file.createIfcPropertySet(ifcopenshell.guid.new(), None, "Pset_WallCommon", None, [value])
+    ifc_file.createIfcRelDefinesByProperties(ifcopenshell.guid.new(), None, None, None, [wall], pset)
+    return ifc_file
+
+
+def diff(old, new, inverse_classes=None):
+    ifc_diff = counting_diff(old, new, None, inverse_classes=inverse_classes, logger=logging.getLogger("IfcDiff"))
+    ifc_diff.diff()
+    return ifc_diff
+
+
+class TestIfcDiff:
+    def test_finding_no_changes_between_models_with_different_ids(self):
+        ifc_diff = diff(create_model(), create_model(padding=5), inverse_classes=["all"])
+        assert ifc_diff.change_register == {}
+        assert ifc_diff.detailed_diffs == 0
+        assert ifc_diff.relationship_diffs == 0
+
+    def test_finding_data_changes(self):
+        ifc_diff = diff(create_model(), create_model(name="Changed", padding=5))
+        assert ifc_diff.detailed_diffs == 1
+        assert "has_geometry_change" not in ifc_diff.change_register.get(WALL_GUID, {})
+
+    def test_finding_geometry_changes(self):
+        ifc_diff = diff(create_model(), create_model(depth=4.0, padding=5))
+        assert ifc_diff.detailed_diffs == 0
+        assert ifc_diff.change_register == {WALL_GUID: {"has_geometry_change": True}}
+
+    def test_ignoring_changes_below_the_model_precision(self):
+        ifc_diff = diff(create_model(depth=3.0), create_model(depth=3.000001))
+        assert ifc_diff.change_register == {}
+        assert ifc_diff.detailed_diffs == 0
+
+    def test_finding_relationship_changes(self):
+        ifc_diff = diff(create_model(), create_model(fire_rating="2HR"), inverse_classes=["IfcRelDefinesByProperties"])
+        assert ifc_diff.detailed_diffs == 0
+        assert ifc_diff.relationship_diffs == 1
+        assert "has_geometry_change" not in ifc_diff.change_register.get(WALL_GUID, {})
+
+    def test_ignoring_relationship_changes_of_other_classes(self):
+        ifc_diff = diff(create_model(), create_model(fire_rating="2HR"), inverse_classes=["IfcRelAggregates"])
+        assert ifc_diff.change_register == {}
+        assert ifc_diff.relationship_diffs == 0
+
+
+class TestContentHasher:
+    def test_hashing_equal_content_regardless_of_ids(self):
+        old, new = create_model(), create_model(padding=5)
+        old_wall, new_wall = old.by_id(WALL_GUID), new.by_id(WALL_GUID)
+        assert old_wall.id() != new_wall.id()
+        assert ContentHasher(5).hash_instance(old_wall) == ContentHasher(5).hash_instance(new_wall)
+
+    def test_hashing_numbers_up_to_the_precision(self):
+        old, new = create_model(depth=3.0), create_model(depth=3.01)
+        assert ContentHasher(1).hash_instance(old.by_id(WALL_GUID)) == ContentHasher(1).hash_instance(
+            new.by_id(WALL_GUID)
+        )
+        assert ContentHasher(2).hash_instance(old.by_id(WALL_GUID)) != ContentHasher(2).hash_instance(
+            new.by_id(WALL_GUID)
+        )
+
+    def test_excluding_attributes_from_hashes(self):
+        old, new = create_model(), create_model(name="Changed")
+        hashers = ContentHasher(5, ("Name",)), ContentHasher(5, ("Name",))
+        assert hashers[0].hash_instance(old.by_id(WALL_GUID)) == hashers[1].hash_instance(new.by_id(WALL_GUID))
+
+    def test_memoising_hashes_of_shared_instances(self):
+        ifc_file = create_model()
+        hasher = ContentHasher(5)
+        hasher.hash_instance(ifc_file.by_id(WALL_GUID))
+        hashed = len(hasher.hashes)
+        origin = ifc_file.by_type("IfcAxis2Placement3D")[0]
+        assert origin.id() in hasher.hashes
+        hasher.hash_instance(ifc_file.by_type("IfcGeometricRepresentationContext")[0])
+        assert len(hasher.hashes) == hashed
@@ -19,6 +19,7 @@
 import datetime
 import ifcopenshell
 import ifcopenshell.util.fm
+import ifcopenshell.util.element
 import ifcopenshell.util.selector
 import ifcopenshell.util.date
 import ifcopenshell.util.schema
@@ -73,24 +74,38 @@ class Parser:
         # self.type_assets = self.selector.parse(self.file, type_query)
         # self.component_assets = self.selector.parse(self.file, component_query)
 
-        self.get_contacts()
-        self.get_facilities()
-        self.get_floors()
-        self.get_spaces()
-        self.get_zones()
-        self.get_types()
-        self.get_components()
-        self.get_systems()
-        # self.get_assemblies()
-        # self.get_connections()
-        # self.get_spares()
-        # self.get_resources()
-        # self.get_jobs()
-        # self.get_impacts()
-        self.get_documents()
-        # self.get_attributes()
-        # self.get_coordinates()
-        # self.get_issues()
+        # Relationships and psets of each file are indexed once up front,
+        # rather than walked again for every row.
+        self.indices = {}
+        unindexed_files = []
+        for discipline, ifc in self.files.items():
+            self.indices[discipline] = ifcopenshell.util.fm.ExtractionIndex(ifc)
+            if ifc.pset_index is None:
+                ifcopenshell.util.element.enable_pset_index(ifc)
+                unindexed_files.append(ifc)
+
+        try:
+            self.get_contacts()
+            self.get_facilities()
+            self.get_floors()
+            self.get_spaces()
+            self.get_zones()
+            self.get_types()
+            self.get_components()
+            self.get_systems()
+            # self.get_assemblies()
+            # self.get_connections()
+            # self.get_spares()
+            # self.get_resources()
+            # self.get_jobs()
+            # self.get_impacts()
+            self.get_documents()
+            # self.get_attributes()
+            # self.get_coordinates()
+            # self.get_issues()
+        finally:
+            for ifc in unindexed_files:
+                ifcopenshell.util.element.disable_pset_index(ifc)
 
     def get_contacts(self):
         for element in self.files["arch"].by_type("IfcOrganization"):
@@ -136,7 +151,7 @@ class Parser:
             "AuthorDate": ifcopenshell.util.date.ifc2datetime(
                 self.files["arch"].by_type("IfcProject")[0].OwnerHistory.CreationDate
             ).isoformat(),
-            "Category": self.get_classification(element),
+            "Category": self.get_classification(self.indices["arch"], element),
             "ProjectName": element.Decomposes[0].RelatingObject.Decomposes[0].RelatingObject.Name,
             "SiteName": element.Decomposes[0].RelatingObject.Name,
             "LinearUnits": "millimeters",
@@ -149,10 +164,9 @@ class Parser:
             "ModelBuildingID": element.GlobalId,
         }
 
-    def get_classification(self, element):
-        rel = [r for r in element.HasAssociations or [] if r.is_a("IfcRelAssociatesClassification")]
-        if rel:
-            classification = rel[0].RelatingClassification
+    def get_classification(self, index, element):
+        classification = index.get_classification(element)
+        if classification:
             if getattr(classification, "Identification", None) and getattr(classification, "Name", None):
                 return "{}:{}".format(classification.Identification, classification.Name)
             elif getattr(classification, "ItemReference", None) and getattr(classification, "Name", None):
@@ -329,7 +343,7 @@ class Parser:
                         if space_name not in self.spaces:
                             space_name = None
                 else:
-                    space = element.ContainedInStructure[0].RelatingStructure
+                    space = self.indices[ifc_file].get_containers(element)[0]
                     if space.is_a("IfcSpace"):
                         space_name = space.Name
 
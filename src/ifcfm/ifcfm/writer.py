@@ -17,6 +17,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcFM.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import csv
 
 try:
@@ -33,37 +34,30 @@ except:
     pass  # No ODF support
 
 
-# https://stackoverflow.com/questions/1143671/how-to-sort-objects-by-multiple-keys-in-python
-
-from operator import itemgetter as i
-from functools import cmp_to_key
-
-
-def cmp(x, y):
-    """
-    Replacement for built-in function cmp that was removed in Python 3
-
-    Compare the two objects x and y and return an integer according to
-    the outcome. The return value is negative if x < y, zero if x == y
-    and strictly positive if x > y.
-
-    https://portingguide.readthedocs.io/en/latest/comparisons.html#the-cmp-function
-    """
-
-    try:
-        return (x > y) - (x < y)
-    except:
-        return 0
+def get_sort_key(value):
+    # None, numbers and strings are not comparable with each other, so values are grouped by kind first
+    if value is None:
+        return (0, 0)
+    elif isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
 
 
 def multikeysort(items, columns):
-    comparers = [((i(col[1:].strip()), -1) if col.startswith("-") else (i(col.strip()), 1)) for col in columns]
-
-    def comparer(left, right):
-        comparer_iter = (cmp(fn(left), fn(right)) * mult for fn, mult in comparers)
-        return next((result for result in comparer_iter if result), 0)
+    """Sorts dictionaries by multiple columns
 
-    return sorted(items, key=cmp_to_key(comparer))
+    Columns prefixed with "-" are sorted in descending order. Sort keys are
+    computed once per item and column, rather than once per comparison.
+    """
+    items = list(items)
+    # Stable sorts from the least to the most significant column
+    for column in reversed(columns):
+        is_descending = column.startswith("-")
+        name = column[1:].strip() if is_descending else column.strip()
+        keys = [get_sort_key(item[name]) for item in items]
+        order = sorted(range(len(items)), key=keys.__getitem__, reverse=is_descending)
+        items = [items[i] for i in order]
+    return items
 
 
 class Writer:
@@ -502,14 +496,16 @@ class Writer:
         # )
 
     def write_data(self, sheet, data, fieldnames, colours, sort_fields, custom_data={}):
-        self.sheet_data[sheet] = {"headers": fieldnames + list(custom_data.keys()), "colours": colours, "rows": []}
-        for row in multikeysort(list(data.values()), sort_fields):
-            values = []
-            for fieldname in fieldnames:
-                values.append(row[fieldname])
-            for fieldname in custom_data.keys():
-                values.append(row[fieldname])
-            self.sheet_data[sheet]["rows"].append(values)
+        # Rows are generated lazily, so only the sheet currently being written is held in memory
+        self.sheet_data[sheet] = {
+            "headers": fieldnames + list(custom_data.keys()),
+            "colours": colours,
+            "rows": self.get_rows(data, fieldnames + list(custom_data.keys()), sort_fields),
+        }
+
+    def get_rows(self, data, fieldnames, sort_fields):
+        for row in multikeysort(data.values(), sort_fields):
+            yield [row[fieldname] for fieldname in fieldnames]
 
 
 class CsvWriter(Writer):
@@ -526,7 +522,8 @@ class CsvWriter(Writer):
 class XlsWriter(Writer):
     def write(self):
         super().write()
-        self.workbook = Workbook(self.filename + ".xlsx")
+        # Rows are flushed to disk as they are written, as each sheet is written in row order
+        self.workbook = Workbook(self.filename + ".xlsx", {"constant_memory": True})
 
         self.cell_formats = {}
         for key, value in self.colours.items():
@@ -539,23 +536,12 @@ class XlsWriter(Writer):
 
     def write_worksheet(self, name):
         worksheet = self.workbook.add_worksheet(name)
-        r = 0
-        c = 0
-        for header in self.sheet_data[name]["headers"]:
-            cell = worksheet.write(r, c, header, self.cell_formats["s"])
-            c += 1
-        c = 0
-        r += 1
-        for row in self.sheet_data[name]["rows"]:
-            c = 0
-            for col in row:
-                if c >= len(self.sheet_data[name]["colours"]):
-                    cell_format = "p"
-                else:
-                    cell_format = self.sheet_data[name]["colours"][c]
-                cell = worksheet.write(r, c, col, self.cell_formats[cell_format])
-                c += 1
-            r += 1
+        worksheet.write_row(0, 0, self.sheet_data[name]["headers"], self.cell_formats["s"])
+        colours = self.sheet_data[name]["colours"]
+        for r, row in enumerate(self.sheet_data[name]["rows"], 1):
+            for c, col in enumerate(row):
+                cell_format = colours[c] if c < len(colours) else "p"
+                worksheet.write(r, c, col, self.cell_formats[cell_format])
 
 
 class OdsWriter(Writer):
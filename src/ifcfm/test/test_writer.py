@@ -0,0 +1,67 @@
+from ifcfm.writer import Writer, multikeysort
+
+
+def get_names(items):
+    return [item["Name"] for item in items]
+
+
+class TestMultikeysort:
+    def test_sorting_by_a_column(self):
+        items = [{"Name": "b"}, {"Name": "c"}, {"Name": "a"}]
+        assert get_names(multikeysort(items, ["Name"])) == ["a", "b", "c"]
+        assert get_names(multikeysort(items, ["-Name"])) == ["c", "b", "a"]
+
+    def test_sorting_by_multiple_columns(self):
+        items = [
+            {"Name": "a", "Category": "y", "Level": 1},
+            {"Name": "b", "Category": "x", "Level": 2},
+            {"Name": "c", "Category": "y", "Level": 2},
+            {"Name": "d", "Category": "x", "Level": 1},
+        ]
+        assert get_names(multikeysort(items, ["Category", "Level"])) == ["d", "b", "a", "c"]
+        assert get_names(multikeysort(items, ["Category", "-Level"])) == ["b", "d", "c", "a"]
+        assert get_names(multikeysort(items, ["-Level", " Category "])) == ["b", "c", "d", "a"]
+
+    def test_grouping_values_of_mixed_types(self):
+        items = [
+            {"Name": "a", "Value": "10"},
+            {"Name": "b", "Value": 2},
+            {"Name": "c", "Value": None},
+            {"Name": "d", "Value": 10.5},
+            {"Name": "e", "Value": "9"},
+            {"Name": "f", "Value": True},
+        ]
+        # None sorts first, then numbers by value, then everything else by its string
+        assert get_names(multikeysort(items, ["Value"])) == ["c", "f", "b", "d", "a", "e"]
+        assert get_names(multikeysort(items, ["-Value"])) == ["e", "a", "d", "b", "f", "c"]
+
+    def test_keeping_the_order_of_equal_values(self):
+        items = [
+            {"Name": "a", "Value": 1},
+            {"Name": "b", "Value": 2},
+            {"Name": "c", "Value": 1},
+            {"Name": "d", "Value": 2},
+            {"Name": "e", "Value": None},
+            {"Name": "f", "Value": None},
+        ]
+        assert get_names(multikeysort(items, ["Value"])) == ["e", "f", "a", "c", "b", "d"]
+        assert get_names(multikeysort(items, ["-Value"])) == ["b", "d", "a", "c", "e", "f"]
+
+    def test_sorting_any_iterable_without_modifying_it(self):
+        items = {"b": {"Name": "b"}, "a": {"Name": "a"}}
+        assert get_names(multikeysort(items.values(), ["Name"])) == ["a", "b"]
+        assert list(items) == ["b", "a"]
+        assert multikeysort([], ["Name"]) == []
+
+
+class TestWriter:
+    def test_writing_rows_in_sorted_order(self):
+        writer = Writer(None)
+        data = {
+            "b": {"Name": "b", "Category": "x", "Value": None},
+            "a": {"Name": "a", "Category": "y", "Value": 1},
+            "c": {"Name": "c", "Category": "x", "Value": 2},
+        }
+        writer.write_data("Sheet", data, ["Name", "Value"], "rr", ["Category", "-Name"])
+        assert writer.sheet_data["Sheet"]["headers"] == ["Name", "Value"]
+        assert list(writer.sheet_data["Sheet"]["rows"]) == [["c", 2], ["b", None], ["a", 1]]
@@ -105,6 +105,7 @@ namespace IfcGeom
             : settings_(WELD_VERTICES) // OR options that default to true here
             , deflection_tolerance_(1.e-3)
 			, angular_tolerance_(0.5)
+			, force_space_transparency_(-1.)
         {
         }
 
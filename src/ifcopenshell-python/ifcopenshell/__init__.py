@@ -21,8 +21,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import io
 import os
 import sys
+import zipfile
+import mmap as mmap_module
 
 if hasattr(os, "uname"):
     platform_system = os.uname()[0].lower()
@@ -67,8 +70,43 @@ class SchemaError(Error):
     pass
 
 
-def open(fn):
-    f = ifcopenshell_wrapper.open(os.path.abspath(fn))
+def open(fn, mmap=False, lazy=True, threads=1):
+    """Opens an IFC-SPF, ifcXML, or IFC-ZIP file
+
+    An IFC-ZIP file is decompressed into memory and parsed from there,
+    without extracting it to disk. The format is chosen by the extension,
+    being .ifcxml for ifcXML, .ifczip for IFC-ZIP, and IFC-SPF otherwise.
+
+    :param fn: The filepath of the IFC file
+    :type fn: string
+    :param mmap: If true, the file is memory mapped instead of read into
+        memory, so that only the parts of it which are parsed are paged in.
+        Only applies to IFC-SPF files.
+    :type mmap: bool
+    :param lazy: If true, the attributes of an instance are only parsed
+        when the instance is first used, instead of when the file is opened.
+    :type lazy: bool
+    :param threads: The number of threads used to parse an IFC-SPF file.
+        Large files are split into chunks of whole instances which are
+        parsed in parallel. The result is identical to parsing on one thread.
+    :type threads: int
+    :returns: The opened IFC file
+    :rtype: ifcopenshell.file.file
+    """
+    extension = os.path.splitext(fn)[1].lower()
+    if extension == ".ifczip":
+        name, buffer = read_zip(fn)
+        if name.lower().endswith(".ifcxml"):
+            return open_ifcxml(ifcopenshell_wrapper.read_ifcxml_buffer(buffer))
+        f = ifcopenshell_wrapper.read_buffer(buffer, lazy, threads)
+    elif extension == ".ifcxml":
+        return open_ifcxml(ifcopenshell_wrapper.parse_ifcxml(os.path.abspath(fn)))
+    elif mmap:
+        with io.open(fn, "rb") as source:
+            buffer = mmap_module.mmap(source.fileno(), 0, access=mmap_module.ACCESS_READ)
+        f = ifcopenshell_wrapper.read_buffer(buffer, lazy, threads)
+    else:
+        f = ifcopenshell_wrapper.open(os.path.abspath(fn), lazy, threads)
     if f.good():
         return file(f)
     else:
@@ -83,6 +121,39 @@ def open(fn):
         raise exc(msg)
 
 
+def read_zip(fn):
+    """Decompresses the IFC-SPF or ifcXML file in an IFC-ZIP file into memory
+
+    :param fn: The filepath of the IFC-ZIP file
+    :type fn: string
+    :returns: A tuple of the name of the decompressed file and its contents
+    :rtype: tuple[str, bytearray]
+    """
+    with zipfile.ZipFile(fn) as archive:
+        for info in archive.infolist():
+            if info.filename.lower().endswith((".ifc", ".ifcxml")):
+                break
+        else:
+            raise Error("No IFC or ifcXML file found in %s" % fn)
+        # Decompressed into a single preallocated buffer, which is parsed in place
+        buffer = bytearray(info.file_size)
+        view = memoryview(buffer)
+        position = 0
+        with archive.open(info) as member:
+            while position < info.file_size:
+                size = member.readinto(view[position:])
+                if not size:
+                    break
+                position += size
+        return info.filename, buffer
+
+
+def open_ifcxml(f):
+    if f is None:
+        raise Error("Unable to parse ifcXML")
+    return file(f)
+
+
 def create_entity(type, schema="IFC4", *args, **kwargs):
     e = entity_instance((schema, type))
     attrs = list(enumerate(args)) + [(e.wrapped_data.get_argument_index(name), arg) for name, arg in kwargs.items()]
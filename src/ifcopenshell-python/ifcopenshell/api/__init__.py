@@ -99,6 +99,54 @@ def remove_all_listeners():
     post_listeners.clear()
 
 
+def get_invalidated_ids(ifc_file, ids):
+    """Get the ids of definitions whose module Data is affected by changes
+
+    Module Data is cached by the id of an object, type, material or profile
+    definition. A change to any other instance, such as a property or a
+    point of a representation, affects the definitions which reference it,
+    either directly or through relationships. Instances which no longer
+    exist are returned as is, as they may have been cached before deletion.
+
+    :param ifc_file: The IFC file after the changes, e.g. after an undo
+    :type ifc_file: ifcopenshell.file.file
+    :param ids: The ids of changed instances, as returned by the undo() and
+        redo() methods of the file
+    :type ids: set[int]
+    :returns: The ids to pass to the invalidate() method of module Data
+    :rtype: set[int]
+    """
+    definition_classes = ("IfcObjectDefinition", "IfcMaterialDefinition", "IfcProfileDef")
+    results = set()
+    visited = set()
+    queue = list(ids)
+    while queue:
+        element_id = queue.pop()
+        if element_id in visited:
+            continue
+        visited.add(element_id)
+        try:
+            element = ifc_file.by_id(element_id)
+        except RuntimeError:
+            results.add(element_id)
+            continue
+        if any(element.is_a(c) for c in definition_classes):
+            results.add(element_id)
+            if element.is_a("IfcObjectDefinition"):
+                continue
+        elif element.is_a("IfcRelationship"):
+            for attribute in element:
+                references = attribute if isinstance(attribute, tuple) else (attribute,)
+                for reference in references:
+                    if isinstance(reference, ifcopenshell.entity_instance) and any(
+                        reference.is_a(c) for c in definition_classes
+                    ):
+                        results.add(reference.id())
+            continue
+        queue.extend(inverse.id() for inverse in ifc_file.get_inverse(element))
+    return results
+
+
 def extract_docs(module, usecase):
     import typing
     import inspect
@@ -5,6 +5,11 @@ class Data:
     def purge(cls):
         cls.products = {}
 
+    @classmethod
+    def invalidate(cls, ids):
+        for product_id in ids:
+            cls.products.pop(product_id, None)
+
     @classmethod
     def load(cls, file, product_id):
         if not file:
@@ -9,6 +9,11 @@ class Data:
     def purge(cls):
         cls.products = {}
 
+    @classmethod
+    def invalidate(cls, ids):
+        for product_id in ids:
+            cls.products.pop(product_id, None)
+
     @classmethod
     def load(cls, file, product_id):
         if not file:
@@ -16,6 +16,12 @@ class Data:
         cls.references = {}
         cls.information = {}
 
+    @classmethod
+    def invalidate(cls, ids):
+        for product_id in ids:
+            cls.products.pop(product_id, None)
+        cls.is_loaded = False
+
     @classmethod
     def load(cls, file, product_id=None):
         cls._file = file
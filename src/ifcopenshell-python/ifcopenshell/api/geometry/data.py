@@ -7,6 +7,20 @@ class Data:
         cls.products = {}
         cls.representations = {}
 
+    @classmethod
+    def invalidate(cls, ids):
+        rep_ids = set()
+        for product_id in ids:
+            rep_ids.update(cls.products.pop(product_id, None) or [])
+        if not rep_ids:
+            return
+        # Representations may be shared, so other products listing them are reloaded too
+        for product_id, product_rep_ids in list(cls.products.items()):
+            if not rep_ids.isdisjoint(product_rep_ids):
+                del cls.products[product_id]
+        for rep_id in rep_ids:
+            cls.representations.pop(rep_id, None)
+
     @classmethod
     def load(cls, file, product_id):
         if not file:
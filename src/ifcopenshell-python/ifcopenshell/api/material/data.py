@@ -32,6 +32,12 @@ class Data:
         cls.products = {}
         cls._file = None
 
+    @classmethod
+    def invalidate(cls, ids):
+        for product_id in ids:
+            cls.products.pop(product_id, None)
+        cls.is_loaded = False
+
     @classmethod
     def load(cls, file, product_id=None):
         cls._file = file
@@ -34,6 +34,7 @@ class Usecase:
                     "RelatingPropertyDefinition": pset,
                 }
             )
+            self.update_pset_index()
             return pset
         elif self.settings["product"].is_a("IfcTypeObject"):
             for definition in self.settings["product"].HasPropertySets or []:
@@ -51,28 +52,37 @@ class Usecase:
             has_property_sets = list(self.settings["product"].HasPropertySets or [])
             has_property_sets.append(pset)
             self.settings["product"].HasPropertySets = has_property_sets
+            self.update_pset_index()
             return pset
         elif self.settings["product"].is_a("IfcMaterialDefinition"):
             for definition in self.settings["product"].HasProperties or []:
                 if definition.Name == self.settings["name"]:
                     return definition
 
-            return self.file.create_entity(
+            pset = self.file.create_entity(
                 "IfcMaterialProperties",
                 **{
                     "Name": self.settings["name"],
                     "Material": self.settings["product"],
                 }
             )
+            self.update_pset_index()
+            return pset
         elif self.settings["product"].is_a("IfcProfileDef"):
             for definition in self.settings["product"].HasProperties or []:
                 if definition.Name == self.settings["name"]:
                     return definition
 
-            return self.file.create_entity(
+            pset = self.file.create_entity(
                 "IfcProfileProperties",
                 **{
                     "Name": self.settings["name"],
                     "ProfileDefinition": self.settings["product"],
                 }
             )
+            self.update_pset_index()
+            return pset
+
+    def update_pset_index(self):
+        if self.file.pset_index:
+            self.file.pset_index.invalidate_element(self.settings["product"])
@@ -35,4 +35,9 @@ class Usecase:
                     "RelatingPropertyDefinition": qto,
                 }
             )
+            self.update_pset_index()
             return qto
+
+    def update_pset_index(self):
+        if self.file.pset_index:
+            self.file.pset_index.invalidate_element(self.settings["product"])
@@ -16,6 +16,24 @@ class Data:
         cls.qtos = {}
         cls.properties = {}
 
+    @classmethod
+    def invalidate(cls, ids):
+        pset_ids = set()
+        for product_id in ids:
+            product = cls.products.pop(product_id, None)
+            if product:
+                pset_ids.update(product["psets"])
+                pset_ids.update(product["qtos"])
+        if not pset_ids:
+            return
+        # Psets may be shared, so other products listing them are reloaded too
+        for product_id, product in list(cls.products.items()):
+            if not pset_ids.isdisjoint(product["psets"]) or not pset_ids.isdisjoint(product["qtos"]):
+                del cls.products[product_id]
+        for pset_id in pset_ids:
+            cls.psets.pop(pset_id, None)
+            cls.qtos.pop(pset_id, None)
+
     @classmethod
     def load(cls, file, product_id):
         if not file:
@@ -15,6 +15,8 @@ class Usecase:
         self.update_existing_properties()
         new_properties = self.add_new_properties()
         self.extend_pset_with_new_properties(new_properties)
+        if self.file.pset_index:
+            self.file.pset_index.invalidate_definition(self.settings["pset"])
 
     def update_pset_name(self):
         if self.settings["name"]:
@@ -14,6 +14,8 @@ class Usecase:
         self.update_existing_properties()
         new_properties = self.add_new_properties()
         self.extend_qto_with_new_properties(new_properties)
+        if self.file.pset_index:
+            self.file.pset_index.invalidate_definition(self.settings["qto"])
 
     def update_qto_name(self):
         if self.settings["name"]:
@@ -6,6 +6,8 @@ class Usecase:
             self.settings[key] = value
 
     def execute(self):
+        if self.file.pset_index:
+            self.file.pset_index.invalidate_definition(self.settings["pset"])
         to_purge = []
         should_remove_pset = True
         for inverse in self.file.get_inverse(self.settings["pset"]):
@@ -21,4 +23,6 @@ class Usecase:
             self.file.remove(self.settings["pset"])
         for element in to_purge:
             self.file.remove(element)
+        if self.file.pset_index:
+            self.file.pset_index.invalidate_element(self.settings["product"])
         # TODO: implement deep purging
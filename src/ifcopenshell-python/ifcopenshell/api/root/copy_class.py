@@ -13,6 +13,8 @@ class Usecase:
         result = ifcopenshell.util.element.copy(self.file, self.settings["product"])
         self.copy_direct_attributes(result)
         self.copy_indirect_attributes(self.settings["product"], result)
+        if self.file.pset_index:
+            self.file.pset_index.invalidate_element(result)
         return result
 
     def copy_direct_attributes(self, to_element):
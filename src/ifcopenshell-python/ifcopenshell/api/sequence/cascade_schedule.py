@@ -12,11 +12,51 @@ class Usecase:
 
     def execute(self):
         self.calendar_cache = {}
-        self.cascade_task(self.settings["task"], is_first_task=True)
+        self.working_day_tables = {}
+        # Each task is rescheduled at most once, after all of its predecessors,
+        # and only if the first task or one of its predecessors has changed
+        changed_tasks = set()
+        for task in self.get_successors_in_order(self.settings["task"]):
+            if task == self.settings["task"]:
+                is_changed = self.cascade_task(task, is_first_task=True)
+            elif any(rel.RelatingProcess.id() in changed_tasks for rel in task.IsSuccessorFrom):
+                is_changed = self.cascade_task(task)
+            else:
+                continue
+            if is_changed:
+                changed_tasks.add(task.id())
+
+    def get_successors_in_order(self, task):
+        successors = {task.id(): task}
+        queue = [task]
+        while queue:
+            for rel in queue.pop().IsPredecessorTo:
+                if rel.RelatedProcess.id() not in successors:
+                    successors[rel.RelatedProcess.id()] = rel.RelatedProcess
+                    queue.append(rel.RelatedProcess)
+
+        # Kahn's algorithm, where tasks in a cycle which does not pass through the first task are never reached
+        in_degrees = {
+            ifc_definition_id: sum(1 for rel in successor.IsSuccessorFrom if rel.RelatingProcess.id() in successors)
+            for ifc_definition_id, successor in successors.items()
+        }
+        in_degrees[task.id()] = 0
+        results = []
+        queue = [task]
+        while queue:
+            results.append(queue.pop())
+            for rel in results[-1].IsPredecessorTo:
+                successor = rel.RelatedProcess
+                if successor.id() == task.id():
+                    continue
+                in_degrees[successor.id()] -= 1
+                if not in_degrees[successor.id()]:
+                    queue.append(successor)
+        return results
 
     def cascade_task(self, task, is_first_task=False):
         if not task.TaskTime:
-            return
+            return False
 
         duration = (
             ifcopenshell.util.date.ifc2datetime(task.TaskTime.ScheduleDuration)
@@ -78,7 +118,7 @@ class Usecase:
             start = max(starts)
             finish = max(finishes)
             potential_finish = datetime.datetime.combine(
-                ifcopenshell.util.sequence.get_finish_date(
+                self.get_finish_date(
                     start,
                     duration,
                     task.TaskTime.DurationType,
@@ -89,16 +129,16 @@ class Usecase:
             if potential_finish > finish:
                 start_ifc = ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime")
                 if task.TaskTime.ScheduleStart == start_ifc and not is_first_task:
-                    return
+                    return False
                 task.TaskTime.ScheduleStart = start_ifc
                 task.TaskTime.ScheduleFinish = ifcopenshell.util.date.datetime2ifc(potential_finish, "IfcDateTime")
             else:
                 finish_ifc = ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime")
                 if task.TaskTime.ScheduleFinish == finish_ifc and not is_first_task:
-                    return
+                    return False
                 task.TaskTime.ScheduleFinish = finish_ifc
                 task.TaskTime.ScheduleStart = ifcopenshell.util.date.datetime2ifc(
-                    ifcopenshell.util.sequence.get_finish_date(
+                    self.get_finish_date(
                         finish,
                         -duration,
                         task.TaskTime.DurationType,
@@ -110,10 +150,10 @@ class Usecase:
             finish = max(finishes)
             finish_ifc = ifcopenshell.util.date.datetime2ifc(finish, "IfcDateTime")
             if task.TaskTime.ScheduleFinish == finish_ifc and not is_first_task:
-                return
+                return False
             task.TaskTime.ScheduleFinish = finish_ifc
             task.TaskTime.ScheduleStart = ifcopenshell.util.date.datetime2ifc(
-                ifcopenshell.util.sequence.get_finish_date(
+                self.get_finish_date(
                     finish,
                     -duration,
                     task.TaskTime.DurationType,
@@ -125,10 +165,10 @@ class Usecase:
             start = max(starts)
             start_ifc = ifcopenshell.util.date.datetime2ifc(start, "IfcDateTime")
             if task.TaskTime.ScheduleStart == start_ifc and not is_first_task:
-                return
+                return False
             task.TaskTime.ScheduleStart = start_ifc
             task.TaskTime.ScheduleFinish = ifcopenshell.util.date.datetime2ifc(
-                ifcopenshell.util.sequence.get_finish_date(
+                self.get_finish_date(
                     start,
                     duration,
                     task.TaskTime.DurationType,
@@ -136,9 +176,7 @@ class Usecase:
                 ),
                 "IfcDateTime",
             )
-
-        for rel in task.IsPredecessorTo:
-            self.cascade_task(rel.RelatedProcess)
+        return True
 
     def get_lag_time_days(self, lag_time):
         return ifcopenshell.util.date.ifc2datetime(lag_time.LagValue.wrappedValue).days
@@ -148,9 +186,17 @@ class Usecase:
             self.calendar_cache[task.id()] = ifcopenshell.util.sequence.derive_calendar(task)
         return self.calendar_cache[task.id()]
 
+    def get_finish_date(self, start, duration, duration_type, calendar):
+        if duration_type == "ELAPSEDTIME" or not calendar:
+            return datetime.date(start.year, start.month, start.day) + datetime.timedelta(days=duration.days)
+        table = self.working_day_tables.get(calendar)
+        if table is None:
+            table = self.working_day_tables[calendar] = ifcopenshell.util.sequence.WorkingDayTable(calendar)
+        return table.get_finish_date(start, duration.days)
+
     def offset_date(self, date, days, duration_type, calendar):
         return datetime.datetime.combine(
-            ifcopenshell.util.sequence.get_finish_date(date, datetime.timedelta(days=days), duration_type, calendar),
+            self.get_finish_date(date, datetime.timedelta(days=days), duration_type, calendar),
             datetime.datetime.min.time(),
         )
 
@@ -16,23 +16,16 @@ class Usecase:
         # The method implemented is the same as shown here:
         # https://www.youtube.com/watch?v=qTErIV6OqLg
         self.start_dates = []
+        self.working_day_tables = {}
         self.build_network_graph()
 
-        self.pending_nodes = set(self.g.nodes)
-        while self.pending_nodes:
-            remaining_nodes = set()
-            for pending_node in self.pending_nodes:
-                if not self.forward_pass(pending_node):
-                    remaining_nodes.add(pending_node)
-            self.pending_nodes = remaining_nodes
-
-        self.pending_nodes = set(self.g.nodes)
-        while self.pending_nodes:
-            remaining_nodes = set()
-            for pending_node in self.pending_nodes:
-                if not self.backward_pass(pending_node):
-                    remaining_nodes.add(pending_node)
-            self.pending_nodes = remaining_nodes
+        # Visiting nodes in topological order guarantees that all predecessors
+        # (or successors, going backwards) are resolved, so each pass is linear
+        nodes = list(nx.topological_sort(self.g))
+        for node in nodes:
+            self.forward_pass(node)
+        for node in reversed(nodes):
+            self.backward_pass(node)
 
         self.update_task_times()
 
@@ -109,25 +102,35 @@ class Usecase:
             data = self.g.nodes[ifc_definition_id]
             if not data["duration"]:
                 continue
-            ifcopenshell.api.run(
-                "sequence.edit_task_time",
-                self.file,
-                task_time=self.file.by_id(ifc_definition_id).TaskTime,
-                attributes={
-                    "FreeFloat": ifcopenshell.util.date.datetime2ifc(data["free_float"], "IfcDuration"),
-                    "TotalFloat": ifcopenshell.util.date.datetime2ifc(data["total_float"], "IfcDuration"),
-                    "IsCritical": data["total_float"].days == 0,
-                    "EarlyStart": ifcopenshell.util.date.datetime2ifc(data["early_start"], "IfcDateTime"),
-                    "EarlyFinish": ifcopenshell.util.date.datetime2ifc(data["early_finish"], "IfcDateTime"),
-                    "LateStart": ifcopenshell.util.date.datetime2ifc(data["late_start"], "IfcDateTime"),
-                    "LateFinish": ifcopenshell.util.date.datetime2ifc(data["late_finish"], "IfcDateTime"),
-                },
-            )
+            task_time = self.file.by_id(ifc_definition_id).TaskTime
+            attributes = {
+                "FreeFloat": ifcopenshell.util.date.datetime2ifc(data["free_float"], "IfcDuration"),
+                "TotalFloat": ifcopenshell.util.date.datetime2ifc(data["total_float"], "IfcDuration"),
+                "IsCritical": data["total_float"].days == 0,
+                "EarlyStart": ifcopenshell.util.date.datetime2ifc(data["early_start"], "IfcDateTime"),
+                "EarlyFinish": ifcopenshell.util.date.datetime2ifc(data["early_finish"], "IfcDateTime"),
+                "LateStart": ifcopenshell.util.date.datetime2ifc(data["late_start"], "IfcDateTime"),
+                "LateFinish": ifcopenshell.util.date.datetime2ifc(data["late_finish"], "IfcDateTime"),
+            }
+            attributes = {k: v for k, v in attributes.items() if getattr(task_time, k) != v}
+            if attributes:
+                ifcopenshell.api.run("sequence.edit_task_time", self.file, task_time=task_time, attributes=attributes)
+
+    def get_working_day_table(self, calendar):
+        table = self.working_day_tables.get(calendar)
+        if table is None:
+            table = self.working_day_tables[calendar] = ifcopenshell.util.sequence.WorkingDayTable(calendar)
+        return table
 
     def offset_date(self, date, days, node):
-        return ifcopenshell.util.sequence.get_finish_date(
-            date, datetime.timedelta(days=days), node["duration_type"], node["calendar"]
-        )
+        if node["duration_type"] == "ELAPSEDTIME" or not node["calendar"]:
+            return datetime.date(date.year, date.month, date.day) + datetime.timedelta(days=days)
+        return self.get_working_day_table(node["calendar"]).get_finish_date(date, days)
+
+    def count_working_days(self, start, finish, calendar):
+        if not calendar:
+            return max(finish.toordinal() - start.toordinal(), 0)
+        return self.get_working_day_table(calendar).count_working_days(start, finish)
 
     def forward_pass(self, node):
         successors = self.g.successors(node)
@@ -290,9 +293,7 @@ class Usecase:
 
         if data["duration_type"] == "WORKTIME":
             data["total_float"] = datetime.timedelta(
-                days=ifcopenshell.util.sequence.count_working_days(
-                    data["early_finish"], data["late_finish"], data["calendar"]
-                )
+                days=self.count_working_days(data["early_finish"], data["late_finish"], data["calendar"])
             )
         else:
             data["total_float"] = data["late_finish"] - data["early_finish"]
@@ -313,8 +314,6 @@ class Usecase:
             )
         if predecessor_data["duration_type"] == "WORKTIME":
             return datetime.timedelta(
-                days=ifcopenshell.util.sequence.count_working_days(
-                    predecessor_date, min_successor_date, predecessor_data["calendar"]
-                )
+                days=self.count_working_days(predecessor_date, min_successor_date, predecessor_data["calendar"])
             )
         return min_successor_date - predecessor_date
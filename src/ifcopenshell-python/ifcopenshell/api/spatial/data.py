@@ -7,6 +7,13 @@ class Data:
         cls.products = {}
         cls.spatial_elements = {}
 
+    @classmethod
+    def invalidate(cls, ids):
+        for product_id in ids:
+            cls.products.pop(product_id, None)
+        # Spatial elements are loaded together, and new ones may not be cached yet
+        cls.spatial_elements = {}
+
     @classmethod
     def load(cls, file, product_id=None):
         if product_id:
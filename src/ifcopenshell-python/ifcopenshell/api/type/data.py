@@ -7,6 +7,12 @@ class Data:
         cls.products = {}
         cls.types = {}
 
+    @classmethod
+    def invalidate(cls, ids):
+        for product_id in ids:
+            cls.products.pop(product_id, None)
+            cls.types.pop(product_id, None)
+
     @classmethod
     def load(cls, file, product_id):
         if not file:
@@ -9,6 +9,18 @@ class Data:
         cls.openings = {}
         cls.fillings = {}
 
+    @classmethod
+    def invalidate(cls, ids):
+        for product_id in ids:
+            opening_ids = set(cls.products.pop(product_id, None) or [])
+            opening_ids.add(product_id)
+            for opening_id in opening_ids:
+                opening = cls.openings.pop(opening_id, None)
+                # Fillings refer to their opening, so they are reloaded with it
+                for filling_id in opening["HasFillings"] if opening else []:
+                    cls.fillings.pop(filling_id, None)
+            cls.fillings.pop(product_id, None)
+
     @classmethod
     def load(cls, file, product_id):
         if not file:
@@ -24,6 +24,7 @@ from __future__ import print_function
 import functools
 import numbers
 import itertools
+import collections
 
 from . import ifcopenshell_wrapper
 
@@ -33,6 +34,53 @@ except ImportError as e:
     logging = type("logger", (object,), {"exception": staticmethod(lambda s: print(s))})
 
 
+INVALID, FORWARD, INVERSE = range(3)
+
+attribute_descriptor = collections.namedtuple(
+    "attribute_descriptor", ("name", "category", "index", "type", "setter", "is_aggregate", "is_entity")
+)
+
+# Attribute lookups only depend on the (schema, entity) declaration of an
+# instance, so they are resolved once and shared by all its instances.
+attribute_descriptors = {}
+
+
+def get_attribute_descriptors(e):
+    """Return the cached attribute descriptors for a wrapped instance
+
+    :param e: The wrapped instance
+    :type e: ifcopenshell.ifcopenshell_wrapper.entity_instance
+    :returns: A tuple of a dictionary of attribute name to descriptor and a
+        list of the forward attribute descriptors by index
+    :rtype: tuple
+    """
+    key = e.declaration_pointer()
+    descriptors = attribute_descriptors.get(key)
+    if descriptors is None:
+        by_name = {}
+        by_index = []
+        for index, name in enumerate(e.get_attribute_names()):
+            attr_type = e.get_argument_type(index)
+            setter = attr_type.title().replace(" ", "")
+            setter = setter.replace("Binary", "String")
+            setter = setter.replace("Enumeration", "String")
+            descriptor = attribute_descriptor(
+                name,
+                FORWARD,
+                index,
+                attr_type,
+                None if setter == "Derived" else "setArgumentAs%s" % setter,
+                attr_type.startswith("AGGREGATE") or attr_type == "EMPTY AGGREGATE",
+                attr_type.endswith("ENTITY INSTANCE"),
+            )
+            by_name[name] = descriptor
+            by_index.append(descriptor)
+        for name in e.get_inverse_attribute_names():
+            by_name[name] = attribute_descriptor(name, INVERSE, None, None, None, True, True)
+        descriptors = attribute_descriptors[key] = (by_name, by_index)
+    return descriptors
+
+
 class entity_instance(object):
     """This is the base Python class for all IFC objects.
 
@@ -55,12 +103,13 @@ class entity_instance(object):
         self.wrapped_data.file = file
 
     def __getattr__(self, name):
-        INVALID, FORWARD, INVERSE = range(3)
-        attr_cat = self.wrapped_data.get_attribute_category(name)
+        descriptor = get_attribute_descriptors(self.wrapped_data)[0].get(name)
+        if descriptor is None:
+            attr_cat = INVALID
+        else:
+            attr_cat = descriptor.category
         if attr_cat == FORWARD:
-            return entity_instance.wrap_value(
-                self.wrapped_data.get_argument(self.wrapped_data.get_argument_index(name)), self.wrapped_data.file
-            )
+            return entity_instance.wrap_value(self.wrapped_data.get_argument(descriptor.index), self.wrapped_data.file)
         elif attr_cat == INVERSE:
             return entity_instance.wrap_value(self.wrapped_data.get_inverse(name), self.wrapped_data.file)
         else:
@@ -117,7 +166,11 @@ class entity_instance(object):
         return self.wrapped_data.get_argument_name(attr_idx)
 
     def __setattr__(self, key, value):
-        index = self.wrapped_data.get_argument_index(key)
+        descriptor = get_attribute_descriptors(self.wrapped_data)[0].get(key)
+        if descriptor is not None and descriptor.category == FORWARD:
+            index = descriptor.index
+        else:
+            index = self.wrapped_data.get_argument_index(key)
         self[index] = value
 
     def __getitem__(self, key):
@@ -129,16 +182,13 @@ class entity_instance(object):
         if self.wrapped_data.file and self.wrapped_data.file.transaction:
             self.wrapped_data.file.transaction.store_edit(self, idx, value)
 
-        attr_type = real_attr_type = self.attribute_type(idx).title().replace(" ", "")
-        real_attr_type = real_attr_type.replace("Derived", "None")
-        attr_type = attr_type.replace("Binary", "String")
-        attr_type = attr_type.replace("Enumeration", "String")
+        descriptor = get_attribute_descriptors(self.wrapped_data)[1][idx]
 
         if value is None:
-            if attr_type != "Derived":
+            if descriptor.setter:
                 self.wrapped_data.setArgumentAsNull(idx)
         else:
-            valid = attr_type != "Derived"
+            valid = descriptor.setter is not None
             if valid:
                 try:
                     if isinstance(value, unicode):
@@ -147,19 +197,17 @@ class entity_instance(object):
                     pass
 
                 try:
-                    if attr_type != "Derived":
-                        getattr(self.wrapped_data, "setArgumentAs%s" % attr_type)(
-                            idx, entity_instance.unwrap_value(value)
-                        )
+                    getattr(self.wrapped_data, descriptor.setter)(idx, entity_instance.unwrap_value(value))
                 except BaseException as e:
                     import traceback
+
                     traceback.print_exc()
                     valid = False
 
             if not valid:
+                real_attr_type = descriptor.type.title().replace(" ", "").replace("Derived", "None")
                 raise ValueError(
-                    "Expected %s for attribute %s.%s, got %r"
-                    % (real_attr_type, self.is_a(), self.attribute_name(idx), value)
+                    "Expected %s for attribute %s.%s, got %r" % (real_attr_type, self.is_a(), descriptor.name, value)
                 )
 
         return value
@@ -248,9 +296,10 @@ class entity_instance(object):
                 yield "type", self.is_a()
             except BaseException:
                 logging.exception("unhandled exception while getting id / type info on {}".format(self))
-            for i in range(len(self)):
+            for descriptor in get_attribute_descriptors(self.wrapped_data)[1]:
+                i = descriptor.index
                 try:
-                    if self.wrapped_data.get_attribute_names()[i] in ignore:
+                    if descriptor.name in ignore:
                         continue
                     attr_value = self[i]
                     if recursive:
@@ -271,7 +320,7 @@ class entity_instance(object):
                             )
 
                         attr_value = entity_instance.walk(is_instance, get_info_, attr_value)
-                    yield self.attribute_name(i), attr_value
+                    yield descriptor.name, attr_value
                 except BaseException:
                     logging.exception("unhandled exception occurred setting attribute name for {}".format(self))
 
@@ -21,13 +21,30 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import os
+import sys
+import gzip
+import array
+import pickle
 import numbers
 import functools
+import zipfile
+import tempfile
 import ifcopenshell.util.element
 
 from . import ifcopenshell_wrapper
 from .entity_instance import entity_instance
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 try:
     # Python 2
     basestring
@@ -36,6 +53,22 @@ except NameError:
     basestring = (str, bytes)
 
 
+# Classes whose derived data, such as module Data, is cached by their id
+definition_classes = ("IfcObjectDefinition", "IfcMaterialDefinition", "IfcProfileDef")
+
+
+def get_definition_ids(ifc_file, ids):
+    results = set()
+    for element_id in ids:
+        try:
+            element = ifc_file.by_id(element_id)
+        except RuntimeError:
+            continue
+        if any(element.is_a(c) for c in definition_classes):
+            results.add(element_id)
+    return results
+
+
 class Transaction:
     def __init__(self, ifc_file):
         self.file = ifc_file
@@ -117,6 +150,31 @@ class Transaction:
             inverses[inverse.id()] = inverse_references
         return inverses
 
+    def get_referenced_ids(self, value):
+        if isinstance(value, dict):
+            return {value["id"]} if "id" in value else set()
+        elif isinstance(value, (tuple, list)):
+            return set().union(*(self.get_referenced_ids(v) for v in value))
+        return set()
+
+    def get_affected_ids(self):
+        """Returns the ids of all instances created, edited or deleted, including
+        instances whose references to a deleted instance were removed, and
+        definitions referenced by created or deleted instances, such as the
+        products of a relationship"""
+        ids = set()
+        references = set()
+        for operation in self.operations:
+            if operation["action"] == "edit":
+                ids.add(operation["id"])
+            elif operation["action"] in ("create", "delete"):
+                ids.add(operation["value"]["id"])
+                for key, value in operation["value"].items():
+                    if key != "id":
+                        references.update(self.get_referenced_ids(value))
+            ids.update(operation.get("inverses", {}).keys())
+        return ids | get_definition_ids(self.file, references - ids)
+
     def rollback(self):
         for operation in self.operations[::-1]:
             if operation["action"] == "create":
@@ -170,6 +228,271 @@ class Transaction:
                 pass
 
 
+class CompactTransaction:
+    """A delta-based journal of a transaction, stored as typed arrays
+
+    Each change is recorded as a fixed-size (op, id, attribute index, value)
+    record. Values are encoded into a shared table where strings and
+    instance references are interned, so repeated values only cost an index.
+    Unlike the default Transaction, created and deleted instances are read
+    attribute by attribute from the wrapped data rather than via get_info().
+    """
+
+    CREATE, DELETE, ATTRIBUTE, INVERSE, EDIT, EDIT_NEW, BATCH_INVERSE = range(7)
+
+    class Reference:
+        __slots__ = ("id",)
+
+        def __init__(self, id):
+            self.id = id
+
+        def __getstate__(self):
+            return self.id
+
+        def __setstate__(self, state):
+            self.id = state
+
+    class TypedValue:
+        __slots__ = ("type", "value")
+
+        def __init__(self, type, value):
+            self.type = type
+            self.value = value
+
+        def __getstate__(self):
+            return (self.type, self.value)
+
+        def __setstate__(self, state):
+            self.type, self.value = state
+
+    def __init__(self, ifc_file):
+        self.file = ifc_file
+        self.ops = array.array("B")
+        self.ids = array.array("l")
+        self.indices = array.array("h")
+        self.values = array.array("l")
+        self.value_table = []
+        self.value_bytes = 0
+        self.interned = {}
+        self.references = {}
+        self.spill_file = None
+        self.is_batched = False
+        self.batch_delete_index = 0
+        self.batch_delete_ids = set()
+        self.batch_records = []
+
+    def nbytes(self):
+        """Returns the approximate memory held by the journal in bytes"""
+        if self.spill_file:
+            return 0
+        return sum(a.itemsize * len(a) for a in (self.ops, self.ids, self.indices, self.values)) + self.value_bytes
+
+    def spill(self):
+        """Moves the journal to a temporary file on disk until it is needed"""
+        if self.spill_file or not self.ops:
+            return
+        self.spill_file = tempfile.TemporaryFile()
+        pickle.dump((self.ops, self.ids, self.indices, self.values, self.value_table), self.spill_file, protocol=-1)
+        self.ops, self.ids, self.indices, self.values = (
+            array.array(a.typecode) for a in (self.ops, self.ids, self.indices, self.values)
+        )
+        self.value_table = []
+        self.interned = {}
+        self.references = {}
+
+    def unspill(self):
+        if not self.spill_file:
+            return
+        self.spill_file.seek(0)
+        self.ops, self.ids, self.indices, self.values, self.value_table = pickle.load(self.spill_file)
+        self.spill_file.close()
+        self.spill_file = None
+
+    def encode_value(self, value):
+        if isinstance(value, entity_instance):
+            value = value.wrapped_data
+        if isinstance(value, ifcopenshell_wrapper.entity_instance):
+            eid = value.id()
+            if eid:
+                reference = self.references.get(eid)
+                if reference is None:
+                    reference = self.references[eid] = self.Reference(eid)
+                return reference
+            return self.TypedValue(value.is_a(), self.encode_value(value.get_argument(0)))
+        elif isinstance(value, (tuple, list)):
+            return tuple(self.encode_value(v) for v in value)
+        return value
+
+    def decode_value(self, value):
+        if isinstance(value, self.Reference):
+            return self.file.by_id(value.id)
+        elif isinstance(value, self.TypedValue):
+            return self.file.create_entity(value.type, self.decode_value(value.value))
+        elif isinstance(value, tuple):
+            return tuple(self.decode_value(v) for v in value)
+        return value
+
+    def store_value(self, value):
+        value = self.encode_value(value)
+        if value is None:
+            return -1
+        key = None
+        if isinstance(value, str):
+            key = value
+        elif isinstance(value, self.Reference):
+            key = (self.Reference, value.id)
+        if key is not None:
+            index = self.interned.get(key)
+            if index is not None:
+                return index
+            self.interned[key] = len(self.value_table)
+        self.value_table.append(value)
+        self.value_bytes += sys.getsizeof(value)
+        return len(self.value_table) - 1
+
+    def load_value(self, index):
+        if index == -1:
+            return None
+        return self.decode_value(self.value_table[index])
+
+    def append(self, op, id, index=-1, value=-1):
+        self.ops.append(op)
+        self.ids.append(id)
+        self.indices.append(index)
+        self.values.append(value)
+
+    def store_attributes(self, element):
+        data = element.wrapped_data
+        for i in range(len(data)):
+            self.append(self.ATTRIBUTE, data.id(), i, self.store_value(data.get_argument(i)))
+
+    def batch(self):
+        self.is_batched = True
+        self.batch_delete_index = len(self.ops)
+        self.batch_delete_ids = set()
+        self.batch_records = []
+
+    def unbatch(self):
+        i = self.batch_delete_index
+        for records in self.batch_records:
+            for a, values in zip((self.ops, self.ids, self.indices, self.values), records):
+                a[i:i] = array.array(a.typecode, values)
+        self.is_batched = False
+        self.batch_delete_index = 0
+        self.batch_delete_ids = set()
+        self.batch_records = []
+
+    def store_create(self, element):
+        if element.id():
+            self.append(self.CREATE, element.id(), -1, self.store_value(element.is_a()))
+            self.store_attributes(element)
+
+    def store_edit(self, element, index, value):
+        self.append(self.EDIT, element.id(), index, self.store_value(element.wrapped_data.get_argument(index)))
+        self.append(self.EDIT_NEW, element.id(), index, self.store_value(value))
+
+    def store_delete(self, element):
+        self.append(self.DELETE, element.id(), -1, self.store_value(element.is_a()))
+        self.store_attributes(element)
+        if self.is_batched:
+            if element.id() not in self.batch_delete_ids:
+                records = ([], [], [], [])
+                for inverse_id, index, value in self.get_element_inverses(element):
+                    for values, v in zip(records, (self.BATCH_INVERSE, inverse_id, index, value)):
+                        values.append(v)
+                self.batch_records.append(records)
+            self.batch_delete_ids.add(element.id())
+        else:
+            for inverse_id, index, value in self.get_element_inverses(element):
+                self.append(self.INVERSE, inverse_id, index, value)
+
+    def get_element_inverses(self, element):
+        for inverse in self.file.get_inverse(element):
+            for i, attribute in enumerate(inverse):
+                if ifcopenshell.util.element.has_element_reference(attribute, element):
+                    yield inverse.id(), i, self.store_value(attribute)
+
+    def get_operations(self):
+        """Groups records into operations as (op, id, start, end) tuples"""
+        operations = []
+        continuations = (self.ATTRIBUTE, self.INVERSE, self.EDIT_NEW)
+        for i, op in enumerate(self.ops):
+            if op in continuations:
+                continue
+            if operations:
+                operations[-1][3] = i
+            operations.append([op, self.ids[i], i, len(self.ops)])
+        return operations
+
+    def set_attribute(self, element, index, value):
+        try:
+            element[index] = self.load_value(value)
+        except:
+            # Catch discrepancy where IfcOpenShell creates but doesn't allow editing of invalid values
+            pass
+
+    def recreate(self, start, end):
+        e = self.file.create_entity(self.load_value(self.values[start]), id=self.ids[start])
+        for i in range(start + 1, end):
+            if self.ops[i] == self.ATTRIBUTE:
+                self.set_attribute(e, self.indices[i], self.values[i])
+        return e
+
+    def restore_inverses(self, start, end):
+        for i in range(start, end):
+            if self.ops[i] in (self.INVERSE, self.BATCH_INVERSE):
+                inverse = self.file.by_id(self.ids[i])
+                inverse[self.indices[i]] = self.load_value(self.values[i])
+
+    def get_referenced_ids(self, value):
+        if isinstance(value, self.Reference):
+            return {value.id}
+        elif isinstance(value, tuple):
+            return set().union(*(self.get_referenced_ids(v) for v in value))
+        return set()
+
+    def get_affected_ids(self):
+        """Returns the ids of all instances created, edited or deleted, including
+        instances whose references to a deleted instance were removed, and
+        definitions referenced by created or deleted instances, such as the
+        products of a relationship"""
+        self.unspill()
+        ids = set(self.ids)
+        references = set()
+        for op, value in zip(self.ops, self.values):
+            if op == self.ATTRIBUTE and value != -1:
+                references.update(self.get_referenced_ids(self.value_table[value]))
+        return ids | get_definition_ids(self.file, references - ids)
+
+    def rollback(self):
+        self.unspill()
+        for op, id, start, end in self.get_operations()[::-1]:
+            if op == self.CREATE:
+                element = self.file.by_id(id)
+                if hasattr(element, "GlobalId") and element.GlobalId is None:
+                    # hack, otherwise ifcopenshell gets upset
+                    element.GlobalId = "x"
+                self.file.remove(element)
+            elif op == self.EDIT:
+                self.set_attribute(self.file.by_id(id), self.indices[start], self.values[start])
+            elif op == self.DELETE:
+                self.recreate(start, end)
+                self.restore_inverses(start, end)
+            elif op == self.BATCH_INVERSE:
+                self.restore_inverses(start, end)
+
+    def commit(self):
+        self.unspill()
+        for op, id, start, end in self.get_operations():
+            if op == self.CREATE:
+                self.recreate(start, end)
+            elif op == self.EDIT:
+                element = self.file.by_id(id)
+                element[self.indices[start]] = self.load_value(self.values[start + 1])
+            elif op == self.DELETE:
+                self.file.remove(self.file.by_id(id))
+
+
 class file(object):
     """Base class for containing IFC files.
 
@@ -195,44 +518,115 @@ class file(object):
             args = map(ifcopenshell_wrapper.schema_by_name, args)
             self.wrapped_data = ifcopenshell_wrapper.file(*args)
         self.history_size = 64
+        self.history_memory = None
+        self.history_spill = False
+        self.history_journal = Transaction
         self.history = []
         self.future = []
         self.transaction = None
+        self.pset_index = None
 
     def set_history_size(self, size):
         self.history_size = size
+        self.prune_history()
+
+    def set_history_memory(self, size, spill=False):
+        """Limits the memory used by the undo history
+
+        Only journals which report their size, such as the compact journal,
+        are counted towards the limit.
+
+        :param size: The maximum number of bytes of history kept in memory, or
+            None for no limit.
+        :type size: int|None
+        :param spill: If true, the oldest transactions are moved to temporary
+            files on disk instead of being discarded when over the limit.
+        :type spill: bool
+        """
+        self.history_memory = size
+        self.history_spill = spill
+        self.prune_history()
+
+    def set_history_journal(self, journal):
+        """Chooses how subsequent transactions are recorded for undo and redo
+
+        :param journal: Either "default", which serialises instances into
+            dictionaries, or "compact", which records deltas in typed arrays.
+        :type journal: string
+        """
+        self.history_journal = {"default": Transaction, "compact": CompactTransaction}[journal]
+
+    def prune_history(self):
         while len(self.history) > self.history_size:
             self.history.pop(0)
+        if self.history_memory is None:
+            return
+        total = sum(t.nbytes() for t in self.history if hasattr(t, "nbytes"))
+        # Transactions are only discarded from the start of the history, as
+        # later transactions are deltas from the state left by earlier ones.
+        # The most recent transaction is always kept so that it can be undone.
+        i = 0
+        while total > self.history_memory and i < len(self.history) - 1:
+            transaction = self.history[i]
+            if not hasattr(transaction, "nbytes"):
+                break
+            total -= transaction.nbytes()
+            if self.history_spill and hasattr(transaction, "spill"):
+                transaction.spill()
+                i += 1
+            else:
+                self.history.pop(0)
 
     def begin_transaction(self):
-        self.transaction = Transaction(self)
+        self.transaction = self.history_journal(self)
 
     def end_transaction(self):
         if self.transaction:
             self.history.append(self.transaction)
-            if len(self.history) > self.history_size:
-                self.history.pop(0)
             self.future = []
             self.transaction = None
+            self.prune_history()
 
     def discard_transaction(self):
         if self.transaction:
             self.transaction.rollback()
+            if self.pset_index:
+                self.pset_index.invalidate_ids(self.transaction.get_affected_ids())
         self.transaction = None
 
     def undo(self):
+        """Rolls back the most recent transaction
+
+        :returns: The ids of the instances affected by the transaction, which
+            may be used to invalidate cached data derived from them.
+        :rtype: set[int]
+        """
         if not self.history:
-            return
+            return set()
         transaction = self.history.pop()
         transaction.rollback()
         self.future.append(transaction)
+        ids = transaction.get_affected_ids()
+        if self.pset_index:
+            self.pset_index.invalidate_ids(ids)
+        return ids
 
     def redo(self):
+        """Commits the most recently undone transaction again
+
+        :returns: The ids of the instances affected by the transaction, which
+            may be used to invalidate cached data derived from them.
+        :rtype: set[int]
+        """
         if not self.future:
-            return
+            return set()
         transaction = self.future.pop()
         transaction.commit()
         self.history.append(transaction)
+        ids = transaction.get_affected_ids()
+        if self.pset_index:
+            self.pset_index.invalidate_ids(ids)
+        return ids
 
     def create_entity(self, type, *args, **kwargs):
         """Create a new IFC entity in the file.
@@ -356,6 +750,50 @@ class file(object):
             return [entity_instance(e, self) for e in self.wrapped_data.by_type(type)]
         return [entity_instance(e, self) for e in self.wrapped_data.by_type_excl_subtypes(type)]
 
+    def get_columns(self, type, attributes, include_subtypes=True):
+        """Return the values of attributes of all instances of a class as columns
+
+        The values are read in a single call into the parser, without
+        creating an entity_instance for every element. Referenced instances
+        are represented by their STEP numerical identifier. Values of defined
+        types in selects, such as a NominalValue, are represented as a tuple
+        of their type and value, e.g. ("IfcInteger", 3). If NumPy is
+        available, identifiers, numeric and single reference columns are
+        returned as arrays, where a missing value is NaN for numbers and 0
+        for references. Otherwise, and for all other columns, a list is
+        returned.
+
+        :param type: The case insensitive type of IFC class to return.
+        :type type: string
+        :param attributes: The names of the attributes to return
+        :type attributes: list
+        :param include_subtypes: Whether or not to include subtypes of the IFC class
+        :type include_subtypes: bool
+        :returns: A dictionary of "id" and each attribute name to its column
+        :rtype: dict
+
+        Example::
+
+            columns = ifc_file.get_columns("IfcWall", ["GlobalId", "Name"])
+            print(columns["id"][0], columns["Name"][0])
+            >>> 122 Basic Wall:Interior
+        """
+        ids, columns, types = ifcopenshell_wrapper.get_columns_cpp(
+            self.wrapped_data, type, list(attributes), include_subtypes
+        )
+        result = {"id": ids}
+        for name, column, attr_type in zip(attributes, columns, types):
+            result[name] = column
+        if numpy is None:
+            return result
+        result["id"] = numpy.array(ids, dtype=numpy.int64)
+        for name, column, attr_type in zip(attributes, columns, types):
+            if attr_type in ("INT", "DOUBLE"):
+                result[name] = numpy.array([numpy.nan if v is None else v for v in column], dtype=numpy.float64)
+            elif attr_type == "ENTITY INSTANCE" and all(isinstance(v, numbers.Integral) or v is None for v in column):
+                result[name] = numpy.array([v or 0 for v in column], dtype=numpy.int64)
+        return result
+
     def traverse(self, inst, max_levels=None, breadth_first=False):
         """Get a list of all referenced instances for a particular instance including itself
 
@@ -421,6 +859,114 @@ class file(object):
     def __iter__(self):
         return iter(self[id] for id in self.wrapped_data.entity_names())
 
+    def write(self, path, compression=None, progress=None, chunk_size=10000):
+        """Writes the file as IFC-SPF
+
+        Instances are serialised and written in chunks, so the text of the
+        whole file is never held in memory.
+
+        :param path: The filepath to write to
+        :type path: string
+        :param compression: "zip", "gzip", "zstd", or None. If None, it is
+            chosen by the file extension, being zip for .ifczip, gzip for .gz,
+            zstd for .zst, and uncompressed otherwise.
+        :type compression: string|None
+        :param progress: Called after each chunk with the number of instances
+            written so far and the total number of instances.
+        :type progress: callable|None
+        :param chunk_size: The number of instances serialised at a time
+        :type chunk_size: int
+        :rtype: None
+        """
+        if compression is None:
+            extension = os.path.splitext(path)[1].lower()
+            compression = {".ifczip": "zip", ".gz": "gzip", ".zst": "zstd"}.get(extension)
+        chunks = self.iter_chunks(chunk_size=chunk_size, progress=progress)
+        if compression == "zip":
+            name = os.path.splitext(os.path.basename(path))[0] + ".ifc"
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+                with archive.open(name, "w", force_zip64=True) as f:
+                    for chunk in chunks:
+                        f.write(chunk.encode("utf-8"))
+        elif compression == "gzip":
+            with gzip.open(path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk.encode("utf-8"))
+        elif compression == "zstd":
+            if zstandard is None:
+                raise ImportError("Writing zstd compressed files requires the zstandard package")
+            with open(path, "wb") as raw, zstandard.ZstdCompressor().stream_writer(raw) as f:
+                for chunk in chunks:
+                    f.write(chunk.encode("utf-8"))
+        elif compression:
+            raise ValueError("Unsupported compression: %s" % compression)
+        else:
+            with open(path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk.encode("utf-8"))
+
+    def iter_chunks(self, chunk_size=10000, progress=None):
+        """Yields the IFC-SPF text of the file in chunks
+
+        The first chunk is the header, then each chunk holds the lines of up
+        to chunk_size instances, ordered by id, and the last chunk ends the
+        file. Joined together, the chunks are identical to to_string().
+
+        :param chunk_size: The number of instances serialised at a time
+        :type chunk_size: int
+        :param progress: Called after each chunk with the number of instances
+            serialised so far and the total number of instances.
+        :type progress: callable|None
+        :returns: A generator of strings
+        :rtype: generator
+        """
+        yield self.wrapped_data.header_to_string()
+        ids = sorted(self.wrapped_data.entity_names())
+        for i in range(0, len(ids), chunk_size):
+            yield self.wrapped_data.instances_to_string(ids[i : i + chunk_size])
+            if progress:
+                progress(min(i + chunk_size, len(ids)), len(ids))
+        yield "ENDSEC;\nEND-ISO-10303-21;\n"
+
+    def iter_lines(self):
+        """Yields each serialised instance of the file as a line of IFC-SPF
+
+        :returns: A generator of strings, such as "#1=IFCWALL(...);"
+        :rtype: generator
+
+        Example::
+
+            for line in ifc_file.iter_lines():
+                print(line)
+            >>> #1=IFCPERSON($,$,'Bob',$,$,$,$,$);
+        """
+        chunks = self.iter_chunks()
+        next(chunks)
+        for chunk in chunks:
+            if chunk.startswith("ENDSEC;"):
+                break
+            for line in chunk.splitlines():
+                yield line
+
     @staticmethod
     def from_string(s):
         return file(ifcopenshell_wrapper.read(s))
+
+    @staticmethod
+    def from_bytes(data, lazy=True, threads=1):
+        """Parses an IFC-SPF file from a buffer without copying it
+
+        The buffer is held by the file until the file is freed, and must not
+        be modified while the file is in use.
+
+        :param data: An object supporting the buffer protocol, such as bytes,
+            a memoryview, or an mmap
+        :type data: bytes|memoryview|mmap.mmap
+        :param lazy: If true, the attributes of an instance are only parsed
+            when the instance is first used.
+        :type lazy: bool
+        :param threads: The number of threads used to parse the buffer
+        :type threads: int
+        :rtype: ifcopenshell.file.file
+        """
+        return file(ifcopenshell_wrapper.read_buffer(data, lazy, threads))
@@ -0,0 +1,335 @@
+###############################################################################
+#                                                                             #
+# This file is part of IfcOpenShell.                                          #
+#                                                                             #
+# IfcOpenShell is free software: you can redistribute it and/or modify        #
+# it under the terms of the Lesser GNU General Public License as published by #
+# the Free Software Foundation, either version 3.0 of the License, or         #
+# (at your option) any later version.                                         #
+#                                                                             #
+# IfcOpenShell is distributed in the hope that it will be useful,             #
+# but WITHOUT ANY WARRANTY; without even the implied warranty of              #
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the                #
+# Lesser GNU General Public License for more details.                         #
+#                                                                             #
+# You should have received a copy of the Lesser GNU General Public License    #
+# along with this program. If not, see <http://www.gnu.org/licenses/>.        #
+#                                                                             #
+###############################################################################
+
+"""A persistent tessellation cache shared across files and revisions
+
+Rather than by product GlobalId and representation id, as done by the HDF5
+serializer cache, shapes are keyed by a content hash of everything that
+determines the tessellation of a product: its representation subgraph,
+placement, styles, openings and material, plus the geometry settings and
+the units and representation contexts of its file. An unchanged element in
+a revised or different file therefore reuses the shape tessellated in an
+earlier run.
+
+Example::
+
+    cache = ifcopenshell.geom.cache.cache("geometry.sqlite", max_size=2 ** 30)
+    for shape in ifcopenshell.geom.iterate(settings, ifc_file, num_threads=8, cache=cache):
+        print(shape.guid, len(shape.geometry.verts))
+"""
+
+import json
+import time
+import array
+import sqlite3
+import hashlib
+
+import ifcopenshell
+import ifcopenshell.util.element
+
+
+class content_hasher(object):
+    """Computes hashes of instance subgraphs which are independent of ids
+
+    Every instance is hashed from its class and attribute values, where
+    referenced instances contribute their own hash. Hashes are memoised by
+    id, so shared subgraphs such as profiles and mapped representations are
+    only hashed once per file.
+    """
+
+    def __init__(self):
+        self.digests = {}
+        self.file_digest = None
+
+    def hash_instance(self, inst):
+        if inst is None:
+            return b""
+        if not inst.id():
+            return self.hash_value(inst)
+        digest = self.digests.get(inst.id())
+        if digest is None:
+            h = hashlib.sha1(inst.is_a().encode("utf-8"))
+            for value in inst:
+                h.update(self.hash_value(value))
+            digest = self.digests[inst.id()] = h.digest()
+        return digest
+
+    def hash_file(self, ifc_file):
+        """Hashes what the tessellation of any product in a file depends on
+
+        This is the schema, the units, and the precision and coordinate
+        systems of the representation contexts.
+        """
+        if self.file_digest is None:
+            h = hashlib.sha1(ifc_file.schema.encode("utf-8"))
+            for unit_assignment in ifc_file.by_type("IfcUnitAssignment"):
+                h.update(self.hash_instance(unit_assignment))
+            for context in ifc_file.by_type("IfcGeometricRepresentationContext"):
+                h.update(self.hash_instance(context))
+            self.file_digest = h.digest()
+        return self.file_digest
+
+    def hash_value(self, value):
+        if isinstance(value, ifcopenshell.entity_instance):
+            if value.id():
+                return b"#" + self.hash_instance(value)
+            return b"@" + value.is_a().encode("utf-8") + self.hash_value(value.wrappedValue)
+        elif isinstance(value, (tuple, list)):
+            return b"(" + b",".join(self.hash_value(v) for v in value) + b")"
+        return repr(value).encode("utf-8") + b";"
+
+
+def get_settings_key(settings):
+    """Return the values of all geometry settings as a string
+
+    Unlike repr(), this includes the tolerances, context ids, offset and
+    rotation besides the boolean settings.
+
+    :param settings: The geometry settings
+    :type settings: ifcopenshell.geom.settings
+    :rtype: string
+    """
+    return repr(
+        (
+            settings.get_raw(),
+            settings.deflection_tolerance(),
+            settings.angular_tolerance(),
+            settings.force_space_transparency(),
+            tuple(sorted(settings.context_ids())),
+            tuple(settings.offset),
+            tuple(settings.rotation),
+            getattr(settings, "use_python_opencascade", False),
+        )
+    )
+
+
+def get_shape_key(hasher, settings, product):
+    """Return the cache key of the tessellation of a product
+
+    :param hasher: A content hasher for the file of the product
+    :type hasher: content_hasher
+    :param settings: The geometry settings
+    :type settings: ifcopenshell.geom.settings
+    :param product: The IfcProduct to tessellate
+    :type product: ifcopenshell.entity_instance.entity_instance
+    :returns: A hexadecimal digest
+    :rtype: string
+    """
+    h = hashlib.sha1(get_settings_key(settings).encode("utf-8"))
+    h.update(hasher.hash_file(product.wrapped_data.file))
+    h.update(product.is_a().encode("utf-8"))
+    h.update(hasher.hash_instance(product.ObjectPlacement))
+    h.update(hasher.hash_instance(product.Representation))
+    if product.Representation:
+        for inst in product.wrapped_data.file.traverse(product.Representation):
+            for styled_item in getattr(inst, "StyledByItem", None) or []:
+                h.update(hasher.hash_instance(styled_item))
+    for rel in getattr(product, "HasOpenings", None) or []:
+        opening = rel.RelatedOpeningElement
+        h.update(hasher.hash_instance(opening.ObjectPlacement))
+        h.update(hasher.hash_instance(opening.Representation))
+    material = ifcopenshell.util.element.get_material(product)
+    if material:
+        h.update(hasher.hash_instance(material))
+        for definition in getattr(material, "HasRepresentation", None) or []:
+            h.update(hasher.hash_instance(definition))
+    return h.hexdigest()
+
+
+class cached_material(object):
+    def __init__(self, data):
+        # Colours are stored as JSON arrays
+        self.__dict__.update({k: tuple(v) if isinstance(v, list) else v for k, v in data.items()})
+
+
+def load_buffer(typecode, data):
+    buffer = array.array(typecode)
+    buffer.frombytes(data)
+    return tuple(buffer)
+
+
+class cached_triangulation(object):
+    def __init__(self, data, buffers):
+        self.id = data["id"]
+        self.verts = load_buffer("d", buffers["verts"])
+        self.normals = load_buffer("d", buffers["normals"])
+        self.faces = load_buffer("i", buffers["faces"])
+        self.edges = load_buffer("i", buffers["edges"])
+        self.material_ids = load_buffer("i", buffers["material_ids"])
+        self.materials = tuple(cached_material(m) for m in data["materials"])
+
+
+class cached_matrix(object):
+    def __init__(self, data):
+        self.data = tuple(data)
+
+
+class cached_transformation(object):
+    def __init__(self, data):
+        self.matrix = cached_matrix(data)
+
+
+class cached_element(object):
+    """A tessellated element read from the cache
+
+    Exposes the same attributes as the triangulation elements returned by
+    the iterator and create_shape(). Identifying attributes are taken from
+    the product in the current file rather than from the cache.
+    """
+
+    def __init__(self, product, data, buffers):
+        container = ifcopenshell.util.element.get_aggregate(product) or ifcopenshell.util.element.get_container(
+            product, should_get_direct=True
+        )
+        self.id = product.id()
+        self.guid = product.GlobalId
+        self.name = product.Name
+        self.type = product.is_a()
+        self.parent_id = container.id() if container else -1
+        self.context = data["context"]
+        self.unique_id = data["unique_id"]
+        self.product = product.wrapped_data
+        self.transformation = cached_transformation(data["matrix"])
+        self.geometry = cached_triangulation(data["geometry"], buffers)
+
+
+# Geometry buffers are stored as raw bytes in their own columns
+buffer_typecodes = (("verts", "d"), ("normals", "d"), ("faces", "i"), ("edges", "i"), ("material_ids", "i"))
+
+
+def serialise_element(element):
+    """Return the attributes of a shape as JSON and its geometry buffers as bytes
+
+    Unlike pickle, neither can execute code when loaded, so a cache may be
+    shared between users.
+
+    :rtype: tuple[string, dict[string, bytes]]
+    """
+    geometry = element.geometry
+    material_attributes = (
+        "name",
+        "has_diffuse",
+        "has_specular",
+        "has_transparency",
+        "has_specularity",
+        "diffuse",
+        "specular",
+        "transparency",
+        "specularity",
+    )
+    data = {
+        "context": element.context,
+        "unique_id": element.unique_id,
+        "matrix": tuple(element.transformation.matrix.data),
+        "geometry": {
+            "id": geometry.id,
+            "materials": [{k: getattr(m, k) for k in material_attributes} for m in geometry.materials],
+        },
+    }
+    buffers = {name: array.array(typecode, getattr(geometry, name)).tobytes() for name, typecode in buffer_typecodes}
+    return json.dumps(data), buffers
+
+
+class cache(object):
+    """A size bounded store of tessellated shapes in an SQLite database
+
+    :param path: The database file, which is created if it does not exist
+    :type path: string
+    :param max_size: The maximum total size of stored shapes in bytes.
+        Least recently used shapes are evicted when exceeded. The total is
+        read when the cache is opened, and then only counts shapes stored
+        through this connection.
+    :type max_size: int
+    """
+
+    version = 2
+
+    def __init__(self, path, max_size=2**30):
+        self.path = path
+        self.max_size = max_size
+        self.db = sqlite3.connect(path)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != self.version:
+            # Shapes stored in an earlier format are discarded
+            self.db.execute("DROP TABLE IF EXISTS shapes")
+            self.db.execute(f"PRAGMA user_version = {self.version}")
+        columns = ", ".join(f"{name} BLOB" for name, typecode in buffer_typecodes)
+        self.db.execute(
+            f"CREATE TABLE IF NOT EXISTS shapes (key TEXT PRIMARY KEY, data TEXT, {columns}, size INTEGER, accessed REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS shapes_accessed ON shapes (accessed)")
+        self.db.commit()
+        # A running total avoids summing every stored shape on each put
+        self.total_size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM shapes").fetchone()[0]
+
+    def get_key(self, settings, product, hasher=None):
+        """Return the cache key of a product
+
+        :param hasher: A content hasher to share memoised hashes between
+            products of the same file. Only valid while the file is unmodified.
+        :type hasher: content_hasher
+        """
+        return get_shape_key(hasher or content_hasher(), settings, product)
+
+    def get(self, key, product):
+        names = [name for name, typecode in buffer_typecodes]
+        row = self.db.execute(f"SELECT data, {', '.join(names)} FROM shapes WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.db.execute("UPDATE shapes SET accessed = ? WHERE key = ?", (time.time(), key))
+        return cached_element(product, json.loads(row[0]), dict(zip(names, row[1:])))
+
+    def put(self, key, element):
+        data, buffers = serialise_element(element)
+        size = len(data) + sum(len(b) for b in buffers.values())
+        row = self.db.execute("SELECT size FROM shapes WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self.total_size -= row[0]
+        names = [name for name, typecode in buffer_typecodes]
+        self.db.execute(
+            f"INSERT OR REPLACE INTO shapes (key, data, {', '.join(names)}, size, accessed) "
+            f"VALUES (?, ?, {', '.join('?' * len(names))}, ?, ?)",
+            (key, data, *(sqlite3.Binary(buffers[name]) for name in names), size, time.time()),
+        )
+        self.total_size += size
+        self.evict()
+
+    def evict(self):
+        if self.total_size <= self.max_size:
+            return
+        cursor = self.db.execute("SELECT key, size FROM shapes ORDER BY accessed")
+        evicted = []
+        for key, size in cursor:
+            evicted.append((key,))
+            self.total_size -= size
+            if self.total_size <= self.max_size:
+                break
+        cursor.close()
+        self.db.executemany("DELETE FROM shapes WHERE key = ?", evicted)
+
+    def commit(self):
+        self.db.commit()
+
+    def clear(self):
+        self.db.execute("DELETE FROM shapes")
+        self.db.commit()
+        self.total_size = 0
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
@@ -25,6 +25,13 @@ import os
 import sys
 import operator
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import ifcopenshell
+
 from .. import ifcopenshell_wrapper
 from ..file import file
 from ..entity_instance import entity_instance
@@ -121,6 +128,72 @@ class iterator(ifcopenshell_wrapper.Iterator):
                 if not self.next():
                     break
 
+    def batches(self, size=1024, tree=None):
+        """Iterate over the elements in chunks of triangulated geometry
+
+        Rather than converting every element to Python individually, the
+        geometry of up to size elements is concatenated natively and exposed
+        as NumPy arrays that share memory with the native buffers.
+
+        :param size: The maximum number of elements per batch
+        :type size: int
+        :param tree: If specified, elements are also added to this tree
+        :type tree: ifcopenshell.geom.tree
+        :returns: A generator of geometry batches
+        :rtype: generator
+
+        Example::
+
+            it = ifcopenshell.geom.iterator(settings, ifc_file, multiprocessing.cpu_count())
+            for batch in it.batches(512):
+                for i, guid in enumerate(batch.guids):
+                    verts, faces = batch.verts_of(i), batch.faces_of(i)
+        """
+        if self.initialize():
+            while True:
+                buffers, has_next = ifcopenshell_wrapper.iterator_get_batch(self, size, tree)
+                yield geometry_batch(buffers)
+                if not has_next:
+                    break
+
+
+class geometry_batch(object):
+    """A chunk of triangulated elements with geometry in contiguous arrays
+
+    Vertices, normals, faces and material ids of all elements are stored
+    consecutively, with element i spanning vertex_offsets[i] up to
+    vertex_offsets[i + 1] and likewise for face_offsets. Face indices and
+    material ids are local to their element. Matrices are 4x4 per element.
+    """
+
+    def __init__(self, buffers):
+        if numpy is None:
+            raise ImportError("NumPy is required for batched geometry iteration")
+        self.guids = buffers["guids"]
+        self.ids = numpy.frombuffer(buffers["ids"], dtype=numpy.intc)
+        self.verts = numpy.frombuffer(buffers["verts"], dtype=numpy.float64).reshape((-1, 3))
+        self.normals = numpy.frombuffer(buffers["normals"], dtype=numpy.float64).reshape((-1, 3))
+        self.faces = numpy.frombuffer(buffers["faces"], dtype=numpy.intc).reshape((-1, 3))
+        self.material_ids = numpy.frombuffer(buffers["material_ids"], dtype=numpy.intc)
+        self.vertex_offsets = numpy.frombuffer(buffers["vertex_offsets"], dtype=numpy.intc)
+        self.face_offsets = numpy.frombuffer(buffers["face_offsets"], dtype=numpy.intc)
+        self.matrices = numpy.frombuffer(buffers["matrices"], dtype=numpy.float64).reshape((-1, 4, 4))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def verts_of(self, i):
+        return self.verts[self.vertex_offsets[i] : self.vertex_offsets[i + 1]]
+
+    def normals_of(self, i):
+        return self.normals[self.vertex_offsets[i] : self.vertex_offsets[i + 1]]
+
+    def faces_of(self, i):
+        return self.faces[self.face_offsets[i] : self.face_offsets[i + 1]]
+
+    def material_ids_of(self, i):
+        return self.material_ids[self.face_offsets[i] : self.face_offsets[i + 1]]
+
 
 class tree(ifcopenshell_wrapper.tree):
     def __init__(self, file=None, settings=None):
@@ -177,7 +250,7 @@ class tree(ifcopenshell_wrapper.tree):
         return [entity_instance(e) for e in ifcopenshell_wrapper.tree.select_box(*args)]
 
 
-def create_shape(settings, inst, repr=None):
+def create_shape(settings, inst, repr=None, cache=None, hasher=None):
     """
     Return a geometric representation from STEP-based IFCREPRESENTATIONSHAPE
     or
@@ -203,13 +276,43 @@ def create_shape(settings, inst, repr=None):
                 print(shape_gpXYZ.X(), shape_gpXYZ.Y(), shape_gpXYZ.Z()) # These are methods of the gpXYZ class from pythonOCC
             except:
                 print("Shape creation failed")
+
+    A content hasher may be passed along with a cache, so that the file and
+    instances shared between products are only hashed once over many calls.
+    It is only valid while the file is unmodified.
+
+    cache = ifcopenshell.geom.cache.cache("geometry.sqlite")
+    hasher = ifcopenshell.geom.cache.content_hasher()
+    for product in products:
+        shape = geom.create_shape(settings, product, cache=cache, hasher=hasher)
     """
+    if cache is not None and repr is None and inst.is_a("IfcProduct") and is_cacheable(settings):
+        key = cache.get_key(settings, inst, hasher)
+        shape = cache.get(key, inst)
+        if shape is None:
+            shape = ifcopenshell_wrapper.create_shape(settings, inst.wrapped_data)
+            cache.put(key, shape)
+            cache.commit()
+        return shape
     return wrap_shape_creation(
         settings,
         ifcopenshell_wrapper.create_shape(settings, inst.wrapped_data, repr.wrapped_data if repr is not None else None),
     )
 
 
+def is_cacheable(settings):
+    """Whether shapes created with the settings can be stored in a geometry cache
+
+    Only triangulated shapes are cached, and only for products using their
+    default representation.
+    """
+    return (
+        not settings.get(settings.USE_BREP_DATA)
+        and not settings.get(settings.DISABLE_TRIANGULATION)
+        and not getattr(settings, "use_python_opencascade", False)
+    )
+
+
 def consume_iterator(it):
     if it.initialize():
         while True:
@@ -218,9 +321,56 @@ def consume_iterator(it):
                 break
 
 
-def iterate(settings, file_or_filename, num_threads=1, include=None, exclude=None):
-    it = iterator(settings, file_or_filename, num_threads, include, exclude)
-    yield from consume_iterator(it)
+def iterate(settings, file_or_filename, num_threads=1, include=None, exclude=None, cache=None):
+    if cache is None or not is_cacheable(settings):
+        it = iterator(settings, file_or_filename, num_threads, include, exclude)
+        yield from consume_iterator(it)
+        return
+
+    from .cache import content_hasher
+
+    ifc_file = file_or_filename if isinstance(file_or_filename, file) else ifcopenshell.open(file_or_filename)
+
+    def get_products(elements):
+        # Filters are either products or names of IFC classes
+        for element in elements:
+            if isinstance(element, str):
+                yield from ifc_file.by_type(element)
+            else:
+                yield element
+
+    if include is not None and exclude is not None:
+        raise ValueError("include and exclude cannot be specified simultaneously")
+
+    # Like the iterator, all products are considered unless filtered. Which of
+    # them have a shape is left to the iterator, which only processes misses.
+    if include is not None:
+        products = list(get_products(include))
+    else:
+        excluded = set(get_products(exclude or []))
+        products = [p for p in ifc_file.by_type("IfcProduct") if p not in excluded]
+
+    # Shapes found in the cache are yielded right away, the remaining
+    # products are tessellated by a single iterator and then stored.
+    hasher = content_hasher()
+    keys = {}
+    misses = []
+    for product in products:
+        if not product.Representation:
+            continue
+        key = keys[product.id()] = cache.get_key(settings, product, hasher)
+        shape = cache.get(key, product)
+        if shape is None:
+            misses.append(product)
+        else:
+            yield shape
+
+    if misses:
+        it = iterator(settings, ifc_file, num_threads, include=misses)
+        for shape in consume_iterator(it):
+            cache.put(keys[shape.id], shape)
+            yield shape
+    cache.commit()
 
 
 def make_shape_function(fn):
@@ -191,35 +191,129 @@ class ids:
         :param logger: Logging object with handlers, defaults to None
         :type logger: logging, optional
         """
+        logger = self.get_logger(logger)
+        self.check_schema(ifc_file.schema, logger)
+        applicable, passed = self.evaluate(ifc_file, logger)
+        self.report(len(ifc_file.by_type("IfcProduct")), applicable, passed, logger)
+
+    def validate_parallel(self, ifc_path=None, logger=None, processes=None, ifc_file=None):
+        """Validate an IFC model using a pool of processes.
+
+        The model is opened once in this process, or the already opened
+        model is used, and shared with the forked processes, between which
+        the elements are divided. Results are passed to the logger in the
+        same order and with the same elements as by validate(). This
+        requires processes to be forked, so on other platforms the model is
+        validated in this process instead.
+
+        :param ifc_path: path to ifc file, not used if ifc_file is provided
+        :type ifc_path: str, optional
+        :param logger: Logging object with handlers, defaults to None
+        :type logger: logging, optional
+        :param processes: Number of processes, defaults to the number of CPUs
+        :type processes: int, optional
+        :param ifc_file: The already opened IFC file, which may have unsaved
+            changes, to validate instead of the file at ifc_path
+        :type ifc_file: ifcopenshell.file, optional
+        """
+        import multiprocessing
+
+        global shared_ids, worker_file
+        logger = self.get_logger(logger)
+        if ifc_file is None:
+            ifc_file = ifcopenshell.open(ifc_path)
+        if "fork" not in multiprocessing.get_all_start_methods():
+            return self.validate(ifc_file, logger)
+
+        processes = processes or multiprocessing.cpu_count()
+        level = logging.INFO if logger.isEnabledFor(logging.INFO) else logging.ERROR
+        # Forked processes inherit the model as it is in memory, so they see the same ids as this process
+        shared_ids, worker_file = self, ifc_file
+        try:
+            with multiprocessing.get_context("fork").Pool(processes) as pool:
+                shards = pool.map(validate_worker, [(i, processes, level) for i in range(processes)])
+        finally:
+            shared_ids, worker_file = None, None
+
+        schema, total_products = shards[0][0], shards[0][1]
+        self.check_schema(schema, logger)
+
+        # Records are merged in the order of the elements in the model, as when validated serially
+        records = sorted((r for shard in shards for r in shard[4]), key=lambda r: r[0])
+        for _, level, msg in records:
+            if isinstance(msg, dict):
+                msg["ifc_element"] = ifc_file.by_id(msg["ifc_element"])
+            logger.log(level, msg)
+
+        applicable = [sum(c) for c in zip(*(shard[2] for shard in shards))]
+        passed = [sum(c) for c in zip(*(shard[3] for shard in shards))]
+        self.report(total_products, applicable, passed, logger)
+
+    def get_logger(self, logger):
         if not isinstance(logger, logging.Logger):
             logger = logging.getLogger("IDS_Logger")
             logging.basicConfig(level=logging.INFO, format="%(message)s")
             logger.setLevel(logging.INFO)
+        return logger
 
+    def check_schema(self, schema, logger):
         if "ifcversion" in self.info.keys():
             if self.info["ifcversion"] in ["2.3.0.1", "4.0.2.1", "4.3.0.0"]:
                 if self.info["ifcversion"][0:3] == "2.3":
-                    if not ifc_file.schema.startswith("IFC2x3"):
-                        logger.error("IFC file is of %s not of %s schema." % (ifc_file.schema, self.info["ifcversion"]))
+                    if not schema.startswith("IFC2x3"):
+                        logger.error("IFC file is of %s not of %s schema." % (schema, self.info["ifcversion"]))
                 elif self.info["ifcversion"][0:3] == "4.0":
-                    if not ifc_file.schema == "IFC4":
-                        logger.error("IFC file is of %s not of %s schema." % (ifc_file.schema, self.info["ifcversion"]))
+                    if not schema == "IFC4":
+                        logger.error("IFC file is of %s not of %s schema." % (schema, self.info["ifcversion"]))
                 elif self.info["ifcversion"][0:3] == "4.3":
-                    if not ifc_file.schema.startswith("IFC4x3"):
-                        logger.error("IFC file is of %s not of %s schema." % (ifc_file.schema, self.info["ifcversion"]))
+                    if not schema.startswith("IFC4x3"):
+                        logger.error("IFC file is of %s not of %s schema." % (schema, self.info["ifcversion"]))
                 else:
                     logger.error("IFC version not recognized")
 
-        # Consider other way around: for elem, for spec so we can see if an element pass all IDSes?
-        for spec in self.specifications:
-            self.ifc_applicable = 0
-            self.ifc_passed = 0
-            for elem in ifc_file.by_type("IfcObject"):
-                apply, comply = spec(elem, logger)
-                if apply:
-                    self.ifc_applicable += 1
-                if comply:
-                    self.ifc_passed += 1
+    def evaluate(self, ifc_file, logger, shard=0, num_shards=1):
+        """Checks elements against all specifications, logging the result per element.
+
+        :param shard: Only every num_shards-th element, starting at this offset, is checked
+        :type shard: int
+        :return: The number of applicable and passing elements per specification
+        :rtype: tuple
+        """
+        # The model is scanned once, and each element is only checked against
+        # specifications whose entity applicability may match its class.
+        applicable = [0] * len(self.specifications)
+        passed = [0] * len(self.specifications)
+        specifications_by_class = {}
+        has_pset_index = ifc_file.pset_index is not None
+        if not has_pset_index:
+            ifcopenshell.util.element.enable_pset_index(ifc_file)
+        lookups = facet_lookups()
+        try:
+            elements = ifc_file.by_type("IfcObject")
+            if num_shards > 1:
+                elements = elements[shard::num_shards]
+            for elem in elements:
+                specifications = specifications_by_class.get(elem.is_a())
+                if specifications is None:
+                    specifications = specifications_by_class[elem.is_a()] = [
+                        i for i, spec in enumerate(self.specifications) if spec.may_apply(elem)
+                    ]
+                lookups.set_element(elem)
+                for i in specifications:
+                    apply, comply = self.specifications[i](elem, logger, lookups)
+                    if apply:
+                        applicable[i] += 1
+                    if comply:
+                        passed[i] += 1
+        finally:
+            if not has_pset_index:
+                ifcopenshell.util.element.disable_pset_index(ifc_file)
+        return applicable, passed
+
+    def report(self, total_products, applicable, passed, logger):
+        for i, spec in enumerate(self.specifications):
+            self.ifc_applicable = applicable[i]
+            self.ifc_passed = passed[i]
             if self.ifc_applicable == 0:
                 if spec.necessity == "required":
                     logger.error("No applicable elements found. Minimum 1 applicable element required.")
@@ -234,7 +328,7 @@ class ids:
             logger.debug(
                 "Out of %s IFC elements, %s were applicable and %s of them passed (%s)."
                 % (
-                    len(ifc_file.by_type("IfcProduct")),
+                    total_products,
                     self.ifc_applicable,
                     self.ifc_passed,
                     str(percentage) + "%",
@@ -244,6 +338,40 @@ class ids:
             h.flush()
 
 
+# The IDS and model of the parallel validation in progress, inherited by forked workers
+shared_ids = None
+worker_file = None
+
+
+class RecordingHandler(logging.Handler):
+    """Logging handler keeping records, ordered by the position of their element in the model."""
+
+    def __init__(self, positions):
+        logging.Handler.__init__(self)
+        self.positions = positions
+        self.records = []
+
+    def emit(self, record):
+        msg = record.msg
+        if isinstance(msg, dict):
+            # Elements cannot be passed between processes, so they are identified by id
+            msg = dict(msg, ifc_element=msg["ifc_element"].id())
+            position = self.positions[msg["ifc_element"]]
+        else:
+            position = -1
+        self.records.append((position, record.levelno, msg))
+
+
+def validate_worker(args):
+    shard, num_shards, level = args
+    positions = {e.id(): i for i, e in enumerate(worker_file.by_type("IfcObject"))}
+    handler = RecordingHandler(positions)
+    logger = logging.Logger("IDS_Worker", level)
+    logger.addHandler(handler)
+    applicable, passed = shared_ids.evaluate(worker_file, logger, shard, num_shards)
+    return worker_file.schema, len(worker_file.by_type("IfcProduct")), applicable, passed, handler.records
+
+
 class specification:
     """Represents the XML <specification> node and its two children <applicability> and <requirements>"""
 
@@ -333,21 +461,40 @@ class specification:
         else:
             self.requirements = boolean_and([facet])
 
-    def __call__(self, inst, logger):
+    def may_apply(self, inst):
+        """Whether the entity facets of the applicability allow the class of an instance
+
+        Used to skip specifications for elements of unrelated classes without evaluating all facets.
+
+        :param inst: IFC entity element
+        :type inst: IFC entity
+        :rtype: bool
+        """
+        for term in self.applicability.terms if self.applicability else []:
+            if isinstance(term, entity) and isinstance(term.name, str) and not inst.is_a(term.name):
+                return False
+        return True
+
+    def __call__(self, inst, logger, lookups=None):
         """When specification is called on an ifc instance, it validates against applicability and requirements.
 
         :param inst: IFC entity element
         :type inst: IFC entity
         :param logger: Logging object
         :type logger: logging
+        :param lookups: Lookups shared by the facets during a validation, defaults to None
+        :type lookups: facet_lookups, optional
         :return: results of validation on applicability and requirements
         :rtype: [bool,bool]
         """
-        if self.applicability(inst, logger):
+        if self.applicability(inst, logger, lookups):
 
-            valid = self.requirements(inst, logger)
+            valid = self.requirements(inst, logger, lookups)
 
             if valid:
+                # Messages are only formatted when they are logged
+                if not logger.isEnabledFor(logging.INFO):
+                    return True, True
                 logger.info(
                     {
                         "guid": inst.GlobalId,
@@ -399,7 +546,10 @@ class specification:
 
 
 class facet_evaluation:
-    """The evaluation of a facet with data from IFC. Converts to bool and has a human readable string format."""
+    """The evaluation of a facet with data from IFC. Converts to bool and has a human readable string format.
+
+    The string may be given as a function, so that it is only formatted when the evaluation is reported.
+    """
 
     def __init__(self, success, str):
         self.success = success
@@ -409,9 +559,68 @@ class facet_evaluation:
         return self.success
 
     def __str__(self):
+        if callable(self.str):
+            self.str = self.str()
         return self.str
 
 
+class facet_lookups:
+    """Memoises the data facets read from an element, shared by all specifications during validation.
+
+    Lookups of the current element are discarded when moving to the next
+    element, while lookups of type objects are kept as types are shared by
+    many occurrences.
+    """
+
+    def __init__(self):
+        self.element = None
+        self.element_lookups = {}
+        self.type_lookups = {}
+
+    def set_element(self, inst):
+        self.element = inst
+        self.element_lookups = {}
+
+    def get(self, key, inst, function):
+        if inst.is_a("IfcTypeObject"):
+            cache = self.type_lookups
+        elif inst == self.element:
+            cache = self.element_lookups
+        else:
+            return function(inst)
+        result = cache.get((key, inst.id()), cache)
+        if result is cache:
+            result = cache[(key, inst.id())] = function(inst)
+        return result
+
+
+def get_type(inst, lookups):
+    if lookups is None:
+        return ifcopenshell.util.element.get_type(inst)
+    return lookups.get("type", inst, ifcopenshell.util.element.get_type)
+
+
+def get_psets(inst, lookups):
+    if lookups is None:
+        return ifcopenshell.util.element.get_psets(inst)
+    return lookups.get("psets", inst, ifcopenshell.util.element.get_psets)
+
+
+def get_associations(inst, lookups):
+    if lookups is None:
+        return inst.HasAssociations
+    return lookups.get("associations", inst, lambda inst: inst.HasAssociations)
+
+
+def get_attributes(inst, lookups):
+    def get_lowercase_info(inst):
+        return {k.lower(): v for k, v in inst.get_info().items()}
+
+    if lookups is None:
+        return get_lowercase_info(inst)
+    return lookups.get("attributes", inst, get_lowercase_info)
+
+
 class meta_facet(type):
     """A metaclass for automatically registering facets in a map to be instantiated based on XML tagnames."""
 
@@ -506,13 +715,15 @@ class entity(facet):
             print(e)
         return fac_dict
 
-    def __call__(self, inst, logger):
+    def __call__(self, inst, logger, lookups=None):
         """Validate an ifc instance against that entity facet.
 
         :param inst: IFC entity element
         :type inst: IFC entity
         :param logger: Logging object
         :type logger: logging
+        :param lookups: Lookups shared by the facets during a validation, defaults to None
+        :type lookups: facet_lookups, optional
         :return: result of the validation as bool and message
         :rtype: facet_evaluation(bool, str)
         """
@@ -520,13 +731,15 @@ class entity(facet):
         # @nb with inheritance
         if self.predefinedtype and hasattr(inst, "PredefinedType"):
             self.message = "an entity name '%(name)s' of predefined type '%(predefinedtype)s'"
+            message = self.message
             return facet_evaluation(
                 inst.is_a(self.name) and inst.PredefinedType == self.predefinedtype,
-                self.message % {"name": inst.is_a(), "predefinedtype": inst.PredefinedType},
+                lambda: message % {"name": inst.is_a(), "predefinedtype": inst.PredefinedType},
             )
         else:
             self.message = "an entity name '%(name)s'"
-            return facet_evaluation(inst.is_a(self.name), self.message % {"name": inst.is_a()})
+            message = self.message
+            return facet_evaluation(inst.is_a(self.name), lambda: message % {"name": inst.is_a()})
 
 
 class classification(facet):
@@ -571,20 +784,23 @@ class classification(facet):
         }
         return fac_dict
 
-    def __call__(self, inst, logger):
+    def __call__(self, inst, logger, lookups=None):
         """Validate an ifc instance against that classification facet.
 
         :param inst: IFC entity element
         :type inst: IFC entity
         :param logger: Logging object
         :type logger: logging
+        :param lookups: Lookups shared by the facets during a validation, defaults to None
+        :type lookups: facet_lookups, optional
         :return: result of the validation as bool and message
         :rtype: facet_evaluation(bool, str)
         """
 
-        instance_classiciations = inst.HasAssociations
-        if ifcopenshell.util.element.get_type(inst):
-            type_classifications = ifcopenshell.util.element.get_type(inst).HasAssociations
+        instance_classiciations = get_associations(inst, lookups)
+        element_type = get_type(inst, lookups)
+        if element_type:
+            type_classifications = get_associations(element_type, lookups)
         else:
             type_classifications = ()
 
@@ -606,16 +822,16 @@ class classification(facet):
                 elif hasattr(cref, "Identification"):  # IFC4
                     refs.append((cref.ReferencedSource.Name, cref.Identification))
 
-        self.location_msg = location[self.location]
+        self.location_msg = location_msg = location[self.location]
 
         if refs:
             return facet_evaluation(
                 (self.system, self.value) in refs,
-                self.message
+                lambda: self.message
                 % {
                     "system": refs[0][0],
                     "value": "'" + refs[0][1] + "'",
-                    "location": self.location_msg,
+                    "location": location_msg,
                 },  # what if not first item of refs?
             )
         else:
@@ -671,13 +887,15 @@ class property(facet):
         }
         return fac_dict
 
-    def __call__(self, inst, logger):
+    def __call__(self, inst, logger, lookups=None):
         """Validate an ifc instance against that property facet.
 
         :param inst: IFC entity element
         :type inst: IFC entity
         :param logger: Logging object
         :type logger: logging
+        :param lookups: Lookups shared by the facets during a validation, defaults to None
+        :type lookups: facet_lookups, optional
         :return: result of the validation as bool and message
         :rtype: facet_evaluation(bool, str)
         """
@@ -685,13 +903,15 @@ class property(facet):
         self.location = self.node["@location"]
 
         if self.propertyset == "attribute":
-            val = {k.lower(): v for k, v in inst.get_info().items()}.get(self.name, None)
+            val = get_attributes(inst, lookups).get(self.name, None)
+            pset = None
         else:
             # TODO sometimes AttributeError: 'str' object has no attribute 'wrappedValue'
-            instance_props = ifcopenshell.util.element.get_psets(inst)
+            instance_props = get_psets(inst, lookups)
 
-            if ifcopenshell.util.element.get_type(inst):
-                type_props = ifcopenshell.util.element.get_psets(ifcopenshell.util.element.get_type(inst))
+            element_type = get_type(inst, lookups)
+            if element_type:
+                type_props = get_psets(element_type, lookups)
             else:
                 type_props = {}
 
@@ -707,16 +927,20 @@ class property(facet):
             pset = props.get(self.propertyset)
             val = pset.get(self.name) if pset else None
 
-        self.location_msg = location[self.location]
-        di = {"name": self.name, "propertyset": self.propertyset, "value": "'%s'" % val, "location": self.location_msg}
-
-        if val is not None:
-            msg = self.message % di
-        else:
-            if pset:
-                msg = "does not have %(location)sproperty '%(name)s' in a set '%(propertyset)s'" % di
-            else:
-                msg = "does not have %(location)sset '%(propertyset)s'" % di
+        self.location_msg = location_msg = location[self.location]
+
+        def msg():
+            di = {
+                "name": self.name,
+                "propertyset": self.propertyset,
+                "value": "'%s'" % val,
+                "location": location_msg,
+            }
+            if val is not None:
+                return self.message % di
+            elif pset:
+                return "does not have %(location)sproperty '%(name)s' in a set '%(propertyset)s'" % di
+            return "does not have %(location)sset '%(propertyset)s'" % di
 
         # TODO implement data type comparison
         # xs:string
@@ -772,25 +996,26 @@ class material(facet):
         }
         return fac_dict
 
-    def __call__(self, inst, logger):
+    def __call__(self, inst, logger, lookups=None):
         """Validate an ifc instance against that material facet.
 
         :param inst: IFC entity element
         :type inst: IFC entity
         :param logger: Logging object
         :type logger: logging
+        :param lookups: Lookups shared by the facets during a validation, defaults to None
+        :type lookups: facet_lookups, optional
         :return: result of the validation as bool and message
         :rtype: facet_evaluation(bool, str)
         """
 
         self.location = self.node["@location"]
 
-        instance_material_rel = [rel for rel in inst.HasAssociations if rel.is_a("IfcRelAssociatesMaterial")]
-        if ifcopenshell.util.element.get_type(inst):
+        instance_material_rel = [rel for rel in get_associations(inst, lookups) if rel.is_a("IfcRelAssociatesMaterial")]
+        element_type = get_type(inst, lookups)
+        if element_type:
             type_material_rel = [
-                rel
-                for rel in ifcopenshell.util.element.get_type(inst).HasAssociations
-                if rel.is_a("IfcRelAssociatesMaterial")
+                rel for rel in get_associations(element_type, lookups) if rel.is_a("IfcRelAssociatesMaterial")
             ]
         else:
             type_material_rel = []
@@ -828,11 +1053,11 @@ class material(facet):
         if not materials:
             materials.append("UNDEFINED")
 
-        self.location_msg = location[self.location]
+        self.location_msg = location_msg = location[self.location]
 
         return facet_evaluation(
             self.value in materials,
-            self.message % {"value": "'/'".join(materials), "location": self.location_msg},
+            lambda: self.message % {"value": "'/'".join(materials), "location": location_msg},
         )
 
 
@@ -864,7 +1089,7 @@ class boolean_logic:
     def __call__(self, *args):
         eval = [t(*args) for t in self.terms]
         join = [" and ", " or "][self.fold == any]
-        return facet_evaluation(self.fold(eval), join.join(map(str, eval)))
+        return facet_evaluation(self.fold(eval), lambda: join.join(map(str, eval)))
 
     def __str__(self):
         return [" and ", " or "][self.fold == any].join(map(str, self.terms))
@@ -1,7 +1,11 @@
+import copy
 import ifcopenshell
 
 
 def get_psets(element, psets_only=False, qtos_only=False):
+    pset_index = getattr(element.wrapped_data.file, "pset_index", None)
+    if pset_index is not None:
+        return pset_index.get_psets(element, psets_only=psets_only, qtos_only=qtos_only)
     psets = {}
     if element.is_a("IfcTypeObject"):
         for definition in element.HasPropertySets or []:
@@ -67,6 +71,152 @@ def get_properties(properties):
     return results
 
 
+class PsetIndex:
+    """An index of the property definitions of all elements in a file
+
+    The index is built in a single pass over the relationships of the file.
+    Property definitions are only decoded once, no matter how many elements
+    share them. The index is kept up to date by the pset API, copied classes,
+    undo, redo and discarded transactions, but not by other modifications to
+    the file.
+
+    Example::
+
+        ifcopenshell.util.element.enable_pset_index(ifc_file)
+        for wall in ifc_file.by_type("IfcWall"):
+            print(ifcopenshell.util.element.get_psets(wall))
+    """
+
+    def __init__(self, ifc_file):
+        self.file = ifc_file
+        self.build()
+
+    def build(self):
+        # Element id to a list of assigned definition ids
+        self.elements = {}
+        # Definition id to its name, decoded properties, and whether it is a pset or qto
+        self.definitions = {}
+        for rel in self.file.by_type("IfcRelDefinesByProperties"):
+            definitions = rel.RelatingPropertyDefinition
+            # IFC4 allows an IfcPropertySetDefinitionSet
+            if not isinstance(definitions, tuple):
+                definitions = (definitions,)
+            for element in rel.RelatedObjects:
+                if not element.is_a("IfcTypeObject"):
+                    self.elements.setdefault(element.id(), []).extend(d.id() for d in definitions)
+        for element in self.file.by_type("IfcTypeObject"):
+            if element.HasPropertySets:
+                self.elements[element.id()] = [d.id() for d in element.HasPropertySets]
+        if self.file.schema != "IFC2X3":
+            for element in self.file.by_type("IfcMaterialDefinition") + self.file.by_type("IfcProfileDef"):
+                if element.HasProperties:
+                    self.elements[element.id()] = [d.id() for d in element.HasProperties]
+
+    def get_definition(self, definition_id):
+        result = self.definitions.get(definition_id)
+        if result is None:
+            definition = self.file.by_id(definition_id)
+            is_qto = definition.is_a("IfcElementQuantity")
+            is_pset = (
+                definition.is_a("IfcPropertySet")
+                or definition.is_a("IfcMaterialProperties")
+                or definition.is_a("IfcProfileProperties")
+            )
+            props = get_property_definition(definition)
+            result = self.definitions[definition_id] = (definition.Name, props, is_pset, is_qto)
+        return result
+
+    def get_psets(self, element, psets_only=False, qtos_only=False):
+        psets = {}
+        for definition_id in self.elements.get(element.id(), []):
+            name, props, is_pset, is_qto = self.get_definition(definition_id)
+            if psets_only and not is_pset:
+                continue
+            if qtos_only and not is_qto:
+                continue
+            # Callers are free to modify the results, so the cached properties are not shared
+            psets[name] = copy.deepcopy(props)
+        return psets
+
+    def invalidate_element(self, element):
+        """Reindexes the property definitions assigned to an element
+
+        :param element: An element whose assigned property definitions changed
+        :type element: ifcopenshell.entity_instance.entity_instance
+        """
+        self.elements.pop(element.id(), None)
+        if element.is_a("IfcTypeObject"):
+            definitions = element.HasPropertySets or []
+        elif element.is_a("IfcMaterialDefinition") or element.is_a("IfcProfileDef"):
+            definitions = element.HasProperties or []
+        elif hasattr(element, "IsDefinedBy"):
+            definitions = []
+            for rel in element.IsDefinedBy:
+                if rel.is_a("IfcRelDefinesByProperties"):
+                    definition = rel.RelatingPropertyDefinition
+                    definitions.extend(definition if isinstance(definition, tuple) else [definition])
+        else:
+            return
+        if definitions:
+            self.elements[element.id()] = [d.id() for d in definitions]
+
+    def invalidate_ids(self, ids):
+        """Reindexes after changes to instances, such as after an undo
+
+        :param ids: The ids of created, edited or deleted instances, as
+            returned by the undo() and redo() methods of the file
+        :type ids: set[int]
+        """
+        visited = set()
+        queue = list(ids)
+        while queue:
+            element_id = queue.pop()
+            if element_id in visited:
+                continue
+            visited.add(element_id)
+            self.definitions.pop(element_id, None)
+            try:
+                element = self.file.by_id(element_id)
+            except RuntimeError:
+                self.elements.pop(element_id, None)
+                continue
+            if element.is_a("IfcRelDefinesByProperties"):
+                queue.extend(e.id() for e in element.RelatedObjects)
+            elif (
+                element.is_a("IfcObjectDefinition")
+                or element.is_a("IfcMaterialDefinition")
+                or element.is_a("IfcProfileDef")
+            ):
+                self.invalidate_element(element)
+            elif element.is_a("IfcProperty") or element.is_a("IfcPhysicalQuantity"):
+                # Properties are decoded as part of the sets, or complex properties, using them
+                queue.extend(inverse.id() for inverse in self.file.get_inverse(element))
+
+    def invalidate_definition(self, definition):
+        """Discards the decoded properties of a property definition
+
+        :param definition: A property or quantity set which was edited
+        :type definition: ifcopenshell.entity_instance.entity_instance
+        """
+        self.definitions.pop(definition.id(), None)
+
+
+def enable_pset_index(ifc_file):
+    """Indexes property definitions to speed up subsequent calls to get_psets
+
+    :param ifc_file: The file to index
+    :type ifc_file: ifcopenshell.file.file
+    :returns: The index
+    :rtype: PsetIndex
+    """
+    ifc_file.pset_index = PsetIndex(ifc_file)
+    return ifc_file.pset_index
+
+
+def disable_pset_index(ifc_file):
+    ifc_file.pset_index = None
+
+
 def get_type(element):
     if element.is_a("IfcTypeObject"):
         return element
@@ -127,3 +127,91 @@ def get_fmhem_types(ifc_file):
         except:
             pass
     return elements
+
+
+class ExtractionIndex:
+    """The relationships read when extracting facility management data
+
+    Handover extraction reads the same few relationships of every asset many
+    times over, once for each column of its row. This index collects them in
+    a single pass over the relationships of the file, so that each row is
+    read from dictionaries instead of walking inverse attributes again. The
+    index is not updated when the file is modified.
+
+    Example::
+
+        index = ifcopenshell.util.fm.ExtractionIndex(ifc_file)
+        for element in get_cobie_components(ifc_file):
+            print(index.get_type(element), index.get_pset(element, "COBie_Component"))
+    """
+
+    def __init__(self, ifc_file):
+        self.file = ifc_file
+        self.build()
+
+    def build(self):
+        # Object id to a dictionary of property set names to property sets
+        self.psets = {}
+        # Object id to a dictionary of quantity set names to quantity sets
+        self.qtos = {}
+        # Property set id to a dictionary of property names to properties
+        self.properties = {}
+        # Occurrence id to its type
+        self.types = {}
+        # Element id to a list of spatial structure elements it is contained in
+        self.containers = {}
+        # Object id to its first classification reference
+        self.classifications = {}
+        for rel in self.file.by_type("IfcRelDefinesByProperties"):
+            definitions = rel.RelatingPropertyDefinition
+            # IFC4 allows an IfcPropertySetDefinitionSet
+            if not isinstance(definitions, tuple):
+                definitions = (definitions,)
+            for definition in definitions:
+                if definition.is_a("IfcPropertySet"):
+                    index = self.psets
+                elif definition.is_a("IfcElementQuantity"):
+                    index = self.qtos
+                else:
+                    continue
+                for element in rel.RelatedObjects:
+                    if not element.is_a("IfcTypeObject"):
+                        index.setdefault(element.id(), {}).setdefault(definition.Name, definition)
+        for element in self.file.by_type("IfcTypeObject"):
+            for definition in element.HasPropertySets or []:
+                if definition.is_a("IfcPropertySet"):
+                    self.psets.setdefault(element.id(), {}).setdefault(definition.Name, definition)
+        for rel in self.file.by_type("IfcRelDefinesByType"):
+            for element in rel.RelatedObjects:
+                self.types.setdefault(element.id(), rel.RelatingType)
+        for rel in self.file.by_type("IfcRelContainedInSpatialStructure"):
+            for element in rel.RelatedElements:
+                self.containers.setdefault(element.id(), []).append(rel.RelatingStructure)
+        for rel in self.file.by_type("IfcRelAssociatesClassification"):
+            if not rel.RelatingClassification.is_a("IfcClassificationReference"):
+                continue
+            for element in rel.RelatedObjects:
+                self.classifications.setdefault(element.id(), rel.RelatingClassification)
+
+    def get_pset(self, element, name):
+        return self.psets.get(element.id(), {}).get(name)
+
+    def get_qto(self, element, name):
+        return self.qtos.get(element.id(), {}).get(name)
+
+    def get_property(self, pset, name):
+        properties = self.properties.get(pset.id())
+        if properties is None:
+            properties = self.properties[pset.id()] = {}
+            for prop in pset.HasProperties or []:
+                properties.setdefault(prop.Name, prop)
+        return properties.get(name)
+
+    def get_type(self, element):
+        return self.types.get(element.id())
+
+    def get_containers(self, element):
+        return self.containers.get(element.id(), [])
+
+    def get_classification(self, element):
+        return self.classifications.get(element.id())
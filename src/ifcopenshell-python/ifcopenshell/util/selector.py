@@ -1,110 +1,244 @@
+import functools
+import collections
+import ifcopenshell
 import ifcopenshell.util
 import ifcopenshell.util.fm
 import ifcopenshell.util.element
+from ifcopenshell.entity_instance import FORWARD, get_attribute_descriptors
 import lark
 
+grammar = """start: query (lfunction query)*
+query: selector | group
+group: "(" query (lfunction query)* ")"
+selector: (inverse_relationship)? guid_selector | (inverse_relationship)? class_selector
+guid_selector: "#" /[0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$]{22}/
+class_selector: "." WORD filter ?
+filter: "[" filter_key (comparison filter_value)? "]"
+filter_key: WORD | pset_or_qto
+filter_value: ESCAPED_STRING
+pset_or_qto: /[A-Za-z0-9_]+/ "." /[A-Za-z0-9_]+/
+lfunction: and | or
+inverse_relationship: types | contains_elements | boundedby
+types: "*"
+contains_elements: "@"
+boundedby: "@@"
+and: "&"
+or: "|"
+comparison: contains | morethanequalto | lessthanequalto | equal | morethan | lessthan
+contains: "*="
+morethanequalto: ">="
+lessthanequalto: "<"
+equal: "="
+morethan: ">"
+lessthan: "<"
+
+// Embed common.lark for packaging
+DIGIT: "0".."9"
+HEXDIGIT: "a".."f"|"A".."F"|DIGIT
+INT: DIGIT+
+SIGNED_INT: ["+"|"-"] INT
+DECIMAL: INT "." INT? | "." INT
+_EXP: ("e"|"E") SIGNED_INT
+FLOAT: INT _EXP | DECIMAL _EXP?
+SIGNED_FLOAT: ["+"|"-"] FLOAT
+NUMBER: FLOAT | INT
+SIGNED_NUMBER: ["+"|"-"] NUMBER
+_STRING_INNER: /.*?/
+_STRING_ESC_INNER: _STRING_INNER /(?<!\\\\)(\\\\\\\\)*?/
+ESCAPED_STRING : "\\"" _STRING_ESC_INNER "\\""
+LCASE_LETTER: "a".."z"
+UCASE_LETTER: "A".."Z"
+LETTER: UCASE_LETTER | LCASE_LETTER
+WORD: LETTER+
+CNAME: ("_"|LETTER) ("_"|LETTER|DIGIT)*
+WS_INLINE: (" "|/\\t/)+
+WS: /[ \\t\\f\\r\\n]/+
+CR : /\\r/
+LF : /\\n/
+NEWLINE: (CR? LF)+
+
+%ignore WS // Disregard spaces in text
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def get_parser():
+    # Compiling the grammar is expensive, so it is done once per process
+    return lark.Lark(grammar)
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_query(query):
+    return get_parser().parse(query)
+
+
+class FileIndex:
+    """Lazily built lookups of relationships of all elements in a file
+
+    Each index is built in a single pass over the relationship instances the
+    first time a filter requires it. Indexes are not updated when the file
+    is modified, so they should only be kept while the file is unchanged.
+    """
+
+    def __init__(self, ifc_file):
+        self.file = ifc_file
+        self.psets = None
+        self.types = None
+        self.containers = None
+        self.aggregates = None
+        self.materials = None
+
+    def get_psets(self, element):
+        if self.file.pset_index or not element.is_a("IfcObjectDefinition"):
+            return ifcopenshell.util.element.get_psets(element)
+        if self.psets is None:
+            self.build_psets()
+        return self.psets.get(element.id(), {})
+
+    def build_psets(self):
+        self.psets = collections.defaultdict(dict)
+        definitions = {}
+
+        def get_definition(definition):
+            # Property sets shared by many elements are decoded only once
+            props = definitions.get(definition.id())
+            if props is None:
+                props = definitions[definition.id()] = ifcopenshell.util.element.get_property_definition(definition)
+            return props
+
+        for rel in self.file.by_type("IfcRelDefinesByProperties"):
+            definition = rel.RelatingPropertyDefinition
+            if not isinstance(definition, ifcopenshell.entity_instance):
+                continue
+            props = get_definition(definition)
+            for element in rel.RelatedObjects:
+                if element.is_a("IfcTypeObject"):
+                    continue
+                self.psets[element.id()][definition.Name] = props
+        for element in self.file.by_type("IfcTypeObject"):
+            for definition in element.HasPropertySets or []:
+                self.psets[element.id()][definition.Name] = get_definition(definition)
+
+    def get_type(self, element):
+        if element.is_a("IfcTypeObject"):
+            return element
+        if self.types is None:
+            self.types = {}
+            for rel in self.file.by_type("IfcRelDefinesByType"):
+                for related_object in rel.RelatedObjects:
+                    self.types.setdefault(related_object.id(), rel.RelatingType)
+        return self.types.get(element.id())
+
+    def get_container(self, element):
+        if self.containers is None:
+            self.containers = {}
+            self.aggregates = {}
+            for rel in self.file.by_type("IfcRelContainedInSpatialStructure"):
+                for related_element in rel.RelatedElements:
+                    self.containers.setdefault(related_element.id(), rel.RelatingStructure)
+            for rel in self.file.by_type("IfcRelAggregates"):
+                for related_object in rel.RelatedObjects:
+                    self.aggregates.setdefault(related_object.id(), rel.RelatingObject)
+        # Mirrors ifcopenshell.util.element.get_container, where the
+        # container of an aggregated element is that of its aggregate.
+        aggregate = self.aggregates.get(element.id())
+        while aggregate is not None:
+            element = aggregate
+            aggregate = self.aggregates.get(element.id())
+        return self.containers.get(element.id())
+
+    def get_material(self, element):
+        if self.materials is None:
+            self.materials = {}
+            for rel in self.file.by_type("IfcRelAssociatesMaterial"):
+                for related_object in rel.RelatedObjects:
+                    self.materials.setdefault(related_object.id(), rel.RelatingMaterial)
+        material = self.materials.get(element.id())
+        if material is None:
+            relating_type = self.get_type(element)
+            if relating_type is None or relating_type == element:
+                return
+            material = self.materials.get(relating_type.id())
+            if material is None:
+                return
+        if material.is_a("IfcMaterialLayerSetUsage"):
+            return material.ForLayerSet
+        elif material.is_a("IfcMaterialProfileSetUsage"):
+            return material.ForProfileSet
+        return material
+
+
+class ElementLookup:
+    """Unindexed lookups of the relationships of an element, matching those of FileIndex"""
+
+    def get_psets(self, element):
+        return ifcopenshell.util.element.get_psets(element)
+
+    def get_type(self, element):
+        return ifcopenshell.util.element.get_type(element)
+
+    def get_container(self, element):
+        return ifcopenshell.util.element.get_container(element)
+
+    def get_material(self, element):
+        return ifcopenshell.util.element.get_material(element, should_skip_usage=True)
+
 
 class Selector:
+    def __init__(self):
+        # The file may be modified between queries, so relationships are only indexed while parsing one
+        self.index = None
+
     def parse(self, ifc_file, query):
         self.file = ifc_file
+        self.index = FileIndex(ifc_file)
+        try:
+            return list(self.get_group(parse_query(query)))
+        finally:
+            self.index = None
 
-        l = lark.Lark(
-            """start: query (lfunction query)*
-                    query: selector | group
-                    group: "(" query (lfunction query)* ")"
-                    selector: (inverse_relationship)? guid_selector | (inverse_relationship)? class_selector
-                    guid_selector: "#" /[0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$]{22}/
-                    class_selector: "." WORD filter ?
-                    filter: "[" filter_key (comparison filter_value)? "]"
-                    filter_key: WORD | pset_or_qto
-                    filter_value: ESCAPED_STRING
-                    pset_or_qto: /[A-Za-z0-9_]+/ "." /[A-Za-z0-9_]+/
-                    lfunction: and | or
-                    inverse_relationship: types | contains_elements | boundedby
-                    types: "*"
-                    contains_elements: "@"
-                    boundedby: "@@"
-                    and: "&"
-                    or: "|"
-                    comparison: contains | morethanequalto | lessthanequalto | equal | morethan | lessthan
-                    contains: "*="
-                    morethanequalto: ">="
-                    lessthanequalto: "<"
-                    equal: "="
-                    morethan: ">"
-                    lessthan: "<"
-
-                    // Embed common.lark for packaging
-                    DIGIT: "0".."9"
-                    HEXDIGIT: "a".."f"|"A".."F"|DIGIT
-                    INT: DIGIT+
-                    SIGNED_INT: ["+"|"-"] INT
-                    DECIMAL: INT "." INT? | "." INT
-                    _EXP: ("e"|"E") SIGNED_INT
-                    FLOAT: INT _EXP | DECIMAL _EXP?
-                    SIGNED_FLOAT: ["+"|"-"] FLOAT
-                    NUMBER: FLOAT | INT
-                    SIGNED_NUMBER: ["+"|"-"] NUMBER
-                    _STRING_INNER: /.*?/
-                    _STRING_ESC_INNER: _STRING_INNER /(?<!\\\\)(\\\\\\\\)*?/
-                    ESCAPED_STRING : "\\"" _STRING_ESC_INNER "\\""
-                    LCASE_LETTER: "a".."z"
-                    UCASE_LETTER: "A".."Z"
-                    LETTER: UCASE_LETTER | LCASE_LETTER
-                    WORD: LETTER+
-                    CNAME: ("_"|LETTER) ("_"|LETTER|DIGIT)*
-                    WS_INLINE: (" "|/\\t/)+
-                    WS: /[ \\t\\f\\r\\n]/+
-                    CR : /\\r/
-                    LF : /\\n/
-                    NEWLINE: (CR? LF)+
-
-                    %ignore WS // Disregard spaces in text
-                 """
-        )
-
-        start = l.parse(query)
-        return self.get_group(start)
-
-    def get_group(self, group):
+    def get_group(self, group, candidates=None):
         lfunction = None
+        results = None
         for child in group.children:
             if child.data == "query":
-                new_results = self.get_query(child)
                 if not lfunction:
-                    results = new_results
+                    results = self.get_query(child, candidates)
                 elif lfunction == "or":
-                    results.extend(new_results)
+                    results |= self.get_query(child, candidates)
                 elif lfunction == "and":
-                    results = list(set(results).intersection(new_results))
-                results = list(set(results))
+                    # Only the results so far can pass, so they are the only
+                    # candidates which need to be evaluated by the next query.
+                    results &= self.get_query(child, results)
             elif child.data == "lfunction":
                 lfunction = child.children[0].data
         return results
 
-    def get_query(self, query):
+    def get_query(self, query, candidates=None):
         for child in query.children:
             if child.data == "selector":
-                return self.get_selector(child)
+                return self.get_selector(child, candidates)
             elif child.data == "group":
-                return self.get_group(child)
+                return self.get_group(child, candidates)
 
-    def get_selector(self, selector):
+    def get_selector(self, selector, candidates=None):
         if len(selector.children) == 1:
             inverse_relationship = None
             class_or_guid_selector = selector.children[0]
         else:
             inverse_relationship = selector.children[0]
+            # Candidates are the results of the inverse relationship, not of the selector
+            candidates = None
             class_or_guid_selector = selector.children[1]
 
         if class_or_guid_selector.data == "class_selector":
-            results = self.get_class_selector(class_or_guid_selector)
+            results = self.get_class_selector(class_or_guid_selector, candidates)
         elif class_or_guid_selector.data == "guid_selector":
             results = self.get_guid_selector(class_or_guid_selector)
 
         if not inverse_relationship:
-            return results
-        return self.parse_inverse_relationship(results, inverse_relationship.children[0].data)
+            return set(results)
+        return set(self.parse_inverse_relationship(results, inverse_relationship.children[0].data))
 
     def parse_inverse_relationship(self, elements, inverse_relationship):
         results = []
@@ -122,15 +256,19 @@ class Selector:
                     results.append(relationship.RelatedBuildingElement)
         return results
 
-    def get_class_selector(self, class_selector):
+    def get_class_selector(self, class_selector, candidates=None):
         if class_selector.children[0] == "COBie":
             elements = ifcopenshell.util.fm.get_cobie_components(self.file)
         elif class_selector.children[0] == "COBieType":
             elements = ifcopenshell.util.fm.get_cobie_types(self.file)
         elif class_selector.children[0] == "FMHEM":
             elements = ifcopenshell.util.fm.get_fmhem_types(self.file)
+        elif candidates is not None:
+            elements = [e for e in candidates if e.is_a(class_selector.children[0])]
         else:
             elements = self.file.by_type(class_selector.children[0])
+        if candidates is not None and class_selector.children[0] in ("COBie", "COBieType", "FMHEM"):
+            elements = [e for e in elements if e in candidates]
         if len(class_selector.children) > 1 and class_selector.children[1].data == "filter":
             return self.filter_elements(elements, class_selector.children[1])
         return elements
@@ -153,36 +291,33 @@ class Selector:
         return results
 
     def get_element_value(self, element, key):
+        index = self.index or ElementLookup()
         if "." in key and key.split(".")[0] == "type":
-            try:
-                element = ifcopenshell.util.element.get_type(element)
-                if not element:
-                    return None
-            except:
-                return
+            element = index.get_type(element)
+            if not element:
+                return None
             key = ".".join(key.split(".")[1:])
         elif "." in key and key.split(".")[0] == "material":
-            try:
-                element = ifcopenshell.util.element.get_material(element, should_skip_usage=True)
-                if not element:
-                    return None
-            except:
-                return
+            element = index.get_material(element)
+            if not element:
+                return None
             key = ".".join(key.split(".")[1:])
         elif "." in key and key.split(".")[0] == "container":
-            try:
-                element = ifcopenshell.util.element.get_container(element)
-                if not element:
-                    return None
-            except:
-                return
+            element = index.get_container(element)
+            if not element:
+                return None
             key = ".".join(key.split(".")[1:])
-        info = element.get_info()
-        if key in info:
-            return info[key]
+        # Attributes are cheap to look up, so they are checked before psets
+        if key == "id":
+            return element.id()
+        elif key == "type":
+            return element.is_a()
+        descriptor = get_attribute_descriptors(element.wrapped_data)[0].get(key)
+        if descriptor is not None and descriptor.category == FORWARD:
+            return element[descriptor.index]
         elif "." in key:
             pset_name, prop = key.split(".")
-            psets = ifcopenshell.util.element.get_psets(element)
+            psets = index.get_psets(element)
             if pset_name in psets and prop in psets[pset_name]:
                 return psets[pset_name][prop]
 
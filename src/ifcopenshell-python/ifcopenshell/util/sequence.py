@@ -1,3 +1,4 @@
+import bisect
 import datetime
 import ifcopenshell.util.date
 from functools import lru_cache
@@ -60,6 +61,74 @@ def get_recent_working_day(start, duration_type, calendar):
     return start
 
 
+class WorkingDayTable:
+    """Answers working day queries of a work calendar in logarithmic time
+
+    The working days of the calendar are enumerated once into a sorted list
+    of day ordinals, which is extended whenever a query falls outside of the
+    enumerated range. Counting and offsetting by working days are then
+    bisections of that list, rather than walks through every day.
+
+    Results are identical to count_working_days() and get_finish_date() with
+    a WORKTIME duration type. The table must be discarded if the calendar is
+    edited.
+    """
+
+    # Give up rather than enumerate forever if a calendar has no working days
+    max_days = 366 * 200
+
+    def __init__(self, calendar):
+        self.calendar = calendar
+        self.start = None
+        self.finish = None
+        self.working_days = []
+
+    def enumerate(self, start, finish):
+        return [
+            o for o in range(start, finish) if is_working_day.__wrapped__(datetime.date.fromordinal(o), self.calendar)
+        ]
+
+    def extend(self, ordinal):
+        if self.start is None:
+            self.start, self.finish = ordinal - 366, ordinal + 366
+            self.working_days = self.enumerate(self.start, self.finish)
+        elif ordinal < self.start:
+            start = min(ordinal, 2 * self.start - self.finish)
+            self.working_days[:0] = self.enumerate(start, self.start)
+            self.start = start
+        elif ordinal >= self.finish:
+            finish = max(ordinal + 1, 2 * self.finish - self.start)
+            self.working_days.extend(self.enumerate(self.finish, finish))
+            self.finish = finish
+        if self.finish - self.start > self.max_days:
+            raise ValueError(f"No working days could be found in calendar {self.calendar}")
+
+    def include(self, ordinal):
+        if self.start is None or not self.start <= ordinal < self.finish:
+            self.extend(ordinal)
+
+    def count_working_days(self, start, finish):
+        start, finish = start.toordinal(), finish.toordinal()
+        if finish <= start:
+            return 0
+        self.include(start)
+        self.include(finish - 1)
+        return bisect.bisect_left(self.working_days, finish) - bisect.bisect_left(self.working_days, start)
+
+    def get_finish_date(self, start, days):
+        ordinal = start.toordinal()
+        self.include(ordinal)
+        if days > 0:
+            # The working day after the last of the duration, counting the start
+            while bisect.bisect_left(self.working_days, ordinal) + days >= len(self.working_days):
+                self.extend(self.finish)
+            return datetime.date.fromordinal(self.working_days[bisect.bisect_left(self.working_days, ordinal) + days])
+        # The working day before the last of the duration, counting backwards from the start
+        while bisect.bisect_right(self.working_days, ordinal) - 1 + days < 0:
+            self.extend(self.start - 1)
+        return datetime.date.fromordinal(self.working_days[bisect.bisect_right(self.working_days, ordinal) - 1 + days])
+
+
 @lru_cache(maxsize=None)
 def is_working_day(day, calendar):
     is_working_day = False
@@ -26,15 +26,23 @@ log_entry_type = namedtuple("log_entry_type", ("level", "message", "instance"))
 
 
 class json_logger:
-    def __init__(self):
+    """Collects log statements as dictionaries
+
+    :param emit: If provided, statements are passed to this function as they
+        are logged, rather than collected in the statements list.
+    :type emit: function
+    """
+
+    def __init__(self, emit=None):
         self.statements = []
         self.instance = None
+        self.emit = emit or self.statements.append
 
     def set_instance(self, instance):
         self.instance = instance
 
     def log(self, level, message, *args, **kwargs):
-        self.statements.append(log_entry_type(level, message % args, kwargs.get("instance"))._asdict())
+        self.emit(log_entry_type(level, message % args, kwargs.get("instance"))._asdict())
 
     def __getattr__(self, level):
         return functools.partial(self.log, level, instance=self.instance)
@@ -117,7 +125,176 @@ def try_valid(attr, val, schema):
         return False
 
 
-def validate(f, logger):
+class entity_validator:
+    """The attribute validators of an entity, compiled once per declaration
+
+    Every attribute type is flattened into a function that is applied to an
+    attribute value, so that resolving declarations and unwrapping types is
+    not repeated for every instance.
+    """
+
+    def __init__(self, entity, compiled):
+        self.entity = entity
+        self.is_abstract = entity.is_abstract()
+        self.attributes = []
+        for attr, is_derived in zip(entity.all_attributes(), entity.derived()):
+            self.attributes.append((attr, is_derived or attr.optional(), compile_validator(attr, compiled)))
+        self.inverses = [(attr, attr.name(), attr.bound1(), attr.bound2()) for attr in entity.all_inverse_attributes()]
+
+
+def flatten_type(attr_type, type_wrappers):
+    while isinstance(attr_type, type_wrappers):
+        attr_type = attr_type.declared_type()
+    return attr_type
+
+
+def compile_validator(attr, compiled):
+    """Returns a function which is equivalent to try_valid(attr, val, schema)
+
+    :param compiled: The schema, holding the validators of named types
+    :type compiled: compiled_schema
+    """
+    if isinstance(attr, attribute):
+        attr_type = attr.type_of_attribute()
+    else:
+        attr_type = attr
+
+    if isinstance(attr_type, named_type):
+        key = attr_type.declared_type().name()
+        validator = compiled.types.get(key)
+        if validator is None:
+            # Resolved lazily so that a type referring back to itself does not recurse indefinitely
+            compiled.types[key] = lambda val: compiled.types[key](val)
+            validator = compiled.types[key] = compile_validator(attr_type.declared_type(), compiled)
+        return validator
+
+    # As in assert_valid(), type declarations are only unwrapped for values which are not entity instances
+    instance_validator = compile_flat_validator(flatten_type(attr_type, (named_type,)), compiled)
+    value_validator = compile_flat_validator(flatten_type(attr_type, (named_type, type_declaration)), compiled)
+
+    def validate_attribute(val):
+        if isinstance(val, ifcopenshell.entity_instance):
+            return instance_validator(val)
+        return value_validator(val)
+
+    return validate_attribute
+
+
+def compile_flat_validator(attr_type, compiled):
+    if isinstance(attr_type, simple_type):
+        simple_type_python = simple_type_python_mapping[attr_type.declared_type()]
+        if type(simple_type_python) == set:
+            return lambda val: val in simple_type_python
+        return lambda val: type(val) == simple_type_python
+    elif isinstance(attr_type, (entity_type, type_declaration)):
+        name = attr_type.name()
+        return lambda val: isinstance(val, ifcopenshell.entity_instance) and val.is_a(name)
+    elif isinstance(attr_type, select_type):
+        enumerations = compiled.enumerations
+        options = [compile_validator(x, compiled) for x in attr_type.select_list()]
+
+        def validate_select(val):
+            if not isinstance(val, ifcopenshell.entity_instance):
+                return False
+            if val.is_a().lower() in enumerations:
+                val = val.wrappedValue
+            return any(option(val) for option in options)
+
+        return validate_select
+    elif isinstance(attr_type, enumeration_type):
+        items = set(attr_type.enumeration_items())
+        return lambda val: val in items
+    elif isinstance(attr_type, aggregation_type):
+        b1, b2 = attr_type.bound1(), attr_type.bound2()
+        validate_element = compile_validator(attr_type.type_of_element(), compiled)
+        return lambda val: not (len(val) < b1 or (b2 != -1 and len(val) > b2)) and all(validate_element(v) for v in val)
+    raise NotImplementedError("Not impl %s %s" % (type(attr_type), attr_type))
+
+
+all_checks = ("abstract", "cardinality", "types", "inverses")
+
+
+class compiled_schema:
+    def __init__(self, schema):
+        self.schema = schema
+        self.types = {}
+        self.entities = {}
+        self.enumerations = {e.name().lower() for e in schema.enumeration_types()}
+
+    def get_entity_validator(self, name):
+        validator = self.entities.get(name)
+        if validator is None:
+            entity = self.schema.declaration_by_name(name)
+            validator = self.entities[name] = entity_validator(entity, self)
+        return validator
+
+
+def validate_instance(inst, validator, logger, checks, schema):
+    def log_error(e):
+        if hasattr(logger, "set_instance"):
+            logger.error(str(e))
+        else:
+            logger.error("In %s\n%s", inst, e)
+
+    entity = validator.entity
+
+    if "abstract" in checks and validator.is_abstract:
+        log_error("Entity %s is abstract" % entity.name())
+
+    values = []
+    has_invalid_value = False
+    for attr, _, _ in validator.attributes:
+        try:
+            values.append(inst[len(values)])
+        except:
+            if hasattr(logger, "set_instance"):
+                logger.error("Invalid attribute value for %s.%s", entity, attr)
+            else:
+                logger.error("In %s\nInvalid attribute value for %s.%s", inst, entity, attr)
+            has_invalid_value = True
+            values.append(None)
+
+    if not has_invalid_value:
+        for (attr, is_optional, is_valid), val in zip(validator.attributes, values):
+            if val is None:
+                if "cardinality" in checks and not is_optional:
+                    logger.error("Attribute %s.%s not optional", entity, attr)
+            elif "types" in checks and not is_valid(val):
+                # The slower path is only taken to describe the error
+                try:
+                    assert_valid(attr, val, schema)
+                    log_error(ValidationError("%r not valid for %s" % (val, attr)))
+                except ValidationError as e:
+                    log_error(e)
+                except Exception:
+                    log_error(ValidationError("%r not valid for %s" % (val, attr)))
+
+    if "inverses" in checks:
+        for attr, name, b1, b2 in validator.inverses:
+            count = len(inst.wrapped_data.get_inverse(name))
+            if count < b1 or (b2 != -1 and count > b2):
+                log_error(ValidationError("%r not valid for %s" % (getattr(inst, name), attr)))
+
+
+def iterate_instances(f, schema, ids=None):
+    """Yields the instances of a file grouped by entity
+
+    :param ids: If provided, only the instances with these ids are yielded,
+        in the order given, so that a file can be split between processes.
+    :type ids: list[int]
+    """
+    if ids is not None:
+        for instance_id in ids:
+            inst = f.by_id(instance_id)
+            yield inst.is_a(), inst
+        return
+    for entity in schema.entities():
+        name = entity.name()
+        for inst in f.wrapped_data.by_type_excl_subtypes(name):
+            yield name, ifcopenshell.entity_instance(inst, f)
+
+
+def validate(f, logger, checks=all_checks):
     """
     For an IFC population model `f` validate whether the entity attribute values are correctly supplied. As this
     is a function that is applied after a file has been parsed, certain types of errors in syntax, duplicate
@@ -132,64 +309,71 @@ def validate(f, logger):
     to one of the leaves. For enumerations it is checked that the value is indeed on of the items. For aggregations it
     is checked that the elements and the cardinality conforms. Type declarations (IfcInteger which is an integer) are
     unpacked until one of the above cases is reached.
+
+    :param checks: The checks to perform, a subset of "abstract", "cardinality" (non-optional attributes are
+        supplied), "types" (attribute values conform to their type) and "inverses" (inverse attribute cardinality).
+    :type checks: tuple
     """
+    validate_shard(f, logger, checks)
+
+
+def validate_shard(f, logger, checks=all_checks, ids=None):
     schema = ifcopenshell.ifcopenshell_wrapper.schema_by_name(f.schema)
-    for inst in f:
+    compiled = compiled_schema(schema)
+    for name, inst in iterate_instances(f, schema, ids):
         if hasattr(logger, "set_instance"):
             logger.set_instance(inst)
+        validate_instance(inst, compiled.get_entity_validator(name), logger, checks, schema)
 
-        entity = schema.declaration_by_name(inst.is_a())
-        attrs = entity.all_attributes()
 
-        if entity.is_abstract():
-            e = "Entity %s is abstract" % entity.name()
-            if hasattr(logger, "set_instance"):
-                logger.error(e)
-            else:
-                logger.error("In %s\n%s", inst, e)
-
-        has_invalid_value = False
-        for i in range(len(attrs)):
-            try:
-                inst[i]
-                pass
-            except:
-                if hasattr(logger, "set_instance"):
-                    logger.error("Invalid attribute value for %s.%s", entity, attrs[i])
-                else:
-                    logger.error(
-                        "In %s\nInvalid attribute value for %s.%s",
-                        inst,
-                        entity,
-                        attrs[i],
-                    )
-                has_invalid_value = True
-
-        if not has_invalid_value:
-            for attr, val, is_derived in zip(attrs, inst, entity.derived()):
-
-                if val is None and not (is_derived or attr.optional()):
-                    logger.error("Attribute %s.%s not optional", entity, attr)
+worker_file = None
+worker_ids = None
 
-                if val is not None:
-                    attr_type = attr.type_of_attribute()
-                    try:
-                        assert_valid(attr, val, schema)
-                    except ValidationError as e:
-                        if hasattr(logger, "set_instance"):
-                            logger.error(str(e))
-                        else:
-                            logger.error("In %s\n%s", inst, e)
-
-        for attr in entity.all_inverse_attributes():
-            val = getattr(inst, attr.name())
-            try:
-                assert_valid_inverse(attr, val, schema)
-            except ValidationError as e:
-                if hasattr(logger, "set_instance"):
-                    logger.error(str(e))
-                else:
-                    logger.error("In %s\n%s", inst, e)
+
+def init_worker(path):
+    global worker_file, worker_ids
+    worker_file = ifcopenshell.open(path)
+    # Every process partitions the same sorted ids, so shards are disjoint
+    worker_ids = sorted(worker_file.wrapped_data.entity_names())
+
+
+def validate_worker(args):
+    shard, num_shards, checks = args
+    logger = json_logger()
+    start = len(worker_ids) * shard // num_shards
+    end = len(worker_ids) * (shard + 1) // num_shards
+    validate_shard(worker_file, logger, checks, worker_ids[start:end])
+    for statement in logger.statements:
+        if statement["instance"] is not None:
+            statement["instance"] = str(statement["instance"])
+    return logger.statements
+
+
+def validate_parallel(path, checks=all_checks, processes=None):
+    """Validates a file on disk using a pool of processes, which each open the file
+
+    The instances are divided into contiguous ranges of ids, more than there
+    are processes, so that results are yielded as soon as each range is
+    validated.
+
+    :param path: The path to the IFC file
+    :type path: string
+    :param checks: The checks to perform, see validate()
+    :type checks: tuple
+    :param processes: The number of processes, which defaults to the number of CPUs
+    :type processes: int
+    :returns: A generator of log statements as dictionaries, where the
+        instance is converted to its string representation
+    :rtype: generator
+    """
+    import multiprocessing
+
+    processes = processes or multiprocessing.cpu_count()
+    num_shards = processes * 4
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(path,)) as pool:
+        for statements in pool.imap_unordered(validate_worker, [(i, num_shards, checks) for i in range(num_shards)]):
+            for statement in statements:
+                yield statement
 
 
 if __name__ == "__main__":
@@ -198,18 +382,27 @@ if __name__ == "__main__":
 
     filenames = [x for x in sys.argv[1:] if not x.startswith("--")]
     flags = set(x for x in sys.argv[1:] if x.startswith("--"))
+    options = dict(x[2:].split("=", 1) for x in flags if "=" in x)
+    checks = tuple(options["checks"].split(",")) if "checks" in options else all_checks
+    processes = int(options.get("processes", 1))
 
     for fn in filenames:
+        print("Validating", fn, file=sys.stderr)
+
+        if processes > 1:
+            for statement in validate_parallel(fn, checks, processes):
+                if "--json" in flags:
+                    print(json.dumps(statement, default=str))
+                else:
+                    print("In %s\n%s" % (statement["instance"], statement["message"]))
+            continue
+
         if "--json" in flags:
-            logger = json_logger()
+            logger = json_logger(emit=lambda statement: print(json.dumps(statement, default=str)))
         else:
             logger = logging.getLogger("validate")
             logger.setLevel(logging.DEBUG)
 
         f = ifcopenshell.open(fn)
 
-        print("Validating", fn, file=sys.stderr)
-        validate(f, logger)
-
-        if "--json" in flags:
-            print("\n".join(json.dumps(x, default=str) for x in logger.statements))
+        validate(f, logger, checks)
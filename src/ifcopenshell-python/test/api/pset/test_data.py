@@ -0,0 +1,55 @@
+import test.bootstrap
+import ifcopenshell.api
+from ifcopenshell.api.pset.data import Data
+
+
+class TestData(test.bootstrap.IFC4):
+    def setup_method(self):
+        Data.purge()
+
+    def test_invalidating_a_product(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        element2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="Foo_Bar")
+        Data.load(self.file, element.id())
+        Data.load(self.file, element2.id())
+        Data.invalidate({element.id()})
+        assert element.id() not in Data.products
+        assert pset.id() not in Data.psets
+        assert element2.id() in Data.products
+
+    def test_invalidating_a_product_also_invalidates_products_sharing_its_psets(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        element2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="Foo_Bar")
+        rel = element.IsDefinedBy[0]
+        rel.RelatedObjects = [element, element2]
+        Data.load(self.file, element.id())
+        Data.load(self.file, element2.id())
+        Data.invalidate({element.id()})
+        assert element2.id() not in Data.products
+        for product in Data.products.values():
+            assert all(p in Data.psets for p in product["psets"])
+
+    def test_reloading_an_invalidated_product(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="Foo_Bar")
+        Data.load(self.file, element.id())
+        pset.Name = "Bar_Baz"
+        Data.invalidate({element.id()})
+        Data.load(self.file, element.id())
+        assert Data.psets[pset.id()]["Name"] == "Bar_Baz"
+
+    def test_invalidating_a_product_when_adding_its_pset_is_undone(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        self.file.begin_transaction()
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="Foo_Bar")
+        self.file.end_transaction()
+        pset_id = pset.id()
+        Data.load(self.file, element.id())
+        assert pset_id in Data.psets
+        Data.invalidate(ifcopenshell.api.get_invalidated_ids(self.file, self.file.undo()))
+        assert element.id() not in Data.products
+        assert pset_id not in Data.psets
+        Data.load(self.file, element.id())
+        assert Data.products[element.id()]["psets"] == set()
@@ -0,0 +1,29 @@
+import test.bootstrap
+import ifcopenshell.api
+
+
+class TestGetInvalidatedIds(test.bootstrap.IFC4):
+    def test_getting_an_element_when_it_is_changed(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        assert ifcopenshell.api.get_invalidated_ids(self.file, {element.id()}) == {element.id()}
+
+    def test_getting_an_element_when_its_property_is_changed(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        element2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="Foo_Bar")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Foo": "Bar"})
+        prop = pset.HasProperties[0]
+        assert ifcopenshell.api.get_invalidated_ids(self.file, {prop.id()}) == {element.id()}
+
+    def test_getting_related_definitions_when_a_relationship_is_changed(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        element_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        ifcopenshell.api.run("type.assign_type", self.file, related_object=element, relating_type=element_type)
+        rel = element.IsTypedBy[0]
+        assert ifcopenshell.api.get_invalidated_ids(self.file, {rel.id()}) == {element.id(), element_type.id()}
+
+    def test_getting_ids_of_removed_instances(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        element_id = element.id()
+        self.file.remove(element)
+        assert ifcopenshell.api.get_invalidated_ids(self.file, {element_id}) == {element_id}
@@ -0,0 +1,129 @@
+import sqlite3
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.guid
+import ifcopenshell.geom
+import ifcopenshell.geom.cache
+
+
+class counting_cache(ifcopenshell.geom.cache.cache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.puts = 0
+
+    def put(self, key, element):
+        self.puts += 1
+        super().put(key, element)
+
+
+class TestCache(test.bootstrap.IFC4):
+    def create_product(self, ifc_class, depth=1.0):
+        context = self.file.by_type("IfcGeometricRepresentationContext")[0]
+        profile = self.file.createIfcRectangleProfileDef("AREA", None, None, 1.0, 1.0)
+        solid = self.file.createIfcExtrudedAreaSolid(
+            profile, None, self.file.createIfcDirection((0.0, 0.0, 1.0)), depth
+        )
+        representation = self.file.createIfcShapeRepresentation(context, "Body", "SweptSolid", [solid])
+        return self.file.create_entity(
+            ifc_class,
+            GlobalId=ifcopenshell.guid.new(),
+            ObjectPlacement=self.file.createIfcLocalPlacement(
+                None, self.file.createIfcAxis2Placement3D(self.file.createIfcCartesianPoint((0.0, 0.0, 0.0)))
+            ),
+            Representation=self.file.createIfcProductDefinitionShape(None, None, [representation]),
+        )
+
+    def setup_file(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        ifcopenshell.api.run("context.add_context", self.file, context_type="Model")
+        return [self.create_product(c) for c in ("IfcWall", "IfcSlab", "IfcOpeningElement", "IfcSpace")]
+
+    def test_hitting_the_cache_for_unchanged_products(self, tmp_path):
+        products = self.setup_file()
+        settings = ifcopenshell.geom.settings()
+        cache = counting_cache(str(tmp_path / "cache.sqlite"))
+        first = {s.id: s.geometry.verts for s in ifcopenshell.geom.iterate(settings, self.file, cache=cache)}
+        assert cache.puts == len(products)
+        second = {s.id: s.geometry.verts for s in ifcopenshell.geom.iterate(settings, self.file, cache=cache)}
+        assert cache.puts == len(products)
+        assert first == second
+
+    def test_missing_the_cache_for_different_tolerances(self, tmp_path):
+        products = self.setup_file()
+        settings = ifcopenshell.geom.settings()
+        cache = counting_cache(str(tmp_path / "cache.sqlite"))
+        list(ifcopenshell.geom.iterate(settings, self.file, cache=cache))
+        settings.set_deflection_tolerance(0.1)
+        list(ifcopenshell.geom.iterate(settings, self.file, cache=cache))
+        assert cache.puts == 2 * len(products)
+        settings.set_angular_tolerance(0.1)
+        list(ifcopenshell.geom.iterate(settings, self.file, cache=cache))
+        assert cache.puts == 3 * len(products)
+
+    def test_missing_the_cache_for_changed_products(self, tmp_path):
+        products = self.setup_file()
+        settings = ifcopenshell.geom.settings()
+        cache = counting_cache(str(tmp_path / "cache.sqlite"))
+        list(ifcopenshell.geom.iterate(settings, self.file, cache=cache))
+        products[0].Representation.Representations[0].Items[0].Depth = 2.0
+        shapes = {s.id: s for s in ifcopenshell.geom.iterate(settings, self.file, cache=cache)}
+        assert cache.puts == len(products) + 1
+        assert max(shapes[products[0].id()].geometry.verts[2::3]) == 2.0
+
+    def test_iterating_the_same_products_as_without_a_cache(self, tmp_path):
+        self.setup_file()
+        settings = ifcopenshell.geom.settings()
+        cache = ifcopenshell.geom.cache.cache(str(tmp_path / "cache.sqlite"))
+        expected = {s.id for s in ifcopenshell.geom.iterate(settings, self.file)}
+        assert {s.id for s in ifcopenshell.geom.iterate(settings, self.file, cache=cache)} == expected
+        assert {s.id for s in ifcopenshell.geom.iterate(settings, self.file, cache=cache)} == expected
+        expected = {s.id for s in ifcopenshell.geom.iterate(settings, self.file, exclude=["IfcSpace"])}
+        assert {
+            s.id for s in ifcopenshell.geom.iterate(settings, self.file, exclude=["IfcSpace"], cache=cache)
+        } == expected
+
+    def test_evicting_shapes_over_the_maximum_size(self, tmp_path):
+        products = self.setup_file()
+        settings = ifcopenshell.geom.settings()
+        cache = ifcopenshell.geom.cache.cache(str(tmp_path / "cache.sqlite"))
+        list(ifcopenshell.geom.iterate(settings, self.file, cache=cache))
+        sizes = [r[0] for r in cache.db.execute("SELECT size FROM shapes ORDER BY accessed")]
+        assert len(sizes) == len(products)
+        assert cache.total_size == sum(sizes)
+        cache.close()
+        cache = ifcopenshell.geom.cache.cache(str(tmp_path / "cache.sqlite"), max_size=sum(sizes) - 1)
+        assert cache.total_size == sum(sizes)
+        self.create_product("IfcWall", depth=2.0)
+        list(ifcopenshell.geom.iterate(settings, self.file, cache=cache))
+        total, count = cache.db.execute("SELECT SUM(size), COUNT(*) FROM shapes").fetchone()
+        assert cache.total_size == total
+        assert total <= sum(sizes) - 1
+        assert count < len(products) + 1
+
+    def test_discarding_shapes_stored_in_an_earlier_format(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite")
+        db = sqlite3.connect(path)
+        db.execute("CREATE TABLE shapes (key TEXT PRIMARY KEY, data BLOB, size INTEGER, accessed REAL)")
+        db.execute("INSERT INTO shapes VALUES ('key', x'00', 1, 0)")
+        db.commit()
+        db.close()
+        self.setup_file()
+        cache = counting_cache(path)
+        assert cache.total_size == 0
+        shapes = list(ifcopenshell.geom.iterate(ifcopenshell.geom.settings(), self.file, cache=cache))
+        assert cache.puts == len(shapes)
+
+    def test_sharing_a_hasher_between_created_shapes(self, tmp_path):
+        products = self.setup_file()
+        settings = ifcopenshell.geom.settings()
+        cache = counting_cache(str(tmp_path / "cache.sqlite"))
+        hasher = ifcopenshell.geom.cache.content_hasher()
+        expected = {s.id: s.geometry.verts for s in ifcopenshell.geom.iterate(settings, self.file)}
+        for product in products:
+            ifcopenshell.geom.create_shape(settings, product, cache=cache, hasher=hasher)
+        assert hasher.file_digest is not None
+        assert cache.puts == len(products)
+        for product in products:
+            shape = ifcopenshell.geom.create_shape(settings, product, cache=cache, hasher=hasher)
+            assert shape.geometry.verts == expected[product.id()]
+        assert cache.puts == len(products)
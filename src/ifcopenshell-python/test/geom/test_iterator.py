@@ -0,0 +1,82 @@
+import numpy
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.guid
+import ifcopenshell.geom
+
+
+class TestIteratorBatches(test.bootstrap.IFC4):
+    def create_wall(self, x, depth):
+        context = self.file.by_type("IfcGeometricRepresentationContext")[0]
+        profile = self.file.createIfcRectangleProfileDef("AREA", None, None, 1.0, 1.0)
+        solid = self.file.createIfcExtrudedAreaSolid(
+            profile, None, self.file.createIfcDirection((0.0, 0.0, 1.0)), depth
+        )
+        representation = self.file.createIfcShapeRepresentation(context, "Body", "SweptSolid", [solid])
+        return self.file.createIfcWall(
+            ifcopenshell.guid.new(),
+            ObjectPlacement=self.file.createIfcLocalPlacement(
+                None, self.file.createIfcAxis2Placement3D(self.file.createIfcCartesianPoint((x, 0.0, 0.0)))
+            ),
+            Representation=self.file.createIfcProductDefinitionShape(None, None, [representation]),
+        )
+
+    def setup_file(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        ifcopenshell.api.run("context.add_context", self.file, context_type="Model")
+        return [self.create_wall(float(i * 2), float(i + 1)) for i in range(5)]
+
+    def iterate_shapes(self, settings):
+        iterator = ifcopenshell.geom.iterator(settings, self.file)
+        shapes = []
+        if iterator.initialize():
+            while True:
+                shapes.append(iterator.get())
+                if not iterator.next():
+                    break
+        return shapes
+
+    def test_batching_the_same_geometry_as_iterating_elements(self):
+        walls = self.setup_file()
+        settings = ifcopenshell.geom.settings()
+        shapes = self.iterate_shapes(settings)
+        batches = list(ifcopenshell.geom.iterator(settings, self.file).batches(2))
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        guids = [guid for batch in batches for guid in batch.guids]
+        assert guids == [shape.guid for shape in shapes]
+        assert sorted(guids) == sorted(wall.GlobalId for wall in walls)
+        i = 0
+        for batch in batches:
+            for j in range(len(batch)):
+                shape = shapes[i]
+                assert batch.ids[j] == shape.id
+                assert numpy.array_equal(batch.verts_of(j).ravel(), shape.geometry.verts)
+                assert numpy.array_equal(batch.normals_of(j).ravel(), shape.geometry.normals)
+                assert numpy.array_equal(batch.faces_of(j).ravel(), shape.geometry.faces)
+                assert numpy.array_equal(batch.material_ids_of(j), shape.geometry.material_ids)
+                matrix = numpy.array(shape.transformation.matrix.data).reshape((4, 3)).T
+                assert numpy.array_equal(batch.matrices[j][:3], matrix)
+                assert numpy.array_equal(batch.matrices[j][3], (0.0, 0.0, 0.0, 1.0))
+                i += 1
+        assert i == len(shapes)
+
+    def test_offsetting_geometry_of_each_element_in_a_batch(self):
+        self.setup_file()
+        batch = next(ifcopenshell.geom.iterator(ifcopenshell.geom.settings(), self.file).batches())
+        assert len(batch) == 5
+        assert batch.vertex_offsets[0] == 0 and batch.vertex_offsets[-1] == len(batch.verts)
+        assert batch.face_offsets[0] == 0 and batch.face_offsets[-1] == len(batch.faces)
+        assert len(batch.material_ids) == len(batch.faces)
+        assert batch.matrices.shape == (5, 4, 4)
+
+    def test_adding_batched_elements_to_a_tree(self):
+        walls = self.setup_file()
+        tree = ifcopenshell.geom.tree()
+        for batch in ifcopenshell.geom.iterator(ifcopenshell.geom.settings(), self.file).batches(2, tree=tree):
+            pass
+        for wall in walls:
+            assert wall in tree.select(wall)
+
+    def test_batching_nothing_without_elements(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        assert list(ifcopenshell.geom.iterator(ifcopenshell.geom.settings(), self.file).batches()) == []
@@ -0,0 +1,58 @@
+import test.bootstrap
+import ifcopenshell
+import ifcopenshell.guid
+import ifcopenshell.entity_instance
+
+
+def get_attribute_uncached(element, name):
+    # The attribute resolution used prior to the descriptor cache
+    INVALID, FORWARD, INVERSE = range(3)
+    attr_cat = element.wrapped_data.get_attribute_category(name)
+    if attr_cat == FORWARD:
+        return element.wrapped_data.get_argument(element.wrapped_data.get_argument_index(name))
+
+
+class TestAttributeDescriptors(test.bootstrap.IFC4):
+    def test_descriptors_are_shared_by_instances_of_the_same_class(self):
+        wall = self.file.createIfcWall()
+        wall2 = self.file.createIfcWall()
+        descriptors = ifcopenshell.entity_instance.get_attribute_descriptors(wall.wrapped_data)
+        assert ifcopenshell.entity_instance.get_attribute_descriptors(wall2.wrapped_data) is descriptors
+
+    def test_descriptors_of_forward_and_inverse_attributes(self):
+        wall = self.file.createIfcWall()
+        by_name, by_index = ifcopenshell.entity_instance.get_attribute_descriptors(wall.wrapped_data)
+        assert by_name["Name"].index == wall.wrapped_data.get_argument_index("Name")
+        assert by_name["Name"].category == ifcopenshell.entity_instance.FORWARD
+        assert by_name["Name"].setter == "setArgumentAsString"
+        assert by_name["OwnerHistory"].is_entity
+        assert by_name["IsDefinedBy"].category == ifcopenshell.entity_instance.INVERSE
+        assert [d.name for d in by_index] == list(wall.wrapped_data.get_attribute_names())
+
+    def test_descriptors_of_a_derived_attribute(self):
+        element = self.file.createIfcSIUnit()
+        assert (
+            ifcopenshell.entity_instance.get_attribute_descriptors(element.wrapped_data)[0]["Dimensions"].setter is None
+        )
+
+    def test_attribute_access_is_unchanged(self):
+        element = self.file.createIfcWall(Name="foo")
+        assert element.Name == "foo"
+        element.Name = "bar"
+        assert element.get_info()["Name"] == "bar"
+        assert element.IsDefinedBy == ()
+
+
+class AttributeAccess:
+    def test_cached_access_matches_uncached_resolution(self):
+        element = self.file.createIfcWall(ifcopenshell.guid.new(), None, "foo", "bar", Tag="baz")
+        for name in element.wrapped_data.get_attribute_names():
+            assert getattr(element, name) == get_attribute_uncached(element, name)
+
+
+class TestAttributeAccessIFC2X3(AttributeAccess, test.bootstrap.IFC2X3):
+    pass
+
+
+class TestAttributeAccessIFC4(AttributeAccess, test.bootstrap.IFC4):
+    pass
@@ -1,4 +1,7 @@
+import gc
+import gzip
 import pytest
+import zipfile
 import test.bootstrap
 import ifcopenshell
 import ifcopenshell.api
@@ -110,6 +113,34 @@ class TestTransaction(test.bootstrap.IFC4):
     def test_redoing_without_anything_in_the_redo_stack(self):
         self.file.redo()
 
+    def test_getting_the_ids_affected_by_undo_and_redo(self):
+        element = self.file.createIfcWall(GlobalId="id", Name="foo")
+        rel = self.file.createIfcRelAggregates(RelatingObject=element)
+        self.file.begin_transaction()
+        element.Name = "bar"
+        wall = self.file.createIfcWall()
+        self.file.end_transaction()
+        self.file.begin_transaction()
+        self.file.remove(element)
+        self.file.end_transaction()
+        assert self.file.undo() == {element.id(), rel.id()}
+        assert self.file.undo() == {element.id(), wall.id()}
+        assert self.file.redo() == {element.id(), wall.id()}
+        assert self.file.undo() == {element.id(), wall.id()}
+        assert self.file.undo() == set()
+
+    def test_getting_the_definitions_referenced_by_created_or_deleted_instances_as_affected(self):
+        owner = self.file.createIfcOwnerHistory()
+        wall = self.file.createIfcWall(GlobalId="id", OwnerHistory=owner)
+        self.file.begin_transaction()
+        pset = self.file.createIfcPropertySet(GlobalId="pset", OwnerHistory=owner)
+        rel = self.file.createIfcRelDefinesByProperties(
+            GlobalId="rel", OwnerHistory=owner, RelatedObjects=[wall], RelatingPropertyDefinition=pset
+        )
+        self.file.end_transaction()
+        assert self.file.undo() == {pset.id(), rel.id(), wall.id()}
+        assert self.file.redo() == {pset.id(), rel.id(), wall.id()}
+
     def test_that_you_can_undo_and_redo_added_elements(self):
         g = ifcopenshell.file()
         element = g.createIfcWall()
@@ -134,6 +165,73 @@ class TestTransaction(test.bootstrap.IFC4):
         assert len(list(self.file)) == 2
 
 
+class TestCompactTransaction(TestTransaction):
+    @pytest.fixture(autouse=True)
+    def setup_journal(self, setup):
+        self.file.set_history_journal("compact")
+
+    def test_that_references_and_strings_are_interned(self):
+        owner = self.file.createIfcOwnerHistory()
+        self.file.begin_transaction()
+        self.file.createIfcWall(Name="foo", OwnerHistory=owner)
+        self.file.createIfcWall(Name="foo", OwnerHistory=owner)
+        transaction = self.file.transaction
+        self.file.end_transaction()
+        assert len([v for v in transaction.value_table if v == "foo"]) == 1
+        assert len([v for v in transaction.value_table if isinstance(v, transaction.Reference)]) == 1
+
+    def test_that_you_can_undo_and_redo_editing_aggregates(self):
+        person = self.file.createIfcPerson()
+        role = self.file.createIfcActorRole()
+        role2 = self.file.createIfcActorRole()
+        person.Roles = [role]
+        self.file.begin_transaction()
+        person.Roles = [role, role2]
+        self.file.end_transaction()
+        self.file.undo()
+        assert person.Roles == (role,)
+        self.file.redo()
+        assert person.Roles == (role, role2)
+
+    def test_limiting_the_history_by_memory(self):
+        self.file.set_history_memory(1)
+        for i in range(3):
+            self.file.begin_transaction()
+            self.file.createIfcWall()
+            self.file.end_transaction()
+        assert len(self.file.history) == 1
+        self.file.undo()
+        assert len(self.file.by_type("IfcWall")) == 2
+
+    def test_limiting_the_history_by_memory_only_from_the_start(self):
+        for i, journal in enumerate(("compact", "default", "compact", "compact")):
+            self.file.set_history_journal(journal)
+            self.file.begin_transaction()
+            self.file.createIfcWall(Name=str(i))
+            self.file.end_transaction()
+        self.file.set_history_memory(1)
+        assert len(self.file.history) == 3
+        assert not hasattr(self.file.history[0], "nbytes")
+        for i in range(3):
+            self.file.undo()
+        assert [w.Name for w in self.file.by_type("IfcWall")] == ["0"]
+
+    def test_spilling_the_history_to_disk(self):
+        self.file.set_history_memory(1, spill=True)
+        for i in range(3):
+            self.file.begin_transaction()
+            self.file.createIfcWall(Name=str(i))
+            self.file.end_transaction()
+        assert len(self.file.history) == 3
+        assert self.file.history[0].nbytes() == 0
+        self.file.undo()
+        self.file.undo()
+        self.file.undo()
+        assert len(self.file.by_type("IfcWall")) == 0
+        self.file.redo()
+        assert self.file.by_type("IfcWall")[0].Name == "0"
+
+
 class TestFile(test.bootstrap.IFC4):
     def test_creating_a_new_file(self):
         f = ifcopenshell.file(schema="IFC4")
@@ -151,6 +249,95 @@ class TestFile(test.bootstrap.IFC4):
         element = self.file.createIfcPerson()
         assert element.is_a("IfcPerson")
 
+    def test_opening_a_file(self, tmp_path):
+        self.file.createIfcWall(ifcopenshell.guid.new(), Name="Wall")
+        path = str(tmp_path / "test.ifc")
+        self.file.write(path)
+        for mmap in (False, True):
+            for lazy in (False, True):
+                f = ifcopenshell.open(path, mmap=mmap, lazy=lazy)
+                assert f.by_type("IfcWall")[0].Name == "Wall"
+
+    def test_opening_a_file_in_parallel(self, tmp_path):
+        point = self.file.createIfcCartesianPoint((0.0, 0.0, 0.0))
+        for i in range(100):
+            placement = self.file.createIfcLocalPlacement(None, self.file.createIfcAxis2Placement3D(point))
+            self.file.createIfcWall(ifcopenshell.guid.new(), Name="Wall;'{}'".format(i), ObjectPlacement=placement)
+        path = str(tmp_path / "test.ifc")
+        self.file.write(path)
+        f = ifcopenshell.open(path)
+        g = ifcopenshell.open(path, threads=4)
+        assert [e.get_info() for e in f] == [e.get_info() for e in g]
+        assert len(g.get_inverse(g.by_id(point.id()))) == 100
+        for wall in g.by_type("IfcWall"):
+            assert g.by_guid(wall.GlobalId) == wall
+
+    def test_opening_a_file_with_comments_in_parallel(self, tmp_path):
+        for i in range(100):
+            self.file.createIfcWall(ifcopenshell.guid.new(), Name="Wall;'{}'".format(i))
+        path = str(tmp_path / "test.ifc")
+        # A quote in a comment must not be taken as the start of a string
+        data = self.file.to_string().replace(";\n#", ";\n/* it's; */\n#")
+        with open(path, "w") as f:
+            f.write(data)
+        f = ifcopenshell.open(path)
+        g = ifcopenshell.open(path, threads=4)
+        assert len(f.by_type("IfcWall")) == 100
+        assert [e.get_info() for e in f] == [e.get_info() for e in g]
+
+    def test_parsing_a_file_from_bytes(self):
+        self.file.createIfcWall(ifcopenshell.guid.new(), Name="Wall")
+        data = self.file.to_string().encode()
+        f = ifcopenshell.file.from_bytes(data)
+        assert f.by_type("IfcWall")[0].Name == "Wall"
+        f = ifcopenshell.file.from_bytes(memoryview(data), lazy=False)
+        assert f.by_type("IfcWall")[0].Name == "Wall"
+
+    def test_holding_the_buffer_of_a_parsed_file_until_it_is_freed(self):
+        self.file.createIfcWall(ifcopenshell.guid.new(), Name="Wall")
+        data = bytearray(self.file.to_string().encode())
+        f = ifcopenshell.file.from_bytes(data)
+        with pytest.raises(BufferError):
+            data.extend(b" ")
+        assert f.by_type("IfcWall")[0].Name == "Wall"
+        del f
+        gc.collect()
+        data.extend(b" ")
+
+    def test_writing_a_file(self, tmp_path):
+        self.file.createIfcWall(ifcopenshell.guid.new(), Name="Wall")
+        total = len(list(self.file))
+        progress = []
+        path = str(tmp_path / "test.ifc")
+        self.file.write(path, progress=lambda i, n: progress.append((i, n)), chunk_size=2)
+        assert progress[-1] == (total, total)
+        assert ifcopenshell.open(path).by_type("IfcWall")[0].Name == "Wall"
+
+    def test_writing_a_compressed_file(self, tmp_path):
+        self.file.createIfcWall(ifcopenshell.guid.new(), Name="Wall")
+        path = str(tmp_path / "test.ifc.gz")
+        self.file.write(path)
+        with gzip.open(path, "rt") as f:
+            assert "IFCWALL" in f.read()
+        path = str(tmp_path / "test.ifczip")
+        self.file.write(path)
+        with zipfile.ZipFile(path) as archive:
+            assert archive.namelist() == ["test.ifc"]
+            assert "IFCWALL" in archive.read("test.ifc").decode()
+
+    def test_opening_a_zipped_file(self, tmp_path):
+        self.file.createIfcWall(ifcopenshell.guid.new(), Name="Wall")
+        path = str(tmp_path / "test.ifczip")
+        self.file.write(path)
+        f = ifcopenshell.open(path)
+        assert f.by_type("IfcWall")[0].Name == "Wall"
+
+    def test_iterating_over_serialised_lines(self):
+        self.file.createIfcWall(ifcopenshell.guid.new(), Name="Wall")
+        lines = list(self.file.iter_lines())
+        assert len(lines) == len(list(self.file))
+        assert lines == [l for l in self.file.to_string().splitlines() if l.startswith("#")]
+
     def test_getting_an_element_by_id(self):
         element = self.file.createIfcWall("id")
         assert self.file.by_id(1) == element
@@ -177,6 +364,37 @@ class TestFile(test.bootstrap.IFC4):
         assert self.file.by_type("IfcElement") == [wall]
         assert len(self.file.by_type("IfcElement", include_subtypes=False)) == 0
 
+    def test_getting_attribute_columns_of_a_type(self):
+        owner = self.file.createIfcOwnerHistory()
+        wall = self.file.createIfcWall(GlobalId="id", Name="foo", OwnerHistory=owner)
+        wall2 = self.file.createIfcWallStandardCase(GlobalId="id2")
+        self.file.createIfcSlab()
+        columns = self.file.get_columns("IfcWall", ["Name", "OwnerHistory"])
+        assert list(columns["id"]) == [wall.id(), wall2.id()]
+        assert list(columns["Name"]) == ["foo", None]
+        assert list(columns["OwnerHistory"]) == [owner.id(), 0]
+
+    def test_getting_attribute_columns_of_select_values(self):
+        self.file.createIfcPropertySingleValue("foo", None, self.file.createIfcInteger(3))
+        person = self.file.createIfcPerson()
+        self.file.createIfcActor(TheActor=person)
+        self.file.createIfcPropertyEnumeratedValue(
+            "bar", None, [self.file.createIfcLabel("a"), self.file.createIfcLabel("b")]
+        )
+        columns = self.file.get_columns("IfcPropertySingleValue", ["NominalValue"])
+        assert list(columns["NominalValue"]) == [("IfcInteger", 3)]
+        columns = self.file.get_columns("IfcPropertyEnumeratedValue", ["EnumerationValues"])
+        assert list(columns["EnumerationValues"]) == [(("IfcLabel", "a"), ("IfcLabel", "b"))]
+        columns = self.file.get_columns("IfcActor", ["TheActor"])
+        assert list(columns["TheActor"]) == [person.id()]
+
+    def test_getting_attribute_columns_of_an_exact_type(self):
+        wall = self.file.createIfcWall(Name="foo")
+        self.file.createIfcWallStandardCase()
+        columns = self.file.get_columns("IfcWall", ["Name"], include_subtypes=False)
+        assert list(columns["id"]) == [wall.id()]
+        assert list(columns["Name"]) == ["foo"]
+
     def test_traversing_direct_attributes_of_an_element(self):
         owner = self.file.createIfcOwnerHistory()
         element = self.file.createIfcWall(OwnerHistory=owner)
@@ -236,6 +454,16 @@ class TestFile(test.bootstrap.IFC4):
         self.file.remove(wall)
         assert rel.RelatedObjects == tuple()
 
+    def test_removing_an_element_and_its_indices_are_updated(self):
+        owner = self.file.createIfcOwnerHistory()
+        wall = self.file.createIfcWall(GlobalId="wall", OwnerHistory=owner)
+        slab = self.file.createIfcSlab(GlobalId="slab", OwnerHistory=owner)
+        self.file.remove(wall)
+        assert self.file.get_inverse(owner) == {slab}
+        assert self.file.by_type("IfcWall") == []
+        assert self.file.by_type("IfcElement") == [slab]
+        assert self.file.by_guid("slab") == slab
+
     def test_batched_removing_an_element(self):
         element = self.file.createIfcWall(GlobalId="global_id")
         self.file.batch()
@@ -289,6 +289,76 @@ class TestIfcValidation(unittest.TestCase):
     #     # self.assertTrue(   )
 
 
+class TestIdsEvaluation(unittest.TestCase):
+    def test_specifications_only_apply_to_elements_of_their_entity(self):
+        ifc_file = ifcopenshell.file(schema="IFC4")
+        wall = ifc_file.createIfcWall(ifcopenshell.guid.new())
+        slab = ifc_file.createIfcSlab(ifcopenshell.guid.new())
+        spec = ids.specification(name="Walls")
+        spec.add_applicability(ids.entity.create(name="IfcWall"))
+        self.assertTrue(spec.may_apply(wall))
+        self.assertFalse(spec.may_apply(slab))
+
+    def test_evaluation_messages_are_formatted_lazily(self):
+        calls = []
+        evaluation = ids.facet_evaluation(True, lambda: calls.append(1) or "message")
+        self.assertEqual(calls, [])
+        self.assertEqual(str(evaluation), "message")
+        self.assertEqual(str(evaluation), "message")
+        self.assertEqual(calls, [1])
+
+    def test_lookups_are_only_shared_within_a_validation(self):
+        ifc_file = ifcopenshell.file(schema="IFC4")
+        wall = ifc_file.createIfcWall(ifcopenshell.guid.new())
+        logger = logging.Logger("IDS_Test")
+        facet = ids.material.create(location="any", value="Concrete")
+        lookups = ids.facet_lookups()
+        lookups.set_element(wall)
+        self.assertFalse(facet(wall, logger, lookups))
+        material = ifc_file.createIfcMaterial("Concrete")
+        ifc_file.createIfcRelAssociatesMaterial(
+            ifcopenshell.guid.new(), RelatedObjects=[wall], RelatingMaterial=material
+        )
+        self.assertFalse(facet(wall, logger, lookups))
+        self.assertTrue(facet(wall, logger))
+        self.assertTrue(facet(wall, logger, ids.facet_lookups()))
+
+
+class TestIdsParallelValidation(unittest.TestCase):
+    def setUp(self):
+        self.ids_file = ids.ids()
+        spec = ids.specification(name="Walls")
+        spec.add_applicability(ids.entity.create(name="IfcWall"))
+        spec.add_requirement(ids.material.create(location="any", value="Concrete"))
+        self.ids_file.specifications.append(spec)
+        self.ifc_file = ifcopenshell.file(schema="IFC4")
+        self.walls = [self.ifc_file.createIfcWall(ifcopenshell.guid.new()) for i in range(5)]
+        self.logger = logging.Logger("IDS_Test")
+
+    def get_elements(self, validate):
+        report = ids.SimpleHandler()
+        self.logger.addHandler(report)
+        validate()
+        self.logger.removeHandler(report)
+        return [statement["ifc_element"] for statement in report.statements if isinstance(statement, dict)]
+
+    def test_validating_an_opened_file_in_parallel_uses_its_unsaved_changes(self):
+        fn = os.path.join(tempfile.mkdtemp(), "test.ifc")
+        self.ifc_file.write(fn)
+        self.walls.append(self.ifc_file.createIfcWall(ifcopenshell.guid.new()))
+        elements = self.get_elements(
+            lambda: self.ids_file.validate_parallel(fn, self.logger, processes=2, ifc_file=self.ifc_file)
+        )
+        self.assertEqual(elements, self.walls)
+        self.assertEqual(elements, self.get_elements(lambda: self.ids_file.validate(self.ifc_file, self.logger)))
+
+    def test_validating_a_file_path_in_parallel_reports_elements(self):
+        fn = os.path.join(tempfile.mkdtemp(), "test.ifc")
+        self.ifc_file.write(fn)
+        elements = self.get_elements(lambda: self.ids_file.validate_parallel(fn, self.logger, processes=2))
+        self.assertEqual([e.GlobalId for e in elements], [w.GlobalId for w in self.walls])
+
+
 class TestIdsReporting(unittest.TestCase):
 
     TEST_PATH = os.getcwd()
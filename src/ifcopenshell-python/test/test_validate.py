@@ -0,0 +1,32 @@
+import test.bootstrap
+import ifcopenshell
+import ifcopenshell.guid
+import ifcopenshell.validate
+
+
+class TestValidate(test.bootstrap.IFC4):
+    def get_issues(self, statements):
+        return sorted((str(s["instance"]), s["message"]) for s in statements)
+
+    def test_validating_in_parallel_gives_the_same_issues_as_serially(self, tmp_path):
+        owner = self.file.createIfcOwnerHistory()
+        for i in range(20):
+            self.file.createIfcWall(OwnerHistory=owner)
+            self.file.createIfcWall(GlobalId=ifcopenshell.guid.new(), Name="Wall %d" % i)
+            self.file.createIfcCartesianPoint((0.0, 0.0, float(i)))
+        path = str(tmp_path / "test.ifc")
+        self.file.write(path)
+
+        logger = ifcopenshell.validate.json_logger()
+        ifcopenshell.validate.validate(ifcopenshell.open(path), logger)
+        expected = self.get_issues(logger.statements)
+        assert expected
+        assert self.get_issues(ifcopenshell.validate.validate_parallel(path, processes=2)) == expected
+
+    def test_emitting_statements_as_they_are_logged(self):
+        self.file.createIfcWall()
+        statements = []
+        logger = ifcopenshell.validate.json_logger(emit=statements.append)
+        ifcopenshell.validate.validate(self.file, logger)
+        assert statements
+        assert logger.statements == []
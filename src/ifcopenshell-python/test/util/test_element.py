@@ -53,6 +53,91 @@ class TestGetPsetsIFC4(test.bootstrap.IFC4):
         assert subject.get_psets(element, qtos_only=True) == {"qto": {"x": 42, "id": qto.id()}}
 
 
+class TestGetPsetsWithPsetIndexIFC4(TestGetPsetsIFC4):
+    @pytest.fixture(autouse=True)
+    def setup_index(self, setup):
+        subject.enable_pset_index(self.file)
+
+    def test_sharing_a_pset_between_elements(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        element2 = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": "b"})
+        pset.PropertyDefinitionOf[0].RelatedObjects = [element, element2]
+        subject.enable_pset_index(self.file)
+        assert subject.get_psets(element2) == {"name": {"a": "b", "id": pset.id()}}
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": "c"})
+        assert subject.get_psets(element) == {"name": {"a": "c", "id": pset.id()}}
+        assert subject.get_psets(element2) == {"name": {"a": "c", "id": pset.id()}}
+
+    def test_renaming_a_pset(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        assert subject.get_psets(element) == {"name": {"id": pset.id()}}
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, name="name2")
+        assert subject.get_psets(element) == {"name2": {"id": pset.id()}}
+
+    def test_removing_a_pset(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        ifcopenshell.api.run("pset.remove_pset", self.file, product=element, pset=pset)
+        assert subject.get_psets(element) == {}
+
+    def test_results_can_be_modified_without_affecting_the_index(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        subject.get_psets(element)["name"]["a"] = "b"
+        assert subject.get_psets(element) == {"name": {"id": pset.id()}}
+
+    def test_nested_results_can_be_modified_without_affecting_the_index(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        prop = self.file.createIfcPropertySingleValue("a", None, self.file.createIfcLabel("b"))
+        complex_prop = self.file.createIfcComplexProperty("complex", None, "usage", [prop])
+        pset = self.file.createIfcPropertySet(ifcopenshell.guid.new(), Name="name", HasProperties=[complex_prop])
+        self.file.createIfcRelDefinesByProperties(
+            ifcopenshell.guid.new(), RelatedObjects=[element], RelatingPropertyDefinition=pset
+        )
+        subject.enable_pset_index(self.file)
+        subject.get_psets(element)["name"]["complex"]["properties"]["a"] = "c"
+        assert subject.get_psets(element)["name"]["complex"]["properties"] == {"a": "b"}
+
+    def test_undoing_and_redoing_without_rebuilding_the_index(self, monkeypatch):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": "b"})
+        monkeypatch.setattr(self.file.pset_index, "build", None)
+        self.file.begin_transaction()
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"a": "c"})
+        self.file.end_transaction()
+        self.file.begin_transaction()
+        pset2 = ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name2")
+        self.file.end_transaction()
+        assert subject.get_psets(element) == {"name": {"a": "c", "id": pset.id()}, "name2": {"id": pset2.id()}}
+        self.file.undo()
+        assert subject.get_psets(element) == {"name": {"a": "c", "id": pset.id()}}
+        self.file.undo()
+        assert subject.get_psets(element) == {"name": {"a": "b", "id": pset.id()}}
+        self.file.redo()
+        assert subject.get_psets(element) == {"name": {"a": "c", "id": pset.id()}}
+
+    def test_discarding_a_transaction(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        self.file.begin_transaction()
+        ifcopenshell.api.run("pset.add_pset", self.file, product=element, name="name")
+        assert "name" in subject.get_psets(element)
+        self.file.discard_transaction()
+        assert subject.get_psets(element) == {}
+
+    def test_disabling_the_index(self):
+        element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        subject.disable_pset_index(self.file)
+        pset = self.file.createIfcPropertySet(ifcopenshell.guid.new(), Name="name")
+        self.file.createIfcRelDefinesByProperties(
+            ifcopenshell.guid.new(), RelatedObjects=[element], RelatingPropertyDefinition=pset
+        )
+        assert subject.get_psets(element) == {"name": {"id": pset.id()}}
+
+
 class TestGetPropertyDefinitionIFC4(test.bootstrap.IFC4):
     def test_getting_the_properties_of_a_pset(self):
         element = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
@@ -0,0 +1,113 @@
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.guid
+import ifcopenshell.util.element
+import ifcopenshell.util.fm as subject
+
+
+class TestExtractionIndexIFC4(test.bootstrap.IFC4):
+    def setup_file(self):
+        project = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        site = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcSite")
+        storey = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBuildingStorey")
+        ifcopenshell.api.run("aggregate.assign_object", self.file, product=site, relating_object=project)
+        ifcopenshell.api.run("aggregate.assign_object", self.file, product=storey, relating_object=site)
+        wall_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=wall_type, name="Pset_WallCommon")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Reference": "Type"})
+        walls = [ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall") for i in range(3)]
+        for wall in walls[:2]:
+            ifcopenshell.api.run("type.assign_type", self.file, related_object=wall, relating_type=wall_type)
+            ifcopenshell.api.run("spatial.assign_container", self.file, product=wall, relating_structure=storey)
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=walls[0], name="Pset_WallCommon")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Reference": "A", "IsExternal": True})
+        pset.DefinesOccurrence[0].RelatedObjects = walls[:2]
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=walls[1], name="Foo_Bar")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Foo": "Bar"})
+        qto = ifcopenshell.api.run("pset.add_qto", self.file, product=walls[2], name="Qto_WallBaseQuantities")
+        ifcopenshell.api.run("pset.edit_qto", self.file, qto=qto, properties={"Length": 1.0})
+        reference = self.file.createIfcClassificationReference(Identification="1.2")
+        self.file.createIfcRelAssociatesClassification(
+            ifcopenshell.guid.new(), RelatedObjects=[walls[0], wall_type], RelatingClassification=reference
+        )
+        self.file.createIfcRelAssociatesClassification(
+            ifcopenshell.guid.new(),
+            RelatedObjects=[walls[1]],
+            RelatingClassification=self.file.createIfcClassification(),
+        )
+        return [storey, wall_type] + walls
+
+    def get_classification(self, element):
+        for rel in getattr(element, "HasAssociations", None) or []:
+            if rel.is_a("IfcRelAssociatesClassification") and rel.RelatingClassification.is_a(
+                "IfcClassificationReference"
+            ):
+                return rel.RelatingClassification
+
+    def test_getting_the_psets_of_elements(self):
+        elements = self.setup_file()
+        index = subject.ExtractionIndex(self.file)
+        for element in elements:
+            psets = ifcopenshell.util.element.get_psets(element, psets_only=True)
+            for name, properties in psets.items():
+                pset = index.get_pset(element, name)
+                assert pset.id() == properties["id"]
+                for prop_name, value in properties.items():
+                    if prop_name != "id":
+                        assert index.get_property(pset, prop_name).NominalValue.wrappedValue == value
+                assert index.get_property(pset, "Baz") is None
+            assert index.get_pset(element, "Qto_WallBaseQuantities") is None
+            assert index.get_pset(element, "Baz") is None
+        assert (
+            index.get_pset(elements[2], "Pset_WallCommon").id() != index.get_pset(elements[1], "Pset_WallCommon").id()
+        )
+        assert index.get_pset(elements[3], "Pset_WallCommon") == index.get_pset(elements[2], "Pset_WallCommon")
+
+    def test_getting_the_qtos_of_elements(self):
+        elements = self.setup_file()
+        index = subject.ExtractionIndex(self.file)
+        for element in elements:
+            qtos = ifcopenshell.util.element.get_psets(element, qtos_only=True)
+            for name, quantities in qtos.items():
+                assert index.get_qto(element, name).id() == quantities["id"]
+            assert index.get_qto(element, "Pset_WallCommon") is None
+        assert index.get_qto(elements[4], "Qto_WallBaseQuantities") is not None
+
+    def test_getting_the_types_of_elements(self):
+        elements = self.setup_file()
+        index = subject.ExtractionIndex(self.file)
+        for element in elements:
+            if not element.is_a("IfcTypeObject"):
+                assert index.get_type(element) == ifcopenshell.util.element.get_type(element)
+        assert index.get_type(elements[2]) == elements[1]
+        assert index.get_type(elements[4]) is None
+
+    def test_getting_the_containers_of_elements(self):
+        elements = self.setup_file()
+        index = subject.ExtractionIndex(self.file)
+        for element in elements:
+            container = ifcopenshell.util.element.get_container(element, should_get_direct=True)
+            assert index.get_containers(element) == ([container] if container else [])
+        assert index.get_containers(elements[2]) == [elements[0]]
+
+    def test_getting_the_classification_references_of_elements(self):
+        elements = self.setup_file()
+        index = subject.ExtractionIndex(self.file)
+        for element in elements:
+            assert index.get_classification(element) == self.get_classification(element)
+        assert index.get_classification(elements[1]).Identification == "1.2"
+        assert index.get_classification(elements[3]) is None
+
+
+class TestExtractionIndexIFC2X3(test.bootstrap.IFC2X3):
+    def test_getting_the_psets_and_types_of_elements(self):
+        wall_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        ifcopenshell.api.run("type.assign_type", self.file, related_object=wall, relating_type=wall_type)
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=wall, name="Foo_Bar")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Foo": "Bar"})
+        index = subject.ExtractionIndex(self.file)
+        assert index.get_type(wall) == ifcopenshell.util.element.get_type(wall) == wall_type
+        assert index.get_pset(wall, "Foo_Bar").id() == ifcopenshell.util.element.get_psets(wall)["Foo_Bar"]["id"]
+        assert index.get_property(pset, "Foo").NominalValue.wrappedValue == "Bar"
+        assert index.get_pset(wall_type, "Foo_Bar") is None
@@ -0,0 +1,84 @@
+import pytest
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.util.selector as subject
+
+
+class TestSelectorIFC4(test.bootstrap.IFC4):
+    def test_selecting_by_class(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcSlab")
+        assert subject.Selector().parse(self.file, ".IfcWall") == [wall]
+
+    def test_selecting_by_global_id(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        assert subject.Selector().parse(self.file, "#" + wall.GlobalId) == [wall]
+
+    def test_selecting_by_attribute(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foo")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Bar")
+        assert subject.Selector().parse(self.file, '.IfcWall[Name="Foo"]') == [wall]
+
+    def test_selecting_by_pset_property(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=wall, name="Foo_Bar")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Baz": "Qux"})
+        assert subject.Selector().parse(self.file, '.IfcWall[Foo_Bar.Baz="Qux"]') == [wall]
+
+    def test_selecting_by_type_pset_property(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        wall_type = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWallType")
+        ifcopenshell.api.run("type.assign_type", self.file, related_object=wall, relating_type=wall_type)
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=wall_type, name="Foo_Bar")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Baz": "Qux"})
+        assert subject.Selector().parse(self.file, '.IfcWall[type.Foo_Bar.Baz="Qux"]') == [wall]
+
+    def test_selecting_by_container_attribute(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        storey = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBuildingStorey", name="Level 1")
+        ifcopenshell.api.run("spatial.assign_container", self.file, product=wall, relating_structure=storey)
+        assert subject.Selector().parse(self.file, '.IfcWall[container.Name="Level 1"]') == [wall]
+
+    def test_selecting_with_and(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foo")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Bar")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcSlab", name="Foo")
+        results = subject.Selector().parse(self.file, '.IfcElement[Name="Foo"] & .IfcWall')
+        assert results == [wall]
+
+    def test_selecting_with_or(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        slab = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcSlab")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBeam")
+        assert set(subject.Selector().parse(self.file, ".IfcWall | .IfcSlab")) == {wall, slab}
+
+    def test_selecting_with_groups(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foo")
+        slab = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcSlab", name="Foo")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcBeam", name="Foo")
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Bar")
+        results = subject.Selector().parse(self.file, '.IfcElement[Name="Foo"] & (.IfcWall | .IfcSlab)')
+        assert set(results) == {wall, slab}
+
+    def test_selecting_from_a_modified_file_with_the_same_selector(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall")
+        selector = subject.Selector()
+        assert selector.parse(self.file, '.IfcWall[Foo_Bar.Baz="Qux"]') == []
+        pset = ifcopenshell.api.run("pset.add_pset", self.file, product=wall, name="Foo_Bar")
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Baz": "Qux"})
+        assert selector.parse(self.file, '.IfcWall[Foo_Bar.Baz="Qux"]') == [wall]
+        assert selector.get_element_value(wall, "Foo_Bar.Baz") == "Qux"
+        ifcopenshell.api.run("pset.edit_pset", self.file, pset=pset, properties={"Baz": "Quux"})
+        assert selector.get_element_value(wall, "Foo_Bar.Baz") == "Quux"
+        assert selector.parse(self.file, '.IfcWall[Foo_Bar.Baz="Qux"]') == []
+
+    def test_getting_element_values(self):
+        wall = ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcWall", name="Foo")
+        selector = subject.Selector()
+        assert selector.get_element_value(wall, "Name") == "Foo"
+        assert selector.get_element_value(wall, "type") == "IfcWall"
+        assert selector.get_element_value(wall, "id") == wall.id()
+        assert selector.get_element_value(wall, "type.Name") is None
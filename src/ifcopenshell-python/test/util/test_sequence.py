@@ -0,0 +1,55 @@
+import pytest
+import datetime
+import test.bootstrap
+import ifcopenshell.api
+import ifcopenshell.util.sequence as subject
+
+
+class TestWorkingDayTableIFC4(test.bootstrap.IFC4):
+    def create_weekday_calendar(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        calendar = ifcopenshell.api.run("sequence.add_work_calendar", self.file)
+        work_time = ifcopenshell.api.run(
+            "sequence.add_work_time", self.file, work_calendar=calendar, time_type="WorkingTimes"
+        )
+        pattern = ifcopenshell.api.run("sequence.assign_recurrence_pattern", self.file, parent=work_time)
+        ifcopenshell.api.run(
+            "sequence.edit_recurrence_pattern",
+            self.file,
+            recurrence_pattern=pattern,
+            attributes={"WeekdayComponent": [1, 2, 3, 4, 5]},
+        )
+        holiday = ifcopenshell.api.run(
+            "sequence.add_work_time", self.file, work_calendar=calendar, time_type="ExceptionTimes"
+        )
+        holiday.Start = "2022-01-03"
+        holiday.Finish = "2022-01-07"
+        return calendar
+
+    def test_getting_finish_dates_identical_to_walking_each_day(self):
+        calendar = self.create_weekday_calendar()
+        table = subject.WorkingDayTable(calendar)
+        start = datetime.datetime(2021, 12, 20)
+        for offset in range(30):
+            for days in (-20, -1, 0, 1, 5, 20):
+                date = start + datetime.timedelta(days=offset)
+                assert table.get_finish_date(date, days) == subject.get_finish_date(
+                    date, datetime.timedelta(days=days), "WORKTIME", calendar
+                )
+
+    def test_counting_working_days_identical_to_walking_each_day(self):
+        calendar = self.create_weekday_calendar()
+        table = subject.WorkingDayTable(calendar)
+        start = datetime.datetime(2021, 12, 20)
+        for offset in range(30):
+            for days in (-5, 0, 1, 7, 30, 800):
+                date = start + datetime.timedelta(days=offset)
+                finish = date + datetime.timedelta(days=days)
+                assert table.count_working_days(date, finish) == subject.count_working_days(date, finish, calendar)
+
+    def test_failing_to_find_a_working_day_in_a_calendar_without_working_times(self):
+        ifcopenshell.api.run("root.create_entity", self.file, ifc_class="IfcProject")
+        calendar = ifcopenshell.api.run("sequence.add_work_calendar", self.file)
+        table = subject.WorkingDayTable(calendar)
+        with pytest.raises(ValueError):
+            table.get_finish_date(datetime.date(2022, 1, 1), 1)
@@ -25,6 +25,7 @@
 #include <iterator>
 
 #include <boost/unordered_map.hpp>
+#include <boost/container/flat_map.hpp>
 #include <boost/multi_index_container.hpp>
 #include <boost/multi_index/sequenced_index.hpp>
 #include <boost/multi_index/ordered_index.hpp>
@@ -72,12 +73,16 @@ public:
 /// and provide access to the entities in an IFC file
 class IFC_PARSE_API IfcFile {
 public:
-	typedef std::map<const IfcParse::declaration*, aggregate_of_instance::ptr> entities_by_type_t;
+	typedef boost::unordered_map<const IfcParse::declaration*, aggregate_of_instance::ptr> entities_by_type_t;
 	typedef boost::unordered_map<unsigned int, IfcUtil::IfcBaseClass*> entity_by_id_t;
-	typedef std::map<std::string, IfcUtil::IfcBaseClass*> entity_by_guid_t;
-	typedef std::tuple<int, int, int> inverse_attr_record;
-	enum INVERSE_ATTR { INSTANCE_ID, INSTANCE_TYPE, ATTRIBUTE_INDEX };
-	typedef std::map<inverse_attr_record, std::vector<int> > entities_by_ref_t;
+	typedef boost::unordered_map<std::string, IfcUtil::IfcBaseClass*> entity_by_guid_t;
+	/// The entity type index in the schema and the attribute index of a reference
+	typedef std::pair<int, int> inverse_attr_key;
+	/// The ids of the instances referencing a single instance, stored contiguously
+	/// and ordered by entity type and attribute, as there are typically only a few
+	typedef boost::container::flat_map<inverse_attr_key, std::vector<int> > inverse_attr_map;
+	/// The inverse references of every instance, hashed by the id of the referenced instance
+	typedef boost::unordered_map<int, inverse_attr_map> entities_by_ref_t;
 	typedef std::map<unsigned int, aggregate_of_instance::ptr> ref_map_t;
 	typedef entity_by_id_t::const_iterator const_iterator;
 
@@ -120,6 +125,13 @@ public:
 	static bool guid_map() { return guid_map_; }
 	static void guid_map(bool b) { guid_map_ = b; }
 
+	/// The number of threads used to parse the data section of a file.
+	/// With more than one, the data section is split into chunks of whole
+	/// instances which are tokenised in parallel and merged in file order.
+	static unsigned parse_threads_;
+	static unsigned parse_threads() { return parse_threads_; }
+	static void parse_threads(unsigned n) { parse_threads_ = n; }
+
 private:
 	typedef std::map<uint32_t, IfcUtil::IfcBaseClass*> entity_entity_map_t;
 
@@ -145,6 +157,12 @@ private:
 
 	void initialize_(IfcParse::IfcSpfStream* f);
 
+	void parse_parallel_(unsigned threads);
+
+	void index_instance_(unsigned id, IfcUtil::IfcBaseClass* instance);
+
+	void index_guid_(const std::string& guid, IfcUtil::IfcBaseClass* instance);
+
 	void build_inverses_(IfcUtil::IfcBaseClass*);
 
 	typedef boost::multi_index_container<
@@ -253,10 +271,13 @@ public:
 	template <class T>
 	typename T::list::ptr getInverse(int instance_id, int attribute_index) {
 		aggregate_of_instance::ptr return_value(new aggregate_of_instance);
-		auto it = byref.find({ instance_id, T::Class().index_in_schema(), attribute_index });
-		if (it != byref.end()) {
-			for (auto& i : it->second) {
-				return_value->push((T*)instance_by_id(i));
+		auto refs = byref.find(instance_id);
+		if (refs != byref.end()) {
+			auto it = refs->second.find({ T::Class().index_in_schema(), attribute_index });
+			if (it != refs->second.end()) {
+				for (auto& i : it->second) {
+					return_value->push((T*)instance_by_id(i));
+				}
 			}
 		}
 		return return_value;
@@ -300,6 +321,7 @@ public:
 
 	void register_inverse(unsigned, const IfcParse::entity* from_entity, Token, int attribute_index);
 	void register_inverse(unsigned, const IfcParse::entity* from_entity, IfcUtil::IfcBaseClass*, int attribute_index);
+	void register_inverse(unsigned, const IfcParse::entity* from_entity, int id_to, int attribute_index);
 	void unregister_inverse(unsigned, const IfcParse::entity* from_entity, IfcUtil::IfcBaseClass*, int attribute_index);
     
 	const IfcParse::schema_definition* schema() const { return schema_; }
@@ -314,6 +336,9 @@ public:
 
 #ifdef WITH_IFCXML
 IFC_PARSE_API IfcFile* parse_ifcxml(const std::string& filename);
+/// Parses ifcXML from memory, which is not copied and only needs to be
+/// kept alive during the call
+IFC_PARSE_API IfcFile* parse_ifcxml_buffer(const char* data, int len);
 #endif
 
 }
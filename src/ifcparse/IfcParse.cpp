@@ -34,6 +34,7 @@
 #include <set>
 #include <ctime>
 #include <mutex>
+#include <thread>
 #include <string>
 #include <stdio.h>
 #include <stdlib.h>
@@ -111,6 +112,7 @@ IfcSpfStream::IfcSpfStream(const std::string& fn)
 #endif
 	: stream(0)
 	, buffer(0)
+	, owned(true)
 	, valid(false)
 	, eof(false)
 {
@@ -148,10 +150,10 @@ IfcSpfStream::IfcSpfStream(const std::string& fn)
 			return;
 		}
 
-		valid = true;
+		valid = mfs.size() <= max_length();
 		buffer = mfs.data();
 		ptr = 0;
-		len = mfs.size();
+		len = (unsigned int) mfs.size();
 	} else {
 #endif
 		if (stream == NULL) {
@@ -176,6 +178,7 @@ IfcSpfStream::IfcSpfStream(const std::string& fn)
 IfcSpfStream::IfcSpfStream(std::istream& f, int l)
 	: stream(0)
 	, buffer(0)
+	, owned(true)
 {
 	eof = false;
 	size = l;
@@ -187,16 +190,17 @@ IfcSpfStream::IfcSpfStream(std::istream& f, int l)
 	len = l;	
 }
 
-IfcSpfStream::IfcSpfStream(void* data, int l)
+IfcSpfStream::IfcSpfStream(void* data, size_t l, bool o)
 	: stream(0)
 	, buffer(0)
+	, owned(o)
 {
 	eof = false;
-	size = l;
+	size = (unsigned int) l;
 	buffer = (char*) data;
-	valid = true;
+	valid = l <= max_length();
 	ptr = 0;
-	len = l;
+	len = (unsigned int) l;
 }
 
 IfcSpfStream::~IfcSpfStream()
@@ -211,7 +215,10 @@ void IfcSpfStream::Close() {
 		return;
 	}
 #endif
-	delete[] buffer;
+	if (owned) {
+		delete[] buffer;
+	}
+	buffer = 0;
 }
 
 //
@@ -971,27 +978,27 @@ void IfcParse::IfcFile::try_read_semicolon() {
 
 void IfcParse::IfcFile::register_inverse(unsigned id_from, const IfcParse::entity* from_entity, Token t, int attribute_index) {
 	// Assume a check on token type has already been performed
+	register_inverse(id_from, from_entity, t.value_int, attribute_index);
+}
+
+void IfcParse::IfcFile::register_inverse(unsigned id_from, const IfcParse::entity* from_entity, int id_to, int attribute_index) {
 	auto e = from_entity;
-	byref_excl[{t.value_int, e->index_in_schema(), attribute_index}].push_back(id_from);
+	byref_excl[id_to][{e->index_in_schema(), attribute_index}].push_back(id_from);
+	auto& refs = byref[id_to];
 	while (e) {
-		byref[{t.value_int, e->index_in_schema(), attribute_index}].push_back(id_from);
+		refs[{e->index_in_schema(), attribute_index}].push_back(id_from);
 		e = e->supertype();
 	}
 }
 
 void IfcParse::IfcFile::register_inverse(unsigned id_from, const IfcParse::entity* from_entity, IfcUtil::IfcBaseClass* inst, int attribute_index) {
-	auto e = from_entity;
-	byref_excl[{inst->data().id(), e->index_in_schema(), attribute_index}].push_back(id_from);
-	while (e) {
-		byref[{inst->data().id(), e->index_in_schema(), attribute_index}].push_back(id_from);
-		e = e->supertype();
-	}
+	register_inverse(id_from, from_entity, (int) inst->data().id(), attribute_index);
 }
 
 void IfcParse::IfcFile::unregister_inverse(unsigned id_from, const IfcParse::entity* from_entity, IfcUtil::IfcBaseClass* inst, int attribute_index) {
 	auto e = from_entity;
 	while (e) {
-		std::vector<int>& ids = byref[{inst->data().id(), e->index_in_schema(), attribute_index}];
+		std::vector<int>& ids = byref[inst->data().id()][{e->index_in_schema(), attribute_index}];
 		std::vector<int>::iterator it = std::find(ids.begin(), ids.end(), id_from);
 		if (it == ids.end()) {
 			// @todo inverses also need to be populated when multiple instances are added to a new file.
@@ -1002,7 +1009,7 @@ void IfcParse::IfcFile::unregister_inverse(unsigned id_from, const IfcParse::ent
 		e = e->supertype();
 	}
 
-	std::vector<int>& ids = byref_excl[{inst->data().id(), from_entity->index_in_schema(), attribute_index}];
+	std::vector<int>& ids = byref_excl[inst->data().id()][{from_entity->index_in_schema(), attribute_index}];
 	std::vector<int>::iterator it = std::find(ids.begin(), ids.end(), id_from);
 	if (it == ids.end()) {
 		// @todo inverses also need to be populated when multiple instances are added to a new file.
@@ -1444,6 +1451,213 @@ IfcFile::IfcFile(const IfcParse::schema_definition* schema)
 	setDefaultHeaderValues();
 }
 
+void IfcFile::index_instance_(unsigned id, IfcUtil::IfcBaseClass* instance) {
+	const IfcParse::declaration* ty = &instance->declaration();
+
+	{
+		aggregate_of_instance::ptr insts = instances_by_type_excl_subtypes(ty);
+		if (!insts) {
+			insts = aggregate_of_instance::ptr(new aggregate_of_instance());
+			bytype_excl[ty] = insts;
+		}
+		insts->push(instance);
+	}
+
+	for (;;) {
+		aggregate_of_instance::ptr insts = instances_by_type(ty);
+		if (!insts) {
+			insts = aggregate_of_instance::ptr(new aggregate_of_instance());
+			bytype[ty] = insts;
+		}
+		insts->push(instance);
+		const IfcParse::declaration* pt = ty->as_entity()->supertype();
+		if (pt) {
+			ty = pt;
+		} else {
+			break;
+		}
+	}
+
+	if (byid.find(id) != byid.end()) {
+		std::stringstream ss;
+		ss << "Overwriting instance with name #" << id;
+		Logger::Message(Logger::LOG_WARNING,ss.str());
+	}
+	byid[id] = instance;
+
+	MaxId = (std::max)(MaxId, id);
+}
+
+void IfcFile::index_guid_(const std::string& guid, IfcUtil::IfcBaseClass* instance) {
+	if ( byguid.find(guid) != byguid.end() ) {
+		std::stringstream ss;
+		ss << "Instance encountered with non-unique GlobalId " << guid;
+		Logger::Message(Logger::LOG_WARNING,ss.str());
+	}
+	byguid[guid] = instance;
+}
+
+namespace {
+	struct parsed_reference {
+		unsigned id_from;
+		const IfcParse::entity* entity;
+		int id_to;
+		int attribute_index;
+	};
+
+	/// The instances, GlobalIds and references found in a chunk of the data
+	/// section, in file order, to be merged into the file indices afterwards.
+	struct parsed_chunk {
+		std::vector<std::pair<unsigned, IfcUtil::IfcBaseClass*> > instances;
+		std::vector<std::pair<std::string, IfcUtil::IfcBaseClass*> > guids;
+		std::vector<parsed_reference> references;
+		std::vector<std::string> errors;
+	};
+
+	// Scans the instances starting in [begin, end) with a lexer of its own,
+	// which shares the buffer of the file so token offsets remain valid for
+	// lazy loading. Unlike the serial scan, instances are never loaded here,
+	// as loading uses the lexer of the file, so GlobalIds are read from the
+	// token stream instead.
+	void scan_chunk(IfcParse::IfcFile* file, const IfcParse::declaration* ifcroot_type, const char* buffer, size_t length, unsigned begin, unsigned end, parsed_chunk& chunk) {
+		IfcSpfStream stream((void*) buffer, length, false);
+		stream.Seek(begin);
+		IfcSpfLexer lexer(&stream, file);
+
+		boost::circular_buffer<Token> token_stream(3, Token());
+		IfcUtil::IfcBaseClass* instance = 0;
+		unsigned current_id = 0;
+		int paren_stack_depth = 0;
+		int attribute_index = -1;
+		bool is_guid_pending = false;
+
+		while (!stream.eof) {
+			if (token_stream[0].type == IfcParse::Token_IDENTIFIER &&
+				token_stream[1].type == IfcParse::Token_OPERATOR &&
+				token_stream[1].value_char == '=' &&
+				token_stream[2].type == IfcParse::Token_KEYWORD)
+			{
+				attribute_index = 0;
+				current_id = (unsigned) TokenFunc::asIdentifier(token_stream[0]);
+				instance = 0;
+				is_guid_pending = false;
+				try {
+					const IfcParse::declaration* entity_type = file->schema()->declaration_by_name(TokenFunc::asStringRef(token_stream[2]));
+					IfcEntityInstanceData* data = new IfcEntityInstanceData(entity_type, file, current_id, token_stream[2].startPos);
+					instance = file->schema()->instantiate(data);
+					chunk.instances.push_back(std::make_pair(current_id, instance));
+					is_guid_pending = instance->declaration().is(*ifcroot_type);
+				} catch (const IfcException& ex) {
+					chunk.errors.push_back(ex.what());
+				}
+			} else if (token_stream[0].type == IfcParse::Token_IDENTIFIER && instance) {
+				chunk.references.push_back({ current_id, instance->declaration().as_entity(), token_stream[0].value_int, attribute_index });
+			} else if (token_stream[0].type == IfcParse::Token_OPERATOR && token_stream[0].value_char == '(') {
+				paren_stack_depth++;
+			} else if (token_stream[0].type == IfcParse::Token_OPERATOR && token_stream[0].value_char == ')') {
+				paren_stack_depth--;
+				if (paren_stack_depth == 0) {
+					attribute_index = -1;
+				}
+			} else if (paren_stack_depth == 1 && token_stream[0].type == IfcParse::Token_OPERATOR && token_stream[0].value_char == ',') {
+				attribute_index++;
+				is_guid_pending = false;
+			} else if (is_guid_pending && paren_stack_depth == 1 && attribute_index == 0 && token_stream[0].type == IfcParse::Token_STRING) {
+				chunk.guids.push_back(std::make_pair(TokenFunc::asString(token_stream[0]), instance));
+				is_guid_pending = false;
+			}
+
+			Token next_token;
+			try {
+				next_token = lexer.Next();
+			} catch (const IfcException& e) {
+				chunk.errors.push_back(std::string(e.what()) + ". Parsing terminated");
+				break;
+			}
+
+			if (next_token.type == Token_NONE || next_token.startPos >= end) break;
+
+			token_stream.push_back(next_token);
+		}
+	}
+}
+
+void IfcFile::parse_parallel_(unsigned threads) {
+	const char* buffer = stream->data();
+	const unsigned length = stream->length();
+	const unsigned start = stream->Tell();
+
+	// Chunks end at semicolons outside of strings and comments, so each holds whole instances
+	std::vector<unsigned> bounds(1, start);
+	const unsigned chunk_size = (length - start) / threads + 1;
+	bool is_in_string = false;
+	bool is_in_comment = false;
+	for (unsigned i = start; i < length && bounds.size() < threads; ++i) {
+		const char c = buffer[i];
+		if (is_in_comment) {
+			if (c == '*' && i + 1 < length && buffer[i + 1] == '/') {
+				is_in_comment = false;
+				++i;
+			}
+		} else if (c == '\'') {
+			is_in_string = !is_in_string;
+		} else if (is_in_string) {
+			continue;
+		} else if (c == '/' && i + 1 < length && buffer[i + 1] == '*') {
+			is_in_comment = true;
+			++i;
+		} else if (c == ';' && i + 1 - bounds.back() >= chunk_size) {
+			bounds.push_back(i + 1);
+		}
+	}
+	bounds.push_back(length);
+
+	std::vector<parsed_chunk> chunks(bounds.size() - 1);
+	std::vector<std::thread> workers;
+	for (size_t i = 0; i < chunks.size(); ++i) {
+		if (bounds[i] >= bounds[i + 1]) {
+			continue;
+		}
+		workers.emplace_back([this, buffer, length, &bounds, &chunks, i]() {
+			try {
+				scan_chunk(this, ifcroot_type_, buffer, length, bounds[i], bounds[i + 1], chunks[i]);
+			} catch (const std::exception& e) {
+				chunks[i].errors.push_back(std::string(e.what()) + ". Parsing terminated");
+			}
+		});
+	}
+	for (auto& worker : workers) {
+		worker.join();
+	}
+
+	// Merged in file order, so the indices are identical to a serial parse
+	for (auto& chunk : chunks) {
+		for (auto& error : chunk.errors) {
+			Logger::Message(Logger::LOG_ERROR, error);
+		}
+		for (auto& pair : chunk.instances) {
+			index_instance_(pair.first, pair.second);
+		}
+		for (auto& pair : chunk.guids) {
+			index_guid_(pair.first, pair.second);
+		}
+		for (auto& ref : chunk.references) {
+			register_inverse(ref.id_from, ref.entity, ref.id_to, ref.attribute_index);
+		}
+		chunk = parsed_chunk();
+	}
+
+	Logger::Status("\rDone scanning file   ");
+
+	parsing_complete_ = true;
+
+	if (!lazy_load_) {
+		for (auto& pair : byid) {
+			pair.second->data().load();
+		}
+	}
+}
+
 void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
 	// Initialize a "C" locale for locale-independent
 	// number parsing. See comment above on line 41.
@@ -1495,6 +1709,11 @@ void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
 
 	ifcroot_type_ = schema_->declaration_by_name("IfcRoot");
 
+	if (parse_threads_ > 1) {
+		parse_parallel_(parse_threads_);
+		return;
+	}
+
 	boost::circular_buffer<Token> token_stream(3, Token());
 
 	IfcEntityInstanceData* data;
@@ -1540,13 +1759,7 @@ void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
 
 			if (instance->declaration().is(*ifcroot_type_)) {
 				try {
-					const std::string guid = *instance->data().getArgument(0);
-					if ( byguid.find(guid) != byguid.end() ) {
-						std::stringstream ss;
-						ss << "Instance encountered with non-unique GlobalId " << guid;
-						Logger::Message(Logger::LOG_WARNING,ss.str());
-					}
-					byguid[guid] = instance;
+					index_guid_(*instance->data().getArgument(0), instance);
 				} catch (const IfcException& ex) {
 					Logger::Message(Logger::LOG_ERROR,ex.what());
 				}
@@ -1555,40 +1768,7 @@ void IfcFile::initialize_(IfcParse::IfcSpfStream* s) {
 				attribute_index = -1;
 			}
 
-			const IfcParse::declaration* ty = &instance->declaration();
-
-			{
-				aggregate_of_instance::ptr insts = instances_by_type_excl_subtypes(ty);
-				if (!insts) {
-					insts = aggregate_of_instance::ptr(new aggregate_of_instance());
-					bytype_excl[ty] = insts;
-				}
-				insts->push(instance);
-			}
-
-			for (;;) {
-				aggregate_of_instance::ptr insts = instances_by_type(ty);
-				if (!insts) {
-					insts = aggregate_of_instance::ptr(new aggregate_of_instance());
-					bytype[ty] = insts;
-				}
-				insts->push(instance);
-				const IfcParse::declaration* pt = ty->as_entity()->supertype();
-				if (pt) {
-					ty = pt;
-				} else {
-					break;
-				}
-			}
-
-			if (byid.find(current_id) != byid.end()) {
-				std::stringstream ss;
-				ss << "Overwriting instance with name #" << current_id;
-				Logger::Message(Logger::LOG_WARNING,ss.str());
-			}
-			byid[current_id] = instance;
-			
-			MaxId = (std::max)(MaxId, current_id);
+			index_instance_(current_id, instance);
 		} else if (token_stream[0].type == IfcParse::Token_IDENTIFIER && instance) {
 			register_inverse(current_id, instance->declaration().as_entity(), token_stream[0], attribute_index);
 		} else if (token_stream[0].type == IfcParse::Token_OPERATOR && token_stream[0].value_char == '(') {
@@ -2095,15 +2275,8 @@ void IfcFile::process_deletion_() {
 		}
 
 		if (!batch_mode_) {
-			byref.erase(
-				byref.lower_bound({ id,-1,-1 }), 
-				byref.upper_bound({ id, std::numeric_limits<int>::max(), std::numeric_limits<int>::max() })
-			);
-
-			byref_excl.erase(
-				byref_excl.lower_bound({ id,-1,-1 }),
-				byref_excl.upper_bound({ id, std::numeric_limits<int>::max(), std::numeric_limits<int>::max() })
-			);
+			byref.erase(id);
+			byref_excl.erase(id);
 			
 			// This is based on traversal which needs instances to still be contained in the map.
 			// another option would be to keep byid intact for the remainder of this loop
@@ -2114,22 +2287,13 @@ void IfcFile::process_deletion_() {
 				const unsigned int name = entity_attribute->data().id();
 				// Do not update inverses for simple types (which have id()==0 in IfcOpenShell).
 				if (name != 0) {
-					{
-						auto lower = byref.lower_bound({ name,-1,-1 });
-						auto upper = byref.upper_bound({ name, std::numeric_limits<int>::max(), std::numeric_limits<int>::max() });
-
-						for (auto byref_it = lower; byref_it != upper; ++byref_it) {
-							auto& ids = byref_it->second;
-							ids.erase(std::remove(ids.begin(), ids.end(), id), ids.end());
-						}
-					}
-					{
-						auto lower = byref_excl.lower_bound({ name,-1,-1 });
-						auto upper = byref_excl.upper_bound({ name, std::numeric_limits<int>::max(), std::numeric_limits<int>::max() });
-
-						for (auto byref_it = lower; byref_it != upper; ++byref_it) {
-							auto& ids = byref_it->second;
-							ids.erase(std::remove(ids.begin(), ids.end(), id), ids.end());
+					for (auto refs : { &byref, &byref_excl }) {
+						auto byref_it = refs->find(name);
+						if (byref_it != refs->end()) {
+							for (auto& pair : byref_it->second) {
+								auto& ids = pair.second;
+								ids.erase(std::remove(ids.begin(), ids.end(), id), ids.end());
+							}
 						}
 					}
 					by_ref_cached_.erase(name);
@@ -2193,34 +2357,28 @@ void IfcFile::process_deletion_() {
 	}
 	
 	if (batch_mode_) {
-		for (auto it = byref.begin(); it != byref.end();) {
-			bool do_delete = batch_deletion_ids_.get<1>().find(std::get<INSTANCE_ID>(it->first)) != batch_deletion_ids_.get<1>().end();
-			if (!do_delete) {
-				it->second.erase(std::remove_if(it->second.begin(), it->second.end(), [this](int x) {
-					return batch_deletion_ids_.get<1>().find(x) != batch_deletion_ids_.get<1>().end();
-				}), it->second.end());
-				do_delete = it->second.empty();
-			}
-			if (do_delete) {
-				it = byref.erase(it);
-			}
-			else {
-				++it;
-			}
-		}
-
-		for (auto it = byref_excl.begin(); it != byref_excl.end();) {
-			bool do_delete = batch_deletion_ids_.get<1>().find(std::get<INSTANCE_ID>(it->first)) != batch_deletion_ids_.get<1>().end();
-			if (!do_delete) {
-				it->second.erase(std::remove_if(it->second.begin(), it->second.end(), [this](int x) {
-					return batch_deletion_ids_.get<1>().find(x) != batch_deletion_ids_.get<1>().end();
-				}), it->second.end());
-				do_delete = it->second.empty();
-			}
-			if (do_delete) {
-				it = byref_excl.erase(it);
-			} else {
-				++it;
+		auto is_deleted = [this](int x) {
+			return batch_deletion_ids_.get<1>().find(x) != batch_deletion_ids_.get<1>().end();
+		};
+		for (auto refs : { &byref, &byref_excl }) {
+			for (auto it = refs->begin(); it != refs->end();) {
+				bool do_delete = is_deleted(it->first);
+				if (!do_delete) {
+					for (auto jt = it->second.begin(); jt != it->second.end();) {
+						jt->second.erase(std::remove_if(jt->second.begin(), jt->second.end(), is_deleted), jt->second.end());
+						if (jt->second.empty()) {
+							jt = it->second.erase(jt);
+						} else {
+							++jt;
+						}
+					}
+					do_delete = it->second.empty();
+				}
+				if (do_delete) {
+					it = refs->erase(it);
+				} else {
+					++it;
+				}
 			}
 		}
 	}
@@ -2249,13 +2407,13 @@ aggregate_of_instance::ptr IfcFile::instances_by_type_excl_subtypes(const std::s
 }
 
 aggregate_of_instance::ptr IfcFile::instances_by_reference(int t) {
-	auto lower = byref_excl.lower_bound({ t,-1,-1 });
-	auto upper = byref_excl.upper_bound({ t, std::numeric_limits<int>::max(), std::numeric_limits<int>::max() });
-
 	aggregate_of_instance::ptr ret(new aggregate_of_instance);
-	for (auto it = lower; it != upper; it++) {
-		for (auto& i : it->second) {
-			ret->push(instance_by_id(i));
+	auto refs = byref_excl.find(t);
+	if (refs != byref_excl.end()) {
+		for (auto& pair : refs->second) {
+			for (auto& i : pair.second) {
+				ret->push(instance_by_id(i));
+			}
 		}
 	}
 
@@ -2364,10 +2522,15 @@ aggregate_of_instance::ptr IfcFile::getInverse(int instance_id, const IfcParse::
 	}
 	
 	aggregate_of_instance::ptr return_value(new aggregate_of_instance);
+
+	auto refs = byref.find(instance_id);
+	if (refs == byref.end()) {
+		return return_value;
+	}
 	
 	if (attribute_index == -1) {
-		auto lower = byref.lower_bound({ instance_id, type->index_in_schema(), -1 });
-		auto upper = byref.upper_bound({ instance_id, type->index_in_schema(), std::numeric_limits<int>::max() });
+		auto lower = refs->second.lower_bound({ type->index_in_schema(), -1 });
+		auto upper = refs->second.upper_bound({ type->index_in_schema(), std::numeric_limits<int>::max() });
 
 		for (auto it = lower; it != upper; ++it) {
 			for (auto& i : it->second) {
@@ -2375,8 +2538,8 @@ aggregate_of_instance::ptr IfcFile::getInverse(int instance_id, const IfcParse::
 			}
 		}
 	} else {
-		auto it = byref.find({ instance_id, type->index_in_schema(), attribute_index });
-		if (it != byref.end()) {
+		auto it = refs->second.find({ type->index_in_schema(), attribute_index });
+		if (it != refs->second.end()) {
 			for (auto& i : it->second) {
 				return_value->push(instance_by_id(i));
 			}
@@ -2486,13 +2649,7 @@ std::pair<IfcUtil::IfcBaseClass*, double> IfcFile::getUnit(const std::string& un
 void IfcParse::IfcFile::build_inverses_(IfcUtil::IfcBaseClass* inst) {
 	std::function<void(IfcUtil::IfcBaseClass*,int)> fn = [this, inst](IfcUtil::IfcBaseClass* attr, int idx) {
 		if (attr->declaration().as_entity()) {
-			unsigned entity_attribute_id = attr->data().id();
-			auto decl = inst->declaration().as_entity();
-			byref_excl[{entity_attribute_id, decl->index_in_schema(), idx}].push_back(inst->data().id());
-			while (decl) {
-				byref[{entity_attribute_id, decl->index_in_schema(), idx}].push_back(inst->data().id());
-				decl = decl->supertype();
-			}
+			register_inverse(inst->data().id(), inst->declaration().as_entity(), (int) attr->data().id(), idx);
 		}
 	};
 	
@@ -2509,3 +2666,4 @@ std::atomic_uint32_t IfcUtil::IfcBaseClass::counter_(0);
 
 bool IfcParse::IfcFile::lazy_load_ = true;
 bool IfcParse::IfcFile::guid_map_ = true;
+unsigned IfcParse::IfcFile::parse_threads_ = 1;
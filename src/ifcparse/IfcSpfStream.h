@@ -28,6 +28,7 @@
 #define IFCSPFSTREAM_H
 
 #include <fstream>
+#include <limits>
 #include <string>
 
 #ifdef USE_MMAP
@@ -49,6 +50,7 @@ namespace IfcParse {
 		const char* buffer;
 		unsigned int ptr;
 		unsigned int len;
+		bool owned;
 	public:
 		bool valid;
 		bool eof;
@@ -59,8 +61,12 @@ namespace IfcParse {
 		IfcSpfStream(const std::string& fn);
 #endif
 		IfcSpfStream(std::istream& f, int len);
-		IfcSpfStream(void* data, int len);
-		~IfcSpfStream();
+		/// Parses data in memory, which is freed by the stream if owned.
+		/// Otherwise, the caller must keep the data alive for as long as
+		/// the stream, and the file using it, exists. Offsets in the stream
+		/// are 32-bit, so data longer than max_length() is not valid.
+		IfcSpfStream(void* data, size_t len, bool owned = true);
+		virtual ~IfcSpfStream();
 		/// Returns the character at the cursor 
 		char Peek();
 		/// Returns the character at specified offset
@@ -72,6 +78,12 @@ namespace IfcParse {
 		void Seek(unsigned int offset);
 		/// Returns the cursor position
 		unsigned int Tell();
+		/// Returns the buffer holding the file
+		const char* data() const { return buffer; }
+		/// Returns the length of the buffer
+		unsigned int length() const { return len; }
+		/// Returns the maximum length of a file that can be parsed
+		static size_t max_length() { return std::numeric_limits<unsigned int>::max(); }
 
 		bool is_eof_at(unsigned int);
 		void increment_at(unsigned int&);
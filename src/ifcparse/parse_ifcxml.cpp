@@ -640,34 +640,49 @@ end:
 }
 
 #ifdef WITH_IFCXML
-IFC_PARSE_API IfcParse::IfcFile* IfcParse::parse_ifcxml(const std::string& filename) {
-	ifcxml_parse_state state;
-	state.file = nullptr;
-	state.dialect = ifcxml_dialect_unknown;
-	
-	xmlSAXHandler handler;
-	memset(&handler, 0, sizeof(xmlSAXHandler));
-	handler.startElement = start_element;
-	handler.endElement = end_element;
-	handler.characters = process_characters;
-
-	xmlSAXUserParseFile(&handler, &state, filename.c_str());
-
-	for (const auto& pair : state.forward_references) {
-		auto it = state.idmap.find(pair.second);
-		if (it == state.idmap.end()) {
-			Logger::Error("Instance with id '" + pair.second + "' not encountered");
-		} else {
-			pair.first->set(state.file->instance_by_id(it->second));
+namespace {
+	template <typename Fn>
+	IfcParse::IfcFile* parse_ifcxml_with(Fn parse) {
+		ifcxml_parse_state state;
+		state.file = nullptr;
+		state.dialect = ifcxml_dialect_unknown;
+		
+		xmlSAXHandler handler;
+		memset(&handler, 0, sizeof(xmlSAXHandler));
+		handler.startElement = start_element;
+		handler.endElement = end_element;
+		handler.characters = process_characters;
+
+		parse(&handler, &state);
+
+		for (const auto& pair : state.forward_references) {
+			auto it = state.idmap.find(pair.second);
+			if (it == state.idmap.end()) {
+				Logger::Error("Instance with id '" + pair.second + "' not encountered");
+			} else {
+				pair.first->set(state.file->instance_by_id(it->second));
+			}
 		}
-	}
 
-	if (state.file) {
-		state.file->parsing_complete() = true;
-		state.file->build_inverses();
+		if (state.file) {
+			state.file->parsing_complete() = true;
+			state.file->build_inverses();
+		}
+
+		return state.file;
 	}
+}
+
+IFC_PARSE_API IfcParse::IfcFile* IfcParse::parse_ifcxml(const std::string& filename) {
+	return parse_ifcxml_with([&filename](xmlSAXHandler* handler, ifcxml_parse_state* state) {
+		xmlSAXUserParseFile(handler, state, filename.c_str());
+	});
+}
 
-	return state.file;
+IFC_PARSE_API IfcParse::IfcFile* IfcParse::parse_ifcxml_buffer(const char* data, int len) {
+	return parse_ifcxml_with([data, len](xmlSAXHandler* handler, ifcxml_parse_state* state) {
+		xmlSAXUserParseMemory(handler, state, data, len);
+	});
 }
 #endif
 
@@ -17,7 +17,6 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
 
-import toposort
 import ifcpatch
 import ifcpatch.recipes
 import ifcopenshell.util.selector
@@ -52,6 +52,13 @@ def execute(args, is_library=None):
     if isinstance(ifc_file, str):
         with open(args["output"], "w") as text_file:
             text_file.write(ifc_file)
+    elif inspect.isgenerator(ifc_file):
+        # Chunks may be read from the input, so the output only replaces it once complete
+        partial_output = args["output"] + ".part"
+        with open(partial_output, "wb") as binary_file:
+            for chunk in ifc_file:
+                binary_file.write(chunk)
+        os.replace(partial_output, args["output"])
     else:
         ifc_file.write(args["output"])
     print("# All tasks are complete :-)")
@@ -0,0 +1,349 @@
+# IfcPatch - IFC patching utiliy
+# Copyright (C) 2020, 2021 Dion Moult <dion@thinkmoult.com>
+#
+# This file is part of IfcPatch.
+#
+# IfcPatch is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# IfcPatch is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import re
+import mmap
+import array
+import bisect
+import tempfile
+import ifcopenshell
+
+instance_pattern = re.compile(rb"#(\d+)\s*=[^;']*(?:'[^']*'[^;']*)*;")
+schema_pattern = re.compile(rb"FILE_SCHEMA\s*\(\s*\(\s*'([^']*)'")
+token_pattern = re.compile(rb"'[^']*'(?:'[^']*')*|[(),]|[^'(),]+")
+
+
+class Subset:
+    """The instances to extract into a single output
+
+    :ivar objects: Object definitions to extract, by id
+    :ivar instances: Ids of the objects and of all instances they reference
+    :ivar ids: Ids of all instances to write, including relationships and styles
+    :ivar rewritten: Ids of relationships which also relate objects outside
+        of the subset, mapped to the ids of the objects to omit from them
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.instances = set()
+        self.ids = set()
+        self.rewritten = {}
+
+
+class Extractor:
+    """Extracts subsets of elements from a model into new files
+
+    A subset includes the chosen elements and their parts, openings and
+    ports, their spatial containers and decomposition parents up to the
+    project, their types, every relationship solely between extracted
+    objects, and all instances these reference, including styles. A
+    relationship which also relates objects outside of the subset is
+    written without them.
+
+    The model is only parsed once. Each output is written by copying the
+    lines of its instances straight from the source SPF file, which is
+    memory mapped until the extractor is closed. If the source is not an SPF
+    file, or its schema or instance ids no longer match the model, instances
+    are serialised from the model instead.
+
+    Example::
+
+        with Extractor(ifc_file, "model.ifc") as extractor:
+            shared = extractor.get_subset(ifc_file.by_type("IfcSpatialElement"))
+            for storey in ifc_file.by_type("IfcBuildingStorey"):
+                elements = [e for r in storey.ContainsElements for e in r.RelatedElements]
+                extractor.write(extractor.get_subset(elements, shared=shared), f"{storey.Name}.ifc")
+    """
+
+    def __init__(self, ifc_file, src=None):
+        self.file = ifc_file
+        self.source = None
+        self.header = None
+        self.relationship_ids = {}
+        self.relationships = {}
+        self.styled_items = None
+        self.material_representations = None
+        if src and os.path.isfile(src):
+            self.load_source(src)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes the source file, after which instances are serialised from the model"""
+        if self.source:
+            self.source.close()
+            self.source = None
+
+    def load_source(self, src):
+        with open(src, "rb") as f:
+            if not f.read(64).lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"ISO-10303-21"):
+                return
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if not self.index_source(source):
+            source.close()
+
+    def index_source(self, source):
+        data = re.search(rb"\nDATA\s*;", source)
+        if not data:
+            return False
+        schema = schema_pattern.search(source, 0, data.start())
+        if not schema or schema.group(1).decode("ascii", "replace").upper() != self.file.schema.upper():
+            return False
+        ids = array.array("q")
+        starts = array.array("q")
+        ends = array.array("q")
+        for match in instance_pattern.finditer(source, data.end()):
+            ids.append(int(match.group(1)))
+            starts.append(match.start())
+            ends.append(match.end())
+        if any(ids[i] >= ids[i + 1] for i in range(len(ids) - 1)):
+            order = sorted(range(len(ids)), key=ids.__getitem__)
+            ids, starts, ends = (array.array("q", (a[i] for i in order)) for a in (ids, starts, ends))
+        # The model may have been edited since it was loaded from the source
+        if not ids or ids != array.array("q", sorted(self.file.wrapped_data.entity_names())):
+            return False
+        self.source = source
+        self.header = source[: data.end()] + b"\n"
+        self.ids, self.starts, self.ends = ids, starts, ends
+        return True
+
+    def get_subset(self, elements, shared=None):
+        """Returns the subset of instances needed to extract elements
+
+        :param elements: The elements to extract
+        :type elements: list[ifcopenshell.entity_instance.entity_instance]
+        :param shared: A subset whose objects are part of every output, such
+            as the spatial structure. Its closure is only computed once.
+        :type shared: Subset
+        :rtype: Subset
+        """
+        subset = Subset()
+        if shared:
+            subset.objects.update(shared.objects)
+            subset.instances.update(shared.instances)
+        for context in self.file.by_type("IfcProject" if self.file.schema == "IFC2X3" else "IfcContext"):
+            self.add_parent(subset, context)
+
+        seeds = set()
+        queue = list(elements)
+        while queue:
+            element = queue.pop()
+            if element.id() in seeds:
+                continue
+            seeds.add(element.id())
+            if element.id() not in subset.objects:
+                self.add_object(subset, element)
+            queue.extend(self.get_children(element))
+            for parent in self.get_parents(element):
+                self.add_parent(subset, parent)
+
+        subset.ids = set(subset.instances)
+        self.add_relationships(subset)
+        self.add_styles(subset)
+        return subset
+
+    def add_object(self, subset, element):
+        subset.objects[element.id()] = element
+        subset.instances.update(e.id() for e in self.file.traverse(element))
+
+    def add_parent(self, subset, element):
+        if element.id() in subset.objects:
+            return
+        self.add_object(subset, element)
+        for parent in self.get_parents(element):
+            self.add_parent(subset, parent)
+
+    def get_children(self, element):
+        if not element.is_a("IfcElement"):
+            return []
+        children = [o for r in getattr(element, "IsDecomposedBy", None) or [] for o in r.RelatedObjects]
+        children.extend(o for r in getattr(element, "IsNestedBy", None) or [] for o in r.RelatedObjects)
+        children.extend(r.RelatedOpeningElement for r in getattr(element, "HasOpenings", None) or [])
+        return children
+
+    def get_parents(self, element):
+        parents = [r.RelatingStructure for r in getattr(element, "ContainedInStructure", None) or []]
+        parents.extend(r.RelatingObject for r in getattr(element, "Decomposes", None) or [])
+        parents.extend(r.RelatingObject for r in getattr(element, "Nests", None) or [])
+        parents.extend(r.RelatingType for r in getattr(element, "IsTypedBy", None) or [])
+        parents.extend(
+            r.RelatingType for r in getattr(element, "IsDefinedBy", None) or [] if r.is_a("IfcRelDefinesByType")
+        )
+        return parents
+
+    def add_relationships(self, subset):
+        rejected = set()
+        for element in subset.objects.values():
+            for rel_id in self.get_relationship_ids(element):
+                if rel_id in subset.ids or rel_id in rejected:
+                    continue
+                required, lists, dependencies = self.get_relationship(rel_id)
+                omitted = set()
+                is_rejected = any(i not in subset.objects for i in required)
+                for related_ids in lists:
+                    if is_rejected:
+                        break
+                    omitted.update(i for i in related_ids if i not in subset.objects)
+                    is_rejected = all(i not in subset.objects for i in related_ids)
+                if is_rejected:
+                    rejected.add(rel_id)
+                    continue
+                subset.ids.add(rel_id)
+                subset.ids.update(dependencies)
+                if omitted:
+                    subset.rewritten[rel_id] = omitted
+
+    def get_relationship_ids(self, element):
+        rel_ids = self.relationship_ids.get(element.id())
+        if rel_ids is None:
+            rel_ids = [r.id() for r in self.file.get_inverse(element) if r.is_a("IfcRelationship")]
+            self.relationship_ids[element.id()] = rel_ids
+        return rel_ids
+
+    def get_relationship(self, rel_id):
+        """Returns the objects a relationship requires, lists of objects it
+        relates, and ids of other instances it references"""
+        result = self.relationships.get(rel_id)
+        if result is not None:
+            return result
+        required = []
+        lists = []
+        dependencies = set()
+        for value in self.file.by_id(rel_id):
+            if isinstance(value, ifcopenshell.entity_instance):
+                if value.is_a("IfcObjectDefinition"):
+                    required.append(value.id())
+                else:
+                    dependencies.update(e.id() for e in self.file.traverse(value))
+            elif isinstance(value, tuple):
+                related_ids = []
+                for item in value:
+                    if not isinstance(item, ifcopenshell.entity_instance):
+                        continue
+                    if item.is_a("IfcObjectDefinition"):
+                        related_ids.append(item.id())
+                    else:
+                        dependencies.update(e.id() for e in self.file.traverse(item))
+                if related_ids:
+                    lists.append(related_ids)
+        result = self.relationships[rel_id] = (required, lists, dependencies)
+        return result
+
+    def add_styles(self, subset):
+        if self.styled_items is None:
+            self.styled_items = {}
+            for styled_item in self.file.by_type("IfcStyledItem"):
+                if styled_item.Item:
+                    self.styled_items.setdefault(styled_item.Item.id(), []).append(styled_item)
+            self.material_representations = {}
+            for representation in self.file.by_type("IfcMaterialDefinitionRepresentation"):
+                self.material_representations.setdefault(representation.RepresentedMaterial.id(), []).append(
+                    representation
+                )
+        for styled_ids in (self.styled_items, self.material_representations):
+            for item_id, styled_items in styled_ids.items():
+                if item_id in subset.ids:
+                    for styled_item in styled_items:
+                        subset.ids.update(e.id() for e in self.file.traverse(styled_item))
+
+    def write(self, subset, path):
+        """Writes a subset as an SPF file
+
+        :param subset: The subset to write
+        :type subset: Subset
+        :param path: The output filepath
+        :type path: string
+        """
+        with open(path, "wb") as f:
+            f.write(self.header or self.get_default_header())
+            for instance_id in sorted(subset.ids):
+                line = self.get_line(instance_id)
+                if instance_id in subset.rewritten:
+                    line = omit_references(line, subset.rewritten[instance_id])
+                f.write(line)
+                f.write(b"\n")
+            f.write(b"ENDSEC;\nEND-ISO-10303-21;\n")
+
+    def open(self, subset):
+        """Returns a subset as a new IFC file
+
+        :param subset: The subset to open
+        :type subset: Subset
+        :rtype: ifcopenshell.file.file
+        """
+        fd, path = tempfile.mkstemp(suffix=".ifc")
+        os.close(fd)
+        try:
+            self.write(subset, path)
+            return ifcopenshell.open(path)
+        finally:
+            os.remove(path)
+
+    def get_line(self, instance_id):
+        if self.source:
+            i = bisect.bisect_left(self.ids, instance_id)
+            if i < len(self.ids) and self.ids[i] == instance_id:
+                return self.source[self.starts[i] : self.ends[i]]
+        # Keywords are serialised in mixed case, whereas SPF expects upper case
+        line = str(self.file.by_id(instance_id)).encode("utf-8")
+        keyword_start = line.index(b"=") + 1
+        keyword_end = line.index(b"(", keyword_start)
+        return line[:keyword_start] + line[keyword_start:keyword_end].upper() + line[keyword_end:] + b";"
+
+    def get_default_header(self):
+        return (
+            "ISO-10303-21;\nHEADER;\n"
+            "FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');\n"
+            "FILE_NAME('','',(''),(''),'IfcOpenShell','IfcOpenShell','');\n"
+            f"FILE_SCHEMA(('{self.file.schema}'));\nENDSEC;\nDATA;\n"
+        ).encode("utf-8")
+
+
+def omit_references(line, ids):
+    """Removes references to instances from the aggregates of an SPF instance
+
+    :param line: An SPF instance, such as #1=IFCRELAGGREGATES(...,(#2,#3));
+    :type line: bytes
+    :param ids: The ids of the instances to remove
+    :type ids: set[int]
+    :rtype: bytes
+    """
+    references = {b"#%d" % i for i in ids}
+    keyword_end = line.index(b"(")
+    # Each aggregate is a list of items, each of which is a list of tokens
+    stack = [[[]]]
+    for token in token_pattern.findall(line[keyword_end : line.rindex(b")") + 1]):
+        if token == b"(":
+            stack.append([[]])
+        elif token == b")":
+            items = stack.pop()
+            if len(stack) > 1:
+                items = [i for i in items if not (len(i) == 1 and i[0] in references)]
+            stack[-1][-1].append(b"(" + b",".join(b"".join(i) for i in items) + b")")
+        elif token == b",":
+            stack[-1].append([])
+        elif token.startswith(b"'"):
+            stack[-1][-1].append(token)
+        elif token.strip():
+            stack[-1][-1].append(token.strip())
+    return line[:keyword_end] + b"".join(stack[0][0]) + b";"
@@ -17,69 +17,121 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
 
+import re
+import array
+import bisect
+import hashlib
 import ifcopenshell
-import ifcopenshell.util.element
-from toposort import toposort_flatten as toposort
+from ifcpatch.extract import Extractor
 
 
+token_pattern = re.compile(rb"('[^']*')|#(\d+)|(?<![\w.])([-+]?\d+(?:\.\d*(?:[Ee][-+]?\d+)?|[Ee][-+]?\d+))")
+reference_pattern = re.compile(rb"'[^']*'|#(\d+)")
+
 
 class Patcher:
-    def __init__(self, src, file, logger, args=None):
+    def __init__(self, src, file, logger, tolerance: float = 0.0):
+        """Optimise
+
+        Merge duplicate instances, such as identical points, directions, and
+        styles, and remove the duplicates.
+
+        Each instance is hashed once, after the instances it references, so
+        instances are duplicates if they have the same class and attributes,
+        after references are replaced by those of the instances they were
+        merged with. The result is written by copying lines from the source
+        file, so it is never reloaded as a new model. After patching, file
+        is therefore not an ifcopenshell.file, but an iterator over the bytes
+        of the optimised SPF file, which is streamed to the output.
+
+        :param tolerance: Reals which round to the same multiple of this are
+            treated as equal. Zero means reals must be exactly equal.
+        """
         self.src = src
         self.file = file
         self.logger = logger
-        self.args = args
-        self.optimized_file = ifcopenshell.file(schema=self.file.schema)
-
+        self.tolerance = float(tolerance)
 
     def patch(self):
-        def generate_instances_and_references():
-            """
-            Generator which yields an entity id and 
-            the set of all of its references contained in its attributes. 
-            """
-            for inst in self.file:
-                yield inst.id(), set(i.id() for i in self.file.traverse(inst)[1:] if i.id())
-
-        instance_mapping = {}
-
-
-        def map_value(v):
-            """
-            Recursive function which replicates an entity instance, with 
-            its attributes, mapping references to already registered
-            instances. Indeed, because of the toposort we know that 
-            forward attribute value instances are mapped before the instances
-            that reference them.
-            """
-            if isinstance(v, (list, tuple)):
-                # lists are recursively traversed
-                return type(v)(map(map_value, v))
-            elif isinstance(v, ifcopenshell.entity_instance):
-                if v.id() == 0:
-                    # express simple types are not part of the toposort and just copied
-                    return self.optimized_file.create_entity(v.is_a(), v[0])
-          
-                
-                return instance_mapping[v]
-            else:
-                # a plain python value can just be returned
-                return v
-
-        info_to_id = {}
-            
-        for id in toposort(dict(generate_instances_and_references())):
-            inst = self.file[id]
-            info = inst.get_info(include_identifier=False, recursive=True, return_type=frozenset)
-            if info in info_to_id:
-                mapped = instance_mapping[inst] = instance_mapping[self.file[info_to_id[info]]]
-
-            else:
-                info_to_id[info] = id
-                instance_mapping[inst] = self.optimized_file.create_entity(
-                    inst.is_a(),
-                    *map(map_value, inst)
-                )
-
-        self.file = self.optimized_file
-        
\ No newline at end of file
+        self.extractor = Extractor(self.file, self.src)
+        if self.extractor.source:
+            self.ids = self.extractor.ids
+        else:
+            self.ids = array.array("q", sorted(e.id() for e in self.file))
+        # The canonical id of each instance, 0 if not yet hashed, or -1 while its references are hashed
+        self.canonical = array.array("q", bytes(8 * len(self.ids)))
+        self.digests = {}
+        for position in range(len(self.ids)):
+            if not self.canonical[position]:
+                self.merge(position)
+
+        total = len(self.ids)
+        merged = sum(1 for i, c in zip(self.ids, self.canonical) if i != c)
+        self.logger.info("Merged %s duplicate instances out of %s", merged, total)
+
+        self.file = self.get_chunks()
+
+    def get_chunks(self):
+        def remap(match):
+            if match.group(1) is None:
+                return match.group(0)
+            position = self.get_position(int(match.group(1)))
+            return match.group(0) if position is None else b"#%d" % self.canonical[position]
+
+        with self.extractor:
+            yield self.extractor.header or self.extractor.get_default_header()
+            for instance_id, canonical_id in zip(self.ids, self.canonical):
+                if instance_id == canonical_id:
+                    yield reference_pattern.sub(remap, self.extractor.get_line(instance_id)) + b"\n"
+            yield b"ENDSEC;\nEND-ISO-10303-21;\n"
+
+    def merge(self, position):
+        stack = [position]
+        while stack:
+            position = stack[-1]
+            if self.canonical[position] > 0:
+                stack.pop()
+                continue
+            line = self.extractor.get_line(self.ids[position])
+            is_in_cycle = False
+            unhashed = []
+            for match in reference_pattern.finditer(line, line.index(b"=")):
+                if match.group(1) is None:
+                    continue
+                reference = self.get_position(int(match.group(1)))
+                if reference is None:
+                    continue
+                elif self.canonical[reference] == 0:
+                    unhashed.append(reference)
+                elif self.canonical[reference] == -1:
+                    is_in_cycle = True
+            if unhashed and self.canonical[position] == 0:
+                self.canonical[position] = -1
+                stack.extend(unhashed)
+                continue
+            stack.pop()
+            if is_in_cycle or unhashed:
+                # References in a cycle cannot be hashed first, so the instance is kept as is
+                self.canonical[position] = self.ids[position]
+                continue
+            digest = hashlib.blake2b(self.get_key(line), digest_size=16).digest()
+            self.canonical[position] = self.digests.setdefault(digest, self.ids[position])
+
+    def get_key(self, line):
+        def canonicalise(match):
+            string, reference, real = match.groups()
+            if string is not None:
+                return string
+            elif reference is not None:
+                position = self.get_position(int(reference))
+                return match.group(0) if position is None else b"#%d" % self.canonical[position]
+            elif self.tolerance:
+                return b"%d" % round(float(real) / self.tolerance)
+            return repr(float(real)).encode()
+
+        return token_pattern.sub(canonicalise, line[line.index(b"=") :])
+
+    def get_position(self, instance_id):
+        position = bisect.bisect_left(self.ids, instance_id)
+        if position < len(self.ids) and self.ids[position] == instance_id:
+            return position
@@ -17,7 +17,6 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with IfcPatch.  If not, see <http://www.gnu.org/licenses/>.
 
-from collections import deque
 import ifcopenshell.util.element
 
 class Patcher:
@@ -40,15 +39,14 @@ class Patcher:
                 deleted.append(element.id())
             else:
                 hashes[h] = element
-        deleted.sort()
-        deleted_q = deque(deleted)
-        new = ''
-        for line in self.file.wrapped_data.to_string().split('\n'):
-            try:
-                if int(line.split('=')[0][1:]) != deleted_q[0]:
-                    new += (line + '\n')
-                else:
-                    deleted_q.popleft()
-            except:
-                new += (line + '\n')
-        self.file = new
+        # The patched file is streamed to the output, so its text is never held in memory at once
+        self.file = self.get_chunks(self.file, set(deleted))
+
+    def get_chunks(self, ifc_file, deleted):
+        for chunk in ifc_file.iter_chunks():
+            new = []
+            for line in chunk.splitlines():
+                if line.startswith('#') and int(line.split('=')[0][1:]) in deleted:
+                    continue
+                new.append(line + '\n')
+            yield ''.join(new).encode('utf-8')
@@ -0,0 +1,196 @@
+import pytest
+import ifcpatch
+import ifcopenshell
+import ifcopenshell.api
+import ifcopenshell.guid
+from ifcpatch.extract import Extractor, omit_references
+
+
+def run(usecase, ifc_file, **settings):
+    return ifcopenshell.api.run(usecase, ifc_file, **settings)
+
+
+@pytest.fixture
+def model(tmp_path):
+    ifc_file = ifcopenshell.file(schema="IFC4")
+    project = run("root.create_entity", ifc_file, ifc_class="IfcProject")
+    site = run("root.create_entity", ifc_file, ifc_class="IfcSite")
+    building = run("root.create_entity", ifc_file, ifc_class="IfcBuilding")
+    ground = run("root.create_entity", ifc_file, ifc_class="IfcBuildingStorey", name="Ground")
+    level = run("root.create_entity", ifc_file, ifc_class="IfcBuildingStorey", name="Level 1")
+    run("aggregate.assign_object", ifc_file, product=site, relating_object=project)
+    run("aggregate.assign_object", ifc_file, product=building, relating_object=site)
+    run("aggregate.assign_object", ifc_file, product=ground, relating_object=building)
+    run("aggregate.assign_object", ifc_file, product=level, relating_object=building)
+
+    wall_type = run("root.create_entity", ifc_file, ifc_class="IfcWallType")
+    walls = {}
+    for name, storey in (("A", ground), ("Wall; #3 'B'", ground), ("C", level)):
+        wall = walls[name] = run("root.create_entity", ifc_file, ifc_class="IfcWall", name=name)
+        run("spatial.assign_container", ifc_file, product=wall, relating_structure=storey)
+    slab = run("root.create_entity", ifc_file, ifc_class="IfcSlab")
+    run("spatial.assign_container", ifc_file, product=slab, relating_structure=level)
+    run("type.assign_type", ifc_file, related_object=walls["A"], relating_type=wall_type)
+    run("type.assign_type", ifc_file, related_object=walls["C"], relating_type=wall_type)
+
+    pset = run("pset.add_pset", ifc_file, product=walls["A"], name="Pset_WallCommon")
+    run("pset.edit_pset", ifc_file, pset=pset, properties={"IsExternal": True})
+    pset.DefinesOccurrence[0].RelatedObjects = [walls["A"], walls["C"]]
+    material = run("material.add_material", ifc_file, name="Concrete")
+    run("material.assign_material", ifc_file, product=walls["Wall; #3 'B'"], type="IfcMaterial", material=material)
+    opening = run("root.create_entity", ifc_file, ifc_class="IfcOpeningElement")
+    run("void.add_opening", ifc_file, opening=opening, element=walls["Wall; #3 'B'"])
+
+    path = str(tmp_path / "model.ifc")
+    ifc_file.write(path)
+    return path
+
+
+def execute(tmp_path, model, recipe, arguments):
+    output = str(tmp_path / "output.ifc")
+    ifcpatch.execute(
+        {"log": str(tmp_path / "log.txt"), "input": model, "recipe": recipe, "arguments": arguments, "output": output}
+    )
+    return output
+
+
+def get_counts(ifc_file):
+    return {
+        ifc_class: len(ifc_file.by_type(ifc_class))
+        for ifc_class in (
+            "IfcProject",
+            "IfcBuildingStorey",
+            "IfcWall",
+            "IfcWallType",
+            "IfcSlab",
+            "IfcOpeningElement",
+            "IfcMaterial",
+            "IfcPropertySet",
+            "IfcRelContainedInSpatialStructure",
+        )
+    }
+
+
+class TestOmitReferences:
+    def test_omitting_references_from_aggregates(self):
+        line = b"#1=IFCRELAGGREGATES('a',$,$,$,#5,(#2,#3,#4));"
+        assert omit_references(line, {2, 4}) == b"#1=IFCRELAGGREGATES('a',$,$,$,#5,(#3));"
+
+    def test_keeping_references_outside_of_aggregates(self):
+        line = b"#1=IFCRELAGGREGATES('a',$,$,$,#5,(#2,#5));"
+        assert omit_references(line, {5}) == b"#1=IFCRELAGGREGATES('a',$,$,$,#5,(#2));"
+
+    def test_ignoring_references_in_strings(self):
+        line = b"#1=IFCRELASSOCIATES('a',$,'(#2,''#3'')',$,(#2, #3));"
+        assert omit_references(line, {2}) == b"#1=IFCRELASSOCIATES('a',$,'(#2,''#3'')',$,(#3));"
+
+
+class TestExtractor:
+    def test_indexing_an_unchanged_source(self, model):
+        ifc_file = ifcopenshell.open(model)
+        wall = [w for w in ifc_file.by_type("IfcWall") if w.Name.startswith("Wall;")][0]
+        with Extractor(ifc_file, model) as extractor:
+            assert extractor.source is not None
+            assert len(extractor.ids) == len(ifc_file.wrapped_data.entity_names())
+            line = extractor.get_line(wall.id())
+            assert line.startswith(b"#%d=IFCWALL(" % wall.id())
+            assert line.endswith(b";")
+            assert b"'Wall; #3 ''B'''" in line
+        assert extractor.source is None
+
+    def test_serialising_instances_of_an_edited_model(self, model):
+        ifc_file = ifcopenshell.open(model)
+        ifc_file.createIfcWall(ifcopenshell.guid.new())
+        with Extractor(ifc_file, model) as extractor:
+            assert extractor.source is None
+            wall = ifc_file.by_type("IfcWall")[0]
+            assert extractor.get_line(wall.id()).startswith(b"#%d=IFCWALL(" % wall.id())
+
+    def test_getting_the_subset_of_an_element(self, model):
+        ifc_file = ifcopenshell.open(model)
+        walls = {w.Name: w for w in ifc_file.by_type("IfcWall")}
+        with Extractor(ifc_file, model) as extractor:
+            subset = extractor.get_subset([walls["A"]])
+        assert {e.is_a() for e in subset.objects.values()} == {
+            "IfcProject",
+            "IfcSite",
+            "IfcBuilding",
+            "IfcBuildingStorey",
+            "IfcWall",
+            "IfcWallType",
+        }
+        assert walls["C"].id() not in subset.ids
+        container = walls["A"].ContainedInStructure[0]
+        assert subset.rewritten[container.id()] == {walls["Wall; #3 'B'"].id()}
+        assert subset.rewritten[walls["A"].IsTypedBy[0].id()] == {walls["C"].id()}
+        rel = walls["A"].IsDefinedBy[0]
+        assert subset.rewritten[rel.id()] == {walls["C"].id()}
+        assert rel.RelatingPropertyDefinition.id() in subset.ids
+        assert {e.id() for e in rel.RelatingPropertyDefinition.HasProperties} <= subset.ids
+        assert walls["Wall; #3 'B'"].HasAssociations[0].id() not in subset.ids
+
+    def test_including_the_openings_of_an_element(self, model):
+        ifc_file = ifcopenshell.open(model)
+        wall = [w for w in ifc_file.by_type("IfcWall") if w.Name.startswith("Wall;")][0]
+        with Extractor(ifc_file, model) as extractor:
+            subset = extractor.get_subset([wall])
+        opening = wall.HasOpenings[0]
+        assert opening.RelatedOpeningElement.id() in subset.objects
+        assert opening.id() in subset.ids
+        assert wall.HasAssociations[0].RelatingMaterial.id() in subset.ids
+        assert opening.id() not in subset.rewritten
+
+
+class TestExtractElements:
+    def test_extracting_elements(self, tmp_path, model):
+        output = ifcopenshell.open(execute(tmp_path, model, "ExtractElements", [".IfcWall"]))
+        assert get_counts(output) == {
+            "IfcProject": 1,
+            "IfcBuildingStorey": 2,
+            "IfcWall": 3,
+            "IfcWallType": 1,
+            "IfcSlab": 0,
+            "IfcOpeningElement": 1,
+            "IfcMaterial": 1,
+            "IfcPropertySet": 1,
+            "IfcRelContainedInSpatialStructure": 2,
+        }
+        source = ifcopenshell.open(model)
+        for wall in output.by_type("IfcWall"):
+            assert wall.GlobalId == source.by_id(wall.id()).GlobalId
+            assert wall.Name == source.by_id(wall.id()).Name
+        storey = [s for s in output.by_type("IfcBuildingStorey") if s.Name == "Level 1"][0]
+        assert [e.Name for e in storey.ContainsElements[0].RelatedElements] == ["C"]
+
+
+class TestSplitByBuildingStorey:
+    def test_splitting_by_building_storey(self, tmp_path, model, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        execute(tmp_path, model, "SplitByBuildingStorey", [])
+        ground = ifcopenshell.open(str(tmp_path / "0-Ground.ifc"))
+        level = ifcopenshell.open(str(tmp_path / "1-Level 1.ifc"))
+        assert get_counts(ground) == {
+            "IfcProject": 1,
+            "IfcBuildingStorey": 2,
+            "IfcWall": 2,
+            "IfcWallType": 1,
+            "IfcSlab": 0,
+            "IfcOpeningElement": 1,
+            "IfcMaterial": 1,
+            "IfcPropertySet": 1,
+            "IfcRelContainedInSpatialStructure": 1,
+        }
+        assert get_counts(level) == {
+            "IfcProject": 1,
+            "IfcBuildingStorey": 2,
+            "IfcWall": 1,
+            "IfcWallType": 1,
+            "IfcSlab": 1,
+            "IfcOpeningElement": 0,
+            "IfcMaterial": 0,
+            "IfcPropertySet": 1,
+            "IfcRelContainedInSpatialStructure": 1,
+        }
+        assert [e.Name for e in ground.by_type("IfcWallType")[0].Types[0].RelatedObjects] == ["A"]
+        assert [e.Name for e in level.by_type("IfcWallType")[0].Types[0].RelatedObjects] == ["C"]
+        assert len(ground.by_type("IfcBuilding")[0].IsDecomposedBy[0].RelatedObjects) == 2
@@ -0,0 +1,134 @@
+import logging
+import pytest
+import ifcpatch
+import ifcopenshell
+from ifcpatch.recipes.Optimise import Patcher
+
+HEADER = """ISO-10303-21;
+HEADER;
+FILE_DESCRIPTION(('ViewDefinition [CoordinationView]'),'2;1');
+FILE_NAME('','',(''),(''),'IfcOpenShell','IfcOpenShell','');
+FILE_SCHEMA(('IFC4'));
+ENDSEC;
+DATA;
+"""
+FOOTER = """ENDSEC;
+END-ISO-10303-21;
+"""
+
+
+@pytest.fixture
+def write_model(tmp_path):
+    def write(*lines):
+        path = str(tmp_path / "model.ifc")
+        with open(path, "w") as f:
+            f.write(HEADER + "\n".join(lines) + "\n" + FOOTER)
+        return path
+
+    return write
+
+
+def optimise(path, tolerance=0.0):
+    patcher = Patcher(path, ifcopenshell.open(path), logging.getLogger("IFCPatch"), tolerance)
+    patcher.patch()
+    return {
+        int(line[1 : line.index(b"=")]): line for line in b"".join(patcher.file).splitlines() if line.startswith(b"#")
+    }
+
+
+class TestOptimise:
+    def test_merging_identical_instances(self, write_model):
+        path = write_model(
+            "#1=IFCCARTESIANPOINT((0.,0.,0.));",
+            "#2=IFCCARTESIANPOINT((0.,0.,0.));",
+            "#3=IFCCARTESIANPOINT((1.,0.,0.));",
+            "#4=IFCCARTESIANPOINT((1.0,0.0,0.0E0));",
+            "#5=IFCCARTESIANPOINT((1.0001,0.,0.));",
+        )
+        assert sorted(optimise(path)) == [1, 3, 5]
+
+    def test_merging_reals_within_a_tolerance(self, write_model):
+        path = write_model(
+            "#1=IFCCARTESIANPOINT((1.,0.,0.));",
+            "#2=IFCCARTESIANPOINT((1.0004,-0.0004,0.));",
+            "#3=IFCCARTESIANPOINT((1.0006,0.,0.));",
+            "#4=IFCCARTESIANPOINT((2.,0.,0.));",
+        )
+        assert sorted(optimise(path, tolerance=0.001)) == [1, 3, 4]
+        assert sorted(optimise(path, tolerance=0.01)) == [1, 4]
+
+    def test_remapping_references_to_merged_instances(self, write_model):
+        path = write_model(
+            "#1=IFCCARTESIANPOINT((0.,0.,0.));",
+            "#2=IFCCARTESIANPOINT((1.,0.,0.));",
+            "#3=IFCCARTESIANPOINT((0.,0.,0.));",
+            "#4=IFCCARTESIANPOINT((1.,0.,0.));",
+            "#5=IFCPOLYLINE((#1,#2));",
+            "#6=IFCPOLYLINE((#3,#4));",
+            "#7=IFCPOLYLINE((#4,#3));",
+            "#8=IFCGEOMETRICCURVESET((#5,#6,#7));",
+            "#9=IFCSTYLEDITEM(#6,(),'#6 is kept as is');",
+        )
+        lines = optimise(path)
+        assert sorted(lines) == [1, 2, 5, 7, 8, 9]
+        assert lines[7] == b"#7=IFCPOLYLINE((#2,#1));"
+        assert lines[8] == b"#8=IFCGEOMETRICCURVESET((#5,#5,#7));"
+        assert lines[9] == b"#9=IFCSTYLEDITEM(#5,(),'#6 is kept as is');"
+
+    def test_keeping_instances_in_reference_cycles(self, write_model):
+        path = write_model(
+            "#1=IFCGEOMETRICCURVESET((#1));",
+            "#2=IFCGEOMETRICCURVESET((#2));",
+            "#3=IFCGEOMETRICCURVESET((#4));",
+            "#4=IFCGEOMETRICCURVESET((#3));",
+            "#5=IFCCARTESIANPOINT((0.,0.,0.));",
+            "#6=IFCCARTESIANPOINT((0.,0.,0.));",
+            "#7=IFCGEOMETRICCURVESET((#3,#6));",
+        )
+        lines = optimise(path)
+        assert sorted(lines) == [1, 2, 3, 4, 5, 7]
+        assert lines[1] == b"#1=IFCGEOMETRICCURVESET((#1));"
+        assert lines[2] == b"#2=IFCGEOMETRICCURVESET((#2));"
+        assert lines[7] == b"#7=IFCGEOMETRICCURVESET((#3,#5));"
+
+    def test_merging_instances_of_a_model_without_a_source_file(self):
+        ifc_file = ifcopenshell.file(schema="IFC4")
+        points = [ifc_file.createIfcCartesianPoint((0.0, 0.0, 0.0)) for i in range(3)]
+        ifc_file.createIfcPolyline(points)
+        patcher = Patcher(None, ifc_file, logging.getLogger("IFCPatch"))
+        patcher.patch()
+        output = b"".join(patcher.file)
+        assert output.count(b"IFCCARTESIANPOINT") == 1
+        polyline = [line for line in output.splitlines() if b"IFCPOLYLINE" in line][0]
+        assert polyline.endswith(b"((#%d,#%d,#%d));" % ((points[0].id(),) * 3))
+
+    def test_streaming_the_output_through_execute(self, tmp_path, write_model):
+        path = write_model(
+            "#1=IFCCARTESIANPOINT((0.,0.,0.));",
+            "#2=IFCCARTESIANPOINT((0.,0.,0.));",
+            "#3=IFCPOLYLINE((#1,#2));",
+        )
+        output = str(tmp_path / "output.ifc")
+        args = {
+            "log": str(tmp_path / "log.txt"),
+            "input": path,
+            "recipe": "Optimise",
+            "arguments": [],
+            "output": output,
+        }
+        ifcpatch.execute(args)
+        ifc_file = ifcopenshell.open(output)
+        assert len(ifc_file.by_type("IfcCartesianPoint")) == 1
+        assert ifc_file.by_id(3).Points == (ifc_file.by_id(1), ifc_file.by_id(1))
+        assert len(ifcopenshell.open(path).by_type("IfcCartesianPoint")) == 2
+
+    def test_replacing_the_input_once_the_output_is_complete(self, tmp_path, write_model):
+        path = write_model(
+            "#1=IFCCARTESIANPOINT((0.,0.,0.));",
+            "#2=IFCCARTESIANPOINT((0.,0.,1.));",
+            "#3=IFCCARTESIANPOINT((0.,0.,1.0004));",
+        )
+        args = {"log": str(tmp_path / "log.txt"), "input": path, "recipe": "Optimise", "arguments": ["0.001"]}
+        ifcpatch.execute({**args, "output": None})
+        assert [p.id() for p in ifcopenshell.open(path).by_type("IfcCartesianPoint")] == [1, 2]
+        assert not (tmp_path / "model.ifc.part").exists()
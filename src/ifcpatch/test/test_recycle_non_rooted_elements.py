@@ -0,0 +1,26 @@
+import inspect
+import logging
+import ifcpatch
+import ifcopenshell
+from ifcpatch.recipes.RecycleNonRootedElements import Patcher
+
+
+class TestRecycleNonRootedElements:
+    def test_streaming_the_file_without_duplicate_elements(self, tmp_path):
+        ifc_file = ifcopenshell.file(schema="IFC4")
+        points = [ifc_file.createIfcCartesianPoint((0.0, 0.0, 0.0)) for i in range(2)]
+        ifc_file.createIfcPolyline(points)
+        path = str(tmp_path / "model.ifc")
+        ifc_file.write(path)
+
+        patcher = Patcher(path, ifcopenshell.open(path), logging.getLogger("IFCPatch"))
+        patcher.patch()
+        assert inspect.isgenerator(patcher.file)
+        assert all(isinstance(chunk, bytes) for chunk in patcher.file)
+
+        output = str(tmp_path / "output.ifc")
+        args = {"log": str(tmp_path / "log.txt"), "input": path, "recipe": "RecycleNonRootedElements"}
+        ifcpatch.execute({**args, "arguments": [], "output": output})
+        ifc_file = ifcopenshell.open(output)
+        assert [p.id() for p in ifc_file.by_type("IfcCartesianPoint")] == [points[0].id()]
+        assert ifc_file.by_type("IfcPolyline")[0].Points == (ifc_file.by_id(points[0].id()),) * 2
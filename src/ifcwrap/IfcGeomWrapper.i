@@ -232,6 +232,160 @@ struct ShapeRTTI : public boost::static_visitor<PyObject*>
 %newobject construct_iterator_with_include_exclude_globalid;
 %newobject construct_iterator_with_include_exclude_id;
 
+%{
+	// A minimal Python object that owns a std::vector and exposes its
+	// contents through the buffer protocol, so that it can be viewed as a
+	// NumPy array without copying.
+	struct vector_buffer_holder_base {
+		virtual ~vector_buffer_holder_base() {}
+	};
+
+	template <typename T>
+	struct vector_buffer_holder : public vector_buffer_holder_base {
+		std::vector<T> data;
+	};
+
+	typedef struct {
+		PyObject_HEAD
+		vector_buffer_holder_base* holder;
+		void* data;
+		Py_ssize_t shape[1];
+		Py_ssize_t byte_shape[1];
+		Py_ssize_t itemsize;
+		char* format;
+	} vector_buffer_object;
+
+	static void vector_buffer_dealloc(PyObject* self) {
+		delete ((vector_buffer_object*) self)->holder;
+		Py_TYPE(self)->tp_free(self);
+	}
+
+	static int vector_buffer_getbuffer(PyObject* self, Py_buffer* view, int flags) {
+		vector_buffer_object* obj = (vector_buffer_object*) self;
+		if (PyBuffer_FillInfo(view, self, obj->data, obj->shape[0] * obj->itemsize, 1, flags) == -1) {
+			return -1;
+		}
+		if ((flags & PyBUF_FORMAT) == PyBUF_FORMAT) {
+			view->format = obj->format;
+			view->itemsize = obj->itemsize;
+			if ((flags & PyBUF_ND) == PyBUF_ND) {
+				view->shape = obj->shape;
+			}
+		} else if ((flags & PyBUF_ND) == PyBUF_ND) {
+			// Without a format the consumer expects unsigned bytes
+			view->shape = obj->byte_shape;
+		}
+		return 0;
+	}
+
+	static PyBufferProcs vector_buffer_procs;
+	static PyTypeObject vector_buffer_type = { PyVarObject_HEAD_INIT(NULL, 0) };
+
+	template <typename T>
+	static PyObject* vector_to_buffer(std::vector<T>& v, const char* format) {
+		vector_buffer_object* obj = PyObject_New(vector_buffer_object, &vector_buffer_type);
+		if (obj == 0) {
+			return 0;
+		}
+		vector_buffer_holder<T>* holder = new vector_buffer_holder<T>;
+		holder->data.swap(v);
+		obj->holder = holder;
+		obj->data = holder->data.data();
+		obj->shape[0] = holder->data.size();
+		obj->byte_shape[0] = holder->data.size() * sizeof(T);
+		obj->itemsize = sizeof(T);
+		obj->format = const_cast<char*>(format);
+		return (PyObject*) obj;
+	}
+%}
+
+%init %{
+	vector_buffer_procs.bf_getbuffer = vector_buffer_getbuffer;
+	vector_buffer_type.tp_name = "ifcopenshell_wrapper.vector_buffer";
+	vector_buffer_type.tp_basicsize = sizeof(vector_buffer_object);
+	vector_buffer_type.tp_flags = Py_TPFLAGS_DEFAULT;
+	vector_buffer_type.tp_dealloc = vector_buffer_dealloc;
+	vector_buffer_type.tp_free = PyObject_Del;
+	vector_buffer_type.tp_as_buffer = &vector_buffer_procs;
+	PyType_Ready(&vector_buffer_type);
+%}
+
+%inline %{
+	// Consumes up to max_size triangulated elements from an initialized
+	// iterator, starting at the current element. The geometry of all
+	// elements is concatenated into contiguous buffers, with offsets per
+	// element, so that it can be handed to Python in one go. When a tree is
+	// supplied, the native elements are added to it along the way. Returns
+	// a tuple of a dictionary of buffers and whether the iterator has more
+	// elements.
+	PyObject* iterator_get_batch(IfcGeom::Iterator* it, int max_size, IfcGeom::tree* tree = 0) {
+		std::vector<int> ids, vertex_offsets(1, 0), face_offsets(1, 0), faces, material_ids;
+		std::vector<double> verts, normals, matrices;
+		PyObject* guids = PyList_New(0);
+		bool has_next = true;
+
+		for (int n = 0; n < max_size && has_next; ++n) {
+			if (tree) {
+				tree->add_element(it->get_native());
+			}
+			IfcGeom::TriangulationElement* elem = dynamic_cast<IfcGeom::TriangulationElement*>(it->get());
+			if (!elem) {
+				Py_DECREF(guids);
+				throw std::runtime_error("Batches are only supported for triangulated elements");
+			}
+			const IfcGeom::Representation::Triangulation& geometry = elem->geometry();
+
+			ids.push_back(elem->id());
+			PyObject* guid = pythonize(elem->guid());
+			PyList_Append(guids, guid);
+			Py_DECREF(guid);
+
+			verts.insert(verts.end(), geometry.verts().begin(), geometry.verts().end());
+			normals.insert(normals.end(), geometry.normals().begin(), geometry.normals().end());
+			faces.insert(faces.end(), geometry.faces().begin(), geometry.faces().end());
+			material_ids.insert(material_ids.end(), geometry.material_ids().begin(), geometry.material_ids().end());
+			vertex_offsets.push_back((int) verts.size() / 3);
+			face_offsets.push_back((int) faces.size() / 3);
+
+			// The matrix is stored as 4x3 column-major, output a 4x4 row-major matrix
+			const std::vector<double>& m = elem->transformation().matrix().data();
+			for (int row = 0; row < 3; ++row) {
+				for (int col = 0; col < 4; ++col) {
+					matrices.push_back(m[col * 3 + row]);
+				}
+			}
+			matrices.insert(matrices.end(), { 0., 0., 0., 1. });
+
+			has_next = it->next() != 0;
+		}
+
+		PyObject* batch = PyDict_New();
+		PyDict_SetItemString(batch, "guids", guids);
+		Py_DECREF(guids);
+
+		const std::pair<const char*, std::vector<int>*> int_buffers[] = {
+			{ "ids", &ids }, { "faces", &faces }, { "material_ids", &material_ids },
+			{ "vertex_offsets", &vertex_offsets }, { "face_offsets", &face_offsets }
+		};
+		for (auto& p : int_buffers) {
+			PyObject* buffer = vector_to_buffer(*p.second, "i");
+			PyDict_SetItemString(batch, p.first, buffer);
+			Py_XDECREF(buffer);
+		}
+
+		const std::pair<const char*, std::vector<double>*> double_buffers[] = {
+			{ "verts", &verts }, { "normals", &normals }, { "matrices", &matrices }
+		};
+		for (auto& p : double_buffers) {
+			PyObject* buffer = vector_to_buffer(*p.second, "d");
+			PyDict_SetItemString(batch, p.first, buffer);
+			Py_XDECREF(buffer);
+		}
+
+		return Py_BuildValue("(NN)", batch, PyBool_FromLong(has_next));
+	}
+%}
+
 %extend IfcGeom::Representation::Triangulation {
 	%pythoncode %{
         # Hide the getters with read-only property implementations
@@ -36,6 +36,7 @@ private:
 %ignore IfcParse::FileName::FileName;
 %ignore IfcParse::FileSchema::FileSchema;
 %ignore IfcParse::IfcFile::tokens;
+%ignore IfcParse::parse_ifcxml_buffer;
 
 %ignore IfcParse::IfcSpfHeader::IfcSpfHeader(IfcSpfLexer*);
 %ignore IfcParse::IfcSpfHeader::lexer;
@@ -79,6 +80,39 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return IfcUtil::from_parameter_type(pt);
 	}
 }
+
+// A stream parsing the buffer of a Python object in place. The buffer, and
+// with it the object exporting it, is held until the stream is destroyed.
+class PyBufferStream : public IfcParse::IfcSpfStream {
+	Py_buffer view_;
+public:
+	PyBufferStream(const Py_buffer& view)
+		: IfcParse::IfcSpfStream(view.buf, (size_t) view.len, false)
+		, view_(view) {}
+	~PyBufferStream() {
+		PyGILState_STATE state = PyGILState_Ensure();
+		PyBuffer_Release(&view_);
+		PyGILState_Release(state);
+	}
+};
+// Sets the parse options of IfcFile for the files opened while it is in
+// scope, and restores the previous options, also when opening throws.
+class parse_options_scope {
+	bool previous_lazy_;
+	unsigned previous_threads_;
+public:
+	parse_options_scope(bool lazy, unsigned threads)
+		: previous_lazy_(IfcParse::IfcFile::lazy_load())
+		, previous_threads_(IfcParse::IfcFile::parse_threads())
+	{
+		IfcParse::IfcFile::lazy_load(lazy);
+		IfcParse::IfcFile::parse_threads(threads);
+	}
+	~parse_options_scope() {
+		IfcParse::IfcFile::lazy_load(previous_lazy_);
+		IfcParse::IfcFile::parse_threads(previous_threads_);
+	}
+};
 %}
 
 %extend IfcParse::IfcFile {
@@ -100,6 +134,25 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return s.str();
 	}
 
+	std::string header_to_string() {
+		std::stringstream s;
+		$self->header().write(s);
+		return s.str();
+	}
+
+	// Serialises the instances with the given ids as lines of the DATA section,
+	// so that a file can be written in chunks without serialising it at once.
+	std::string instances_to_string(const std::vector<int>& ids) {
+		std::stringstream s;
+		for (std::vector<int>::const_iterator it = ids.begin(); it != ids.end(); ++it) {
+			const IfcUtil::IfcBaseClass* e = $self->instance_by_id(*it);
+			if (e->declaration().as_entity()) {
+				s << e->data().toString(true) << ";" << std::endl;
+			}
+		}
+		return s.str();
+	}
+
 	std::vector<unsigned> entity_names() const {
 		std::vector<unsigned> keys;
 		keys.reserve(std::distance($self->begin(), $self->end()));
@@ -248,6 +301,12 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return reinterpret_cast<size_t>($self->data().file);
 	}
 
+	// Identifies the (schema, entity) declaration of the instance, which
+	// is used as a key to cache attribute lookups in Python.
+	size_t declaration_pointer() const {
+		return reinterpret_cast<size_t>(&$self->declaration());
+	}
+
 	unsigned get_argument_index(const std::string& a) const {
 		if ($self->declaration().as_entity()) {
 			return $self->declaration().as_entity()->attribute_index(a);
@@ -521,12 +580,30 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 // The IfcFile* returned by open() is to be freed by SWIG/Python
 %newobject open;
 %newobject read;
+%newobject read_buffer;
 %newobject parse_ifcxml;
+%newobject read_ifcxml_buffer;
 
 %inline %{
-	IfcParse::IfcFile* open(const std::string& fn) {
-		IfcParse::IfcFile* f = new IfcParse::IfcFile(fn);
-		return f;
+	IfcParse::IfcFile* open(const std::string& fn, bool lazy = true, unsigned threads = 1) {
+		parse_options_scope options(lazy, threads);
+		return new IfcParse::IfcFile(fn);
+	}
+
+	// Parses an object supporting the buffer protocol without copying it.
+	// The object must not be modified while the file exists.
+	IfcParse::IfcFile* read_buffer(PyObject* data, bool lazy = true, unsigned threads = 1) {
+		Py_buffer view;
+		if (PyObject_GetBuffer(data, &view, PyBUF_SIMPLE) != 0) {
+			PyErr_Clear();
+			throw std::runtime_error("Object does not support the buffer protocol");
+		}
+		if ((size_t) view.len > IfcParse::IfcSpfStream::max_length()) {
+			PyBuffer_Release(&view);
+			throw std::runtime_error("Buffers larger than 4 GB are not supported");
+		}
+		parse_options_scope options(lazy, threads);
+		return new IfcParse::IfcFile(new PyBufferStream(view));
 	}
 
     IfcParse::IfcFile* read(const std::string& data) {
@@ -536,6 +613,24 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 		return f;
 	}
 
+#ifdef WITH_IFCXML
+	// Parses ifcXML from an object supporting the buffer protocol without copying it
+	IfcParse::IfcFile* read_ifcxml_buffer(PyObject* data) {
+		Py_buffer view;
+		if (PyObject_GetBuffer(data, &view, PyBUF_SIMPLE) != 0) {
+			PyErr_Clear();
+			throw std::runtime_error("Object does not support the buffer protocol");
+		}
+		if (view.len > std::numeric_limits<int>::max()) {
+			PyBuffer_Release(&view);
+			throw std::runtime_error("Buffers larger than 2 GB are not supported");
+		}
+		IfcParse::IfcFile* f = IfcParse::parse_ifcxml_buffer((const char*) view.buf, (int) view.len);
+		PyBuffer_Release(&view);
+		return f;
+	}
+#endif
+
 	const char* version() {
 		return IFCOPENSHELL_VERSION;
 	}
@@ -820,3 +915,125 @@ static IfcUtil::ArgumentType helper_fn_attribute_type(const IfcUtil::IfcBaseClas
 	}
 %}
 
+
+%{
+	PyObject* convert_cpp_attribute_to_column_value(IfcUtil::ArgumentType type, Argument& arg);
+
+	// Entity instances are represented by their id. Values of defined types
+	// in selects are tagged with their type as (type, value), so that they
+	// cannot be mistaken for references.
+	PyObject* convert_cpp_instance_to_column_value(IfcUtil::IfcBaseClass* v) {
+		if (v->declaration().as_entity()) {
+			return pythonize(v->data().id());
+		}
+		auto value_cpp = v->data().getArgument(0);
+		return Py_BuildValue("(NN)",
+			pythonize(v->declaration().name()),
+			convert_cpp_attribute_to_column_value(value_cpp->type(), *value_cpp));
+	}
+
+	// Like convert_cpp_attribute_to_python(), but no instance wrappers need
+	// to be created for columnar output.
+	PyObject* convert_cpp_attribute_to_column_value(IfcUtil::ArgumentType type, Argument& arg) {
+		if (!arg.isNull() && type != IfcUtil::Argument_DERIVED) {
+		try {
+		switch(type) {
+			case IfcUtil::Argument_ENTITY_INSTANCE: {
+				IfcUtil::IfcBaseClass* v = arg;
+				return convert_cpp_instance_to_column_value(v);
+			break; }
+			case IfcUtil::Argument_AGGREGATE_OF_ENTITY_INSTANCE: {
+				aggregate_of_instance::ptr v = arg;
+				auto r = PyTuple_New(v->size());
+				for (unsigned i = 0; i < v->size(); ++i) {
+					PyTuple_SetItem(r, i, convert_cpp_instance_to_column_value((*v)[i]));
+				}
+				return r;
+			break; }
+			case IfcUtil::Argument_AGGREGATE_OF_AGGREGATE_OF_ENTITY_INSTANCE: {
+				aggregate_of_aggregate_of_instance::ptr vs = arg;
+				auto rs = PyTuple_New(vs->size());
+				for (auto it = vs->begin(); it != vs->end(); ++it) {
+					auto r = PyTuple_New(it->size());
+					for (unsigned i = 0; i < it->size(); ++i) {
+						PyTuple_SetItem(r, i, convert_cpp_instance_to_column_value((*it)[i]));
+					}
+					PyTuple_SetItem(rs, std::distance(vs->begin(), it), r);
+				}
+				return rs;
+			break; }
+			default:
+				return convert_cpp_attribute_to_python(type, arg);
+		}
+		} catch(...) {}
+		}
+		Py_INCREF(Py_None);
+		return Py_None;
+	}
+%}
+%inline %{
+	// Returns a tuple of (ids, columns, types) for all instances of a class.
+	// Columns are lists aligned with ids, one per requested attribute name,
+	// types are the argument type names of the attributes on the class.
+	PyObject* get_columns_cpp(IfcParse::IfcFile* f, const std::string& type, const std::vector<std::string>& attributes, bool include_subtypes) {
+		const IfcParse::declaration* decl = f->schema()->declaration_by_name(type);
+		aggregate_of_instance::ptr insts = include_subtypes
+			? f->instances_by_type(decl)
+			: f->instances_by_type_excl_subtypes(decl);
+		const Py_ssize_t n = insts ? insts->size() : 0;
+
+		PyObject* ids = PyList_New(n);
+		PyObject* columns = PyList_New(attributes.size());
+		PyObject* types = PyList_New(attributes.size());
+		for (size_t j = 0; j < attributes.size(); ++j) {
+			PyList_SetItem(columns, j, PyList_New(n));
+			IfcUtil::ArgumentType attr_type = IfcUtil::Argument_UNKNOWN;
+			if (decl->as_entity()) {
+				ptrdiff_t index = decl->as_entity()->attribute_index(attributes[j]);
+				if (index != -1) {
+					attr_type = decl->as_entity()->derived()[index]
+						? IfcUtil::Argument_DERIVED
+						: IfcUtil::from_parameter_type(decl->as_entity()->attribute_by_index(index)->type_of_attribute());
+				}
+			}
+			PyList_SetItem(types, j, pythonize(std::string(IfcUtil::ArgumentTypeToString(attr_type))));
+		}
+
+		// Attribute indices only depend on the declaration, which is shared
+		// among all instances of the same (sub)type.
+		std::map<const IfcParse::declaration*, std::vector<ptrdiff_t> > indices_by_type;
+
+		for (Py_ssize_t i = 0; i < n; ++i) {
+			IfcUtil::IfcBaseClass* inst = (*insts)[i];
+			PyList_SetItem(ids, i, pythonize(inst->data().id()));
+
+			const IfcParse::entity* inst_decl = inst->declaration().as_entity();
+			auto it = indices_by_type.find(inst_decl);
+			if (it == indices_by_type.end()) {
+				std::vector<ptrdiff_t> indices;
+				indices.reserve(attributes.size());
+				for (auto& name : attributes) {
+					indices.push_back(inst_decl->attribute_index(name));
+				}
+				it = indices_by_type.insert({ inst_decl, indices }).first;
+			}
+
+			for (size_t j = 0; j < attributes.size(); ++j) {
+				const ptrdiff_t index = it->second[j];
+				PyObject* value_py;
+				if (index == -1) {
+					Py_INCREF(Py_None);
+					value_py = Py_None;
+				} else {
+					auto attr_type = inst_decl->derived()[index]
+						? IfcUtil::Argument_DERIVED
+						: IfcUtil::from_parameter_type(inst_decl->attribute_by_index(index)->type_of_attribute());
+					value_py = convert_cpp_attribute_to_column_value(attr_type, *inst->data().getArgument(index));
+				}
+				PyList_SetItem(PyList_GetItem(columns, j), i, value_py);
+			}
+		}
+
+		return Py_BuildValue("(NNN)", ids, columns, types);
+	}
+%}
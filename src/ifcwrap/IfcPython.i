@@ -50,6 +50,7 @@
 %include "stdint.i"
 %include "std_array.i"
 %include "std_vector.i"
+%include "std_set.i"
 %include "std_string.i"
 %include "exception.i"
 
@@ -114,6 +115,8 @@
 	#include "../ifcparse/IfcSchema.h"
 	#include "../ifcparse/utils.h"
 
+	#include <limits>
+
 	#include "../svgfill/src/svgfill.h"
 
 	#include <BRepTools_ShapeSet.hxx>
@@ -161,11 +164,19 @@
 	#include "../ifcparse/IfcSchema.h"
 	#include "../ifcparse/utils.h"
 
+	#include <limits>
+
 	#include "../svgfill/src/svgfill.h"
 
 	#include <BRepTools_ShapeSet.hxx>
 %}
 
+// Declared before the wrappers, so that the rotation and context ids of settings are returned as sequences
+namespace std {
+  %template(float_array_4) array<double, 4>;
+  %template(int_set) set<int>;
+}
+
 %include "IfcGeomWrapper.i"
 %include "IfcParseWrapper.i"
 	
@@ -0,0 +1,147 @@
+# OpenCDE - OpenCDE Python implementation
+# Copyright (C) 2021 Prabhat Singh <singh01prabhat@gmail.com>
+#
+# This file is part of OpenCDE.
+#
+# OpenCDE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# OpenCDE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with OpenCDE.  If not, see <http://www.gnu.org/licenses/>.
+
+from run import db
+import json
+
+
+class JsonDataMixin:
+    # The full BCF resource is stored as JSON, and only the columns needed to look it up or filter it are indexed
+    data = db.Column(db.Text, nullable=False, default="{}")
+
+    def to_dict(self):
+        return json.loads(self.data)
+
+    def set_data(self, data):
+        self.data = json.dumps(data)
+
+
+class Project(db.Model, JsonDataMixin):
+    __tablename__ = "bcf_project"
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    topics = db.relationship("Topic", backref="project", lazy="dynamic", cascade="all, delete-orphan")
+
+    def set_data(self, data):
+        super().set_data(data)
+        self.project_id = data["project_id"]
+
+
+class Topic(db.Model, JsonDataMixin):
+    __tablename__ = "bcf_topic"
+    __table_args__ = (db.UniqueConstraint("project_id", "guid"),)
+
+    # Topic attributes which may be used in a $filter or $orderby query
+    filterable_attributes = (
+        "topic_type",
+        "topic_status",
+        "priority",
+        "stage",
+        "assigned_to",
+        "creation_author",
+        "modified_author",
+        "creation_date",
+        "modified_date",
+        "due_date",
+        "index",
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("bcf_project.id", ondelete="CASCADE"), nullable=False, index=True)
+    guid = db.Column(db.String(64), nullable=False, index=True)
+    topic_type = db.Column(db.String(255), index=True)
+    topic_status = db.Column(db.String(255), index=True)
+    priority = db.Column(db.String(255), index=True)
+    stage = db.Column(db.String(255), index=True)
+    assigned_to = db.Column(db.String(255), index=True)
+    creation_author = db.Column(db.String(255), index=True)
+    modified_author = db.Column(db.String(255), index=True)
+    # ISO 8601 dates, which sort chronologically as strings
+    creation_date = db.Column(db.String(64), index=True)
+    modified_date = db.Column(db.String(64), index=True)
+    due_date = db.Column(db.String(64), index=True)
+    index = db.Column(db.Integer, index=True)
+    comments = db.relationship("Comment", backref="topic", lazy="dynamic", cascade="all, delete-orphan")
+    viewpoints = db.relationship("Viewpoint", backref="topic", lazy="dynamic", cascade="all, delete-orphan")
+
+    def set_data(self, data):
+        super().set_data(data)
+        self.guid = data["guid"]
+        for attribute in self.filterable_attributes:
+            setattr(self, attribute, data.get(attribute))
+
+
+class Comment(db.Model, JsonDataMixin):
+    __tablename__ = "bcf_comment"
+    __table_args__ = (db.UniqueConstraint("topic_id", "guid"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    topic_id = db.Column(db.Integer, db.ForeignKey("bcf_topic.id", ondelete="CASCADE"), nullable=False, index=True)
+    guid = db.Column(db.String(64), nullable=False, index=True)
+
+    def set_data(self, data):
+        super().set_data(data)
+        self.guid = data["guid"]
+
+
+class Viewpoint(db.Model, JsonDataMixin):
+    __tablename__ = "bcf_viewpoint"
+    __table_args__ = (db.UniqueConstraint("topic_id", "guid"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    topic_id = db.Column(db.Integer, db.ForeignKey("bcf_topic.id", ondelete="CASCADE"), nullable=False, index=True)
+    guid = db.Column(db.String(64), nullable=False, index=True)
+
+    def set_data(self, data):
+        super().set_data(data)
+        self.guid = data["guid"]
+
+
+def load_sample_data(jdata):
+    """Populates empty tables with the sample data of project.json
+
+    The sample topics are added to every project. Comments are added to
+    the topic they reference, and viewpoints to every topic, as the sample
+    viewpoints do not reference a topic.
+    """
+    if Project.query.first() is not None:
+        return
+    for project_data in jdata["Projects"]:
+        project = Project()
+        project.set_data(project_data)
+        db.session.add(project)
+        for topic_data in jdata["Topics"]:
+            topic = Topic(project=project)
+            topic.set_data(topic_data)
+            db.session.add(topic)
+            for comment_data in jdata["Comments"]:
+                if comment_data.get("topic_guid") == topic.guid:
+                    comment = Comment(topic=topic)
+                    comment.set_data(comment_data)
+                    db.session.add(comment)
+            viewpoint_guids = set()
+            for viewpoint_data in jdata["Viewpoints"]:
+                # The sample data repeats some viewpoints, which must be unique per topic
+                if viewpoint_data["guid"] in viewpoint_guids:
+                    continue
+                viewpoint_guids.add(viewpoint_data["guid"])
+                viewpoint = Viewpoint(topic=topic)
+                viewpoint.set_data(viewpoint_data)
+                db.session.add(viewpoint)
+    db.session.commit()
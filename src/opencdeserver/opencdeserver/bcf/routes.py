@@ -20,10 +20,14 @@
 from flask import jsonify, url_for, redirect, render_template, request, session, send_file
 from flask_login import login_user, logout_user, login_required, current_user
 from flask.blueprints import Blueprint
-from foundation.models import User, OAuth2AuthorizationCode, OAuth2Token, OAuth2Client
+from foundation.models import User, OAuth2AuthorizationCode, OAuth2Token, OAuth2Client, cache_token, is_token_cached
 from run import app, db
+from .models import Project, Topic, Comment, Viewpoint, load_sample_data
+import re
 import json
 import os
+import uuid
+import operator
 from flask_expects_json import expects_json
 
 bcf = Blueprint("bcf", __name__, template_folder="templates", url_prefix="/bcf/3.0")
@@ -35,16 +39,114 @@ jdata = json.load(data)
 schema_path = os.path.join(my_absolute_dirpath, "schemas")
 
 
+@bcf.before_app_first_request
+def setup_database():
+    db.create_all()
+    load_sample_data(jdata)
+
+
 def validate_client(request):
     Headers = str.split(request.headers["Authorization"])
     token = Headers[1]
+    if is_token_cached(token):
+        return True
     access_token = OAuth2Token.query.filter_by(access_token=token).first()
-    if access_token:
+    if access_token and not access_token.revoked:
+        cache_token(token)
         return True
     else:
         return False
 
 
+def find_project(project_id):
+    return Project.query.filter_by(project_id=project_id).first()
+
+
+def find_topic(project_id, topic_id):
+    return Topic.query.join(Project).filter(Project.project_id == project_id, Topic.guid == topic_id).first()
+
+
+def find_comment(project_id, topic_id, comment_id):
+    return (
+        Comment.query.join(Topic)
+        .join(Project)
+        .filter(Project.project_id == project_id, Topic.guid == topic_id, Comment.guid == comment_id)
+        .first()
+    )
+
+
+def find_viewpoint(project_id, topic_id, viewpoint_id):
+    return (
+        Viewpoint.query.join(Topic)
+        .join(Project)
+        .filter(Project.project_id == project_id, Topic.guid == topic_id, Viewpoint.guid == viewpoint_id)
+        .first()
+    )
+
+
+filter_operators = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le,
+}
+filter_clause = re.compile(r"\s*(\w+)\s+(eq|ne|gt|ge|lt|le)\s+('(?:[^']|'')*'|[^\s']+)\s*(?:and\s+|$)")
+
+
+def parse_filter_value(value):
+    if value.startswith("'"):
+        return value[1:-1].replace("''", "'")
+    elif value == "null":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Unsupported filter value {value}")
+
+
+def filter_topics(query, args):
+    """Applies the OData $filter, $orderby, $skip and $top query options
+
+    Filters are a conjunction of comparisons of topic attributes, such as
+    topic_status eq 'Open' and creation_date gt '2021-01-01'.
+    """
+    expression = args.get("$filter", "").strip()
+    position = 0
+    while position < len(expression):
+        match = filter_clause.match(expression, position)
+        if not match:
+            raise ValueError(f"Unsupported filter {expression[position:]}")
+        attribute, operator_name, value = match.groups()
+        if attribute not in Topic.filterable_attributes:
+            raise ValueError(f"Unsupported filter attribute {attribute}")
+        query = query.filter(filter_operators[operator_name](getattr(Topic, attribute), parse_filter_value(value)))
+        position = match.end()
+
+    for order in args.get("$orderby", "").split(","):
+        if not order.strip():
+            continue
+        attribute, _, direction = order.strip().partition(" ")
+        if attribute not in Topic.filterable_attributes or direction.strip() not in ("", "asc", "desc"):
+            raise ValueError(f"Unsupported order {order}")
+        column = getattr(Topic, attribute)
+        query = query.order_by(column.desc() if direction.strip() == "desc" else column.asc())
+    # Pages are only stable if the order of topics is fully determined
+    query = query.order_by(Topic.id)
+
+    try:
+        skip = int(args.get("$skip", 0))
+        top = int(args["$top"]) if "$top" in args else None
+    except ValueError:
+        raise ValueError("$skip and $top must be integers")
+    if skip:
+        query = query.offset(skip)
+    if top is not None:
+        query = query.limit(top)
+    return query
+
+
 def invalid_user():
     response = jsonify({"message": "User not recognized"})
     response.status = 401
@@ -57,10 +159,22 @@ def invalid_project():
     return response
 
 
+def invalid_query(message):
+    response = jsonify({"message": message})
+    response.status_code = 400
+    return response
+
+
+def conflict(message):
+    response = jsonify({"message": message})
+    response.status_code = 409
+    return response
+
+
 @bcf.route("/projects")
 def projects():
     if validate_client(request):
-        return jsonify(jdata["Projects"])
+        return jsonify([p.to_dict() for p in Project.query.order_by(Project.id)])
     return invalid_user()
 
 
@@ -73,9 +187,9 @@ def bcf_3():
 @bcf.route("/projects/<project_id>")
 def project_details(project_id):
     if validate_client(request):
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                return jsonify(project)
+        project = find_project(project_id)
+        if project:
+            return jsonify(project.to_dict())
         return invalid_project()
     return invalid_user()
 
@@ -89,10 +203,12 @@ project_put = json.load(project_put)
 def update_project(project_id):
     if validate_client(request) and request.method == "PUT":
         data = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                response = jsonify(data)
-                return response
+        project = find_project(project_id)
+        if project:
+            project.set_data({**project.to_dict(), **data, "project_id": project.project_id})
+            db.session.commit()
+            response = jsonify(project.to_dict())
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -100,20 +216,22 @@ def update_project(project_id):
 @bcf.route("/projects/<project_id>/extensions")
 def extensions(project_id):
     if validate_client(request):
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                return jsonify(jdata["Extensions"])
+        if find_project(project_id):
+            return jsonify(jdata["Extensions"])
         return invalid_project()
     return invalid_user()
 
 
 @bcf.route("/projects/<project_id>/topics")
 def topics(project_id):
-
     if validate_client(request):
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                return jsonify(jdata["Topics"])
+        project = find_project(project_id)
+        if project:
+            try:
+                query = filter_topics(project.topics, request.args)
+            except ValueError as e:
+                return invalid_query(str(e))
+            return jsonify([t.to_dict() for t in query])
         return invalid_project()
     return invalid_user()
 
@@ -127,13 +245,17 @@ topic_post = json.load(topic_post)
 def create_topic(project_id, topic_id):
     if validate_client(request) and request.method == "POST":
         body = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        response = jsonify(body)
-                        response.status_code = 201
-                        return response
+        project = find_project(project_id)
+        if project:
+            if find_topic(project_id, topic_id):
+                return conflict("Topic already exists")
+            topic = Topic(project=project)
+            topic.set_data({**body, "guid": topic_id})
+            db.session.add(topic)
+            db.session.commit()
+            response = jsonify(topic.to_dict())
+            response.status_code = 201
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -141,11 +263,9 @@ def create_topic(project_id, topic_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>")
 def topic_details(project_id, topic_id):
     if validate_client(request):
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify(topic)
+        topic = find_topic(project_id, topic_id)
+        if topic:
+            return jsonify(topic.to_dict())
         return invalid_project()
     return invalid_user()
 
@@ -159,11 +279,11 @@ topic_put = json.load(topic_put)
 def update_topic(project_id, topic_id):
     if validate_client(request) and request.method == "PUT":
         data = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify(data)
+        topic = find_topic(project_id, topic_id)
+        if topic:
+            topic.set_data({**topic.to_dict(), **data, "guid": topic.guid})
+            db.session.commit()
+            return jsonify(topic.to_dict())
         return invalid_project()
     return invalid_user()
 
@@ -171,11 +291,11 @@ def update_topic(project_id, topic_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>", methods=["DELETE"])
 def delete_topic(project_id, topic_id):
     if validate_client(request) and request.method == "DELETE":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify("OK")
+        topic = find_topic(project_id, topic_id)
+        if topic:
+            db.session.delete(topic)
+            db.session.commit()
+            return jsonify("OK")
         return invalid_project()
     return invalid_user()
 
@@ -183,11 +303,8 @@ def delete_topic(project_id, topic_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/snippet", methods=["GET"])
 def get_snippet(project_id, topic_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return send_file(f"{my_absolute_dirpath}/success.txt", download_name="snippet.txt")
+        if find_topic(project_id, topic_id):
+            return send_file(f"{my_absolute_dirpath}/success.txt", download_name="snippet.txt")
         return invalid_project()
     return invalid_user()
 
@@ -196,11 +313,8 @@ def get_snippet(project_id, topic_id):
 def update_snippet(project_id, topic_id):
     if validate_client(request) and request.method == "PUT":
         data = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify("PUT Request Sucessfull")
+        if find_topic(project_id, topic_id):
+            return jsonify("PUT Request Sucessfull")
         return invalid_project()
     return invalid_user()
 
@@ -208,9 +322,8 @@ def update_snippet(project_id, topic_id):
 @bcf.route("/projects/<project_id>/files_information", methods=["GET"])
 def get_files_information(project_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                return jsonify(jdata["Files"])
+        if find_project(project_id):
+            return jsonify(jdata["Files"])
         return invalid_project()
     else:
         return invalid_user()
@@ -219,11 +332,8 @@ def get_files_information(project_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/files", methods=["GET"])
 def get_files(project_id, topic_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify("Get request for files successfull")
+        if find_topic(project_id, topic_id):
+            return jsonify("Get request for files successfull")
         return invalid_project()
     return invalid_user()
 
@@ -237,11 +347,8 @@ file_put = json.load(file_put)
 def update_files(project_id, topic_id):
     if validate_client(request) and request.method == "PUT":
         data = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify(data)
+        if find_topic(project_id, topic_id):
+            return jsonify(data)
         return invalid_project()
     return invalid_user()
 
@@ -249,11 +356,9 @@ def update_files(project_id, topic_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/comments", methods=["GET"])
 def get_comments(project_id, topic_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify(jdata["Comments"])
+        topic = find_topic(project_id, topic_id)
+        if topic:
+            return jsonify([c.to_dict() for c in topic.comments.order_by(Comment.id)])
         return invalid_project()
     return invalid_user()
 
@@ -267,28 +372,25 @@ comment_post = json.load(comment_post)
 def create_comments(project_id, topic_id):
     if validate_client(request) and request.method == "POST":
         data = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        response = jsonify(data)
-                        response.status_code = 201
-                        return response
+        topic = find_topic(project_id, topic_id)
+        if topic:
+            comment = Comment(topic=topic)
+            comment.set_data({**data, "guid": data.get("guid") or str(uuid.uuid4()), "topic_guid": topic.guid})
+            db.session.add(comment)
+            db.session.commit()
+            response = jsonify(comment.to_dict())
+            response.status_code = 201
+            return response
         return invalid_project()
     return invalid_user()
 
 
 @bcf.route("/projects/<project_id>/topics/<topic_id>/comments/<comment_id>", methods=["GET"])
 def get_comment(project_id, topic_id, comment_id):
-
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        for comment in jdata["Comments"]:
-                            if (comment["guid"]) == comment_id:
-                                return jsonify(comment)
+        comment = find_comment(project_id, topic_id, comment_id)
+        if comment:
+            return jsonify(comment.to_dict())
         return invalid_project()
     return invalid_user()
 
@@ -302,13 +404,11 @@ comment_put = json.load(comment_put)
 def update_comment(project_id, topic_id, comment_id):
     if validate_client(request) and request.method == "PUT":
         data = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        for comment in jdata["Comments"]:
-                            if (comment["guid"]) == comment_id:
-                                return jsonify(data)
+        comment = find_comment(project_id, topic_id, comment_id)
+        if comment:
+            comment.set_data({**comment.to_dict(), **data, "guid": comment.guid})
+            db.session.commit()
+            return jsonify(comment.to_dict())
         return invalid_project()
     return invalid_user()
 
@@ -316,13 +416,11 @@ def update_comment(project_id, topic_id, comment_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/comments/<comment_id>", methods=["DELETE"])
 def delete_comment(project_id, topic_id, comment_id):
     if validate_client(request) and request.method == "DELETE":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        for comment in jdata["Comments"]:
-                            if (comment["guid"]) == comment_id:
-                                return jsonify("OK")
+        comment = find_comment(project_id, topic_id, comment_id)
+        if comment:
+            db.session.delete(comment)
+            db.session.commit()
+            return jsonify("OK")
         return invalid_project()
     return invalid_user()
 
@@ -330,11 +428,9 @@ def delete_comment(project_id, topic_id, comment_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/viewpoints", methods=["GET"])
 def get_viewpoints(project_id, topic_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                for topic in jdata["Topics"]:
-                    if topic["guid"] == topic_id:
-                        return jsonify(jdata["Viewpoints"])
+        topic = find_topic(project_id, topic_id)
+        if topic:
+            return jsonify([v.to_dict() for v in topic.viewpoints.order_by(Viewpoint.id)])
         return invalid_project()
     return invalid_user()
 
@@ -347,14 +443,16 @@ viewpoint_post = json.load(viewpoint_post)
 @expects_json(viewpoint_post)
 def create_viewpoints(project_id, topic_id):
     if validate_client(request) and request.method == "POST":
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                for topic in jdata["Topics"]:
-                    if topic["guid"] == topic_id:
-                        data = request.get_json()
-                        response = jsonify(data)
-                        response.status_code = 201
-                        return response
+        topic = find_topic(project_id, topic_id)
+        if topic:
+            data = request.get_json()
+            viewpoint = Viewpoint(topic=topic)
+            viewpoint.set_data({**data, "guid": data.get("guid") or str(uuid.uuid4())})
+            db.session.add(viewpoint)
+            db.session.commit()
+            response = jsonify(viewpoint.to_dict())
+            response.status_code = 201
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -362,15 +460,11 @@ def create_viewpoints(project_id, topic_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/viewpoints/<viewpoint_id>", methods=["GET"])
 def get_viewpoint(project_id, topic_id, viewpoint_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                for topic in jdata["Topics"]:
-                    if topic["guid"] == topic_id:
-                        for viewpoint in jdata["Viewpoints"]:
-                            if viewpoint["guid"] == viewpoint_id:
-                                response = jsonify(viewpoint)
-                                response.status_code = 200
-                                return response
+        viewpoint = find_viewpoint(project_id, topic_id, viewpoint_id)
+        if viewpoint:
+            response = jsonify(viewpoint.to_dict())
+            response.status_code = 200
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -378,15 +472,14 @@ def get_viewpoint(project_id, topic_id, viewpoint_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/viewpoints/<viewpoint_id>", methods=["DELETE"])
 def delete_viewpoint(project_id, topic_id, viewpoint_id):
     if validate_client(request) and request.method == "DELETE":
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                for topic in jdata["Topics"]:
-                    if topic["guid"] == topic_id:
-                        for viewpoint in jdata["Viewpoints"]:
-                            if viewpoint["guid"] == viewpoint_id:
-                                response = jsonify(viewpoint)
-                                response.status_code = 200
-                                return response
+        viewpoint = find_viewpoint(project_id, topic_id, viewpoint_id)
+        if viewpoint:
+            data = viewpoint.to_dict()
+            db.session.delete(viewpoint)
+            db.session.commit()
+            response = jsonify(data)
+            response.status_code = 200
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -394,15 +487,11 @@ def delete_viewpoint(project_id, topic_id, viewpoint_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/viewpoints/<viewpoint_id>/snapshot", methods=["GET"])
 def get_snapshot(project_id, topic_id, viewpoint_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                for topic in jdata["Topics"]:
-                    if topic["guid"] == topic_id:
-                        for viewpoint in jdata["Viewpoints"]:
-                            if viewpoint["guid"] == viewpoint_id:
-                                response = jsonify(viewpoint["snapshot"])
-                                response.status_code = 200
-                                return response
+        viewpoint = find_viewpoint(project_id, topic_id, viewpoint_id)
+        if viewpoint:
+            response = jsonify(viewpoint.to_dict().get("snapshot"))
+            response.status_code = 200
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -410,17 +499,13 @@ def get_snapshot(project_id, topic_id, viewpoint_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/viewpoints/<viewpoint_id>/bitmaps/<bitmap_id>", methods=["GET"])
 def get_bitmap(project_id, topic_id, viewpoint_id, bitmap_id):
     if validate_client(request):
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                for topic in jdata["Topics"]:
-                    if topic["guid"] == topic_id:
-                        for viewpoint in jdata["Viewpoints"]:
-                            if viewpoint["guid"] == viewpoint_id:
-                                for bitmap in viewpoint["bitmaps"]:
-                                    if bitmap["guid"] == bitmap_id:
-                                        response = jsonify(bitmap)
-                                        response.status_code = 200
-                                        return response
+        viewpoint = find_viewpoint(project_id, topic_id, viewpoint_id)
+        if viewpoint:
+            for bitmap in viewpoint.to_dict().get("bitmaps") or []:
+                if bitmap["guid"] == bitmap_id:
+                    response = jsonify(bitmap)
+                    response.status_code = 200
+                    return response
         return invalid_project()
     return invalid_user()
 
@@ -428,15 +513,11 @@ def get_bitmap(project_id, topic_id, viewpoint_id, bitmap_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/viewpoints/<viewpoint_id>/selection", methods=["GET"])
 def get_selection(project_id, topic_id, viewpoint_id):
     if validate_client(request):
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                for topic in jdata["Topics"]:
-                    if topic["guid"] == topic_id:
-                        for viewpoint in jdata["Viewpoints"]:
-                            if viewpoint["guid"] == viewpoint_id:
-                                response = jsonify(viewpoint["selection"])
-                                response.status_code = 200
-                                return response
+        viewpoint = find_viewpoint(project_id, topic_id, viewpoint_id)
+        if viewpoint:
+            response = jsonify(viewpoint.to_dict().get("selection"))
+            response.status_code = 200
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -444,15 +525,11 @@ def get_selection(project_id, topic_id, viewpoint_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/viewpoints/<viewpoint_id>/coloring", methods=["GET"])
 def get_coloring(project_id, topic_id, viewpoint_id):
     if validate_client(request):
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                for topic in jdata["Topics"]:
-                    if topic["guid"] == topic_id:
-                        for viewpoint in jdata["Viewpoints"]:
-                            if viewpoint["guid"] == viewpoint_id:
-                                response = jsonify(viewpoint["coloring"])
-                                response.status_code = 200
-                                return response
+        viewpoint = find_viewpoint(project_id, topic_id, viewpoint_id)
+        if viewpoint:
+            response = jsonify(viewpoint.to_dict().get("coloring"))
+            response.status_code = 200
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -460,15 +537,11 @@ def get_coloring(project_id, topic_id, viewpoint_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/viewpoints/<viewpoint_id>/visibility", methods=["GET"])
 def get_visibility(project_id, topic_id, viewpoint_id):
     if validate_client(request):
-        for project in jdata["Projects"]:
-            if project["project_id"] == project_id:
-                for topic in jdata["Topics"]:
-                    if topic["guid"] == topic_id:
-                        for viewpoint in jdata["Viewpoints"]:
-                            if viewpoint["guid"] == viewpoint_id:
-                                response = jsonify(viewpoint["visibility"])
-                                response.status_code = 200
-                                return response
+        viewpoint = find_viewpoint(project_id, topic_id, viewpoint_id)
+        if viewpoint:
+            response = jsonify(viewpoint.to_dict().get("visibility"))
+            response.status_code = 200
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -476,11 +549,8 @@ def get_visibility(project_id, topic_id, viewpoint_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/related_topics", methods=["GET"])
 def get_related_topics(project_id, topic_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify(jdata["RelatedTopics"])
+        if find_topic(project_id, topic_id):
+            return jsonify(jdata["RelatedTopics"])
         return invalid_project()
     return invalid_user()
 
@@ -494,11 +564,8 @@ related_topics_put = json.load(related_topics_put)
 def update_related_topics(project_id, topic_id):
     if validate_client(request) and request.method == "PUT":
         data = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify(data)
+        if find_topic(project_id, topic_id):
+            return jsonify(data)
         return invalid_project()
     return invalid_user()
 
@@ -506,11 +573,8 @@ def update_related_topics(project_id, topic_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/document_references", methods=["GET"])
 def get_document_references(project_id, topic_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify(jdata["DocumentReferences"])
+        if find_topic(project_id, topic_id):
+            return jsonify(jdata["DocumentReferences"])
         return invalid_project()
     return invalid_user()
 
@@ -524,13 +588,10 @@ document_reference_post = json.load(document_reference_post)
 def create_document_references(project_id, topic_id):
     if validate_client(request) and request.method == "POST":
         data = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        response = jsonify(data)
-                        response.status_code = 201
-                        return response
+        if find_topic(project_id, topic_id):
+            response = jsonify(data)
+            response.status_code = 201
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -547,13 +608,10 @@ document_reference_put = json.load(document_reference_put)
 def update_document_references(project_id, topic_id, document_reference_id):
     if validate_client(request) and request.method == "PUT":
         data = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        for document in jdata["DocumentReferences"]:
-                            if (document["guid"]) == document_reference_id:
-                                return jsonify(data)
+        if find_topic(project_id, topic_id):
+            for document in jdata["DocumentReferences"]:
+                if (document["guid"]) == document_reference_id:
+                    return jsonify(data)
         return invalid_project()
     return invalid_user()
 
@@ -561,11 +619,8 @@ def update_document_references(project_id, topic_id, document_reference_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/documents", methods=["GET"])
 def get_documents(project_id, topic_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        return jsonify(jdata["Documents"])
+        if find_topic(project_id, topic_id):
+            return jsonify(jdata["Documents"])
         return invalid_project()
     return invalid_user()
 
@@ -574,13 +629,10 @@ def get_documents(project_id, topic_id):
 def create_documents(project_id, topic_id):
     if validate_client(request) and request.method == "POST":
         data = request.get_json()
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        response = jsonify(data)
-                        response.status_code = 201
-                        return response
+        if find_topic(project_id, topic_id):
+            response = jsonify(data)
+            response.status_code = 201
+            return response
         return invalid_project()
     return invalid_user()
 
@@ -588,13 +640,10 @@ def create_documents(project_id, topic_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/documents/<document_id>", methods=["GET"])
 def get_document(project_id, topic_id, document_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        for document in jdata["Documents"]:
-                            if (document["guid"]) == document_id:
-                                return send_file(f"{my_absolute_dirpath}/success.txt", download_name="document.txt")
+        if find_topic(project_id, topic_id):
+            for document in jdata["Documents"]:
+                if (document["guid"]) == document_id:
+                    return send_file(f"{my_absolute_dirpath}/success.txt", download_name="document.txt")
         return invalid_project()
     return invalid_user()
 
@@ -602,9 +651,8 @@ def get_document(project_id, topic_id, document_id):
 @bcf.route("/projects/<project_id>/topics/events", methods=["GET"])
 def get_events(project_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                return jsonify(jdata["Events"])
+        if find_project(project_id):
+            return jsonify(jdata["Events"])
         return invalid_project()
     return invalid_user()
 
@@ -612,13 +660,10 @@ def get_events(project_id):
 @bcf.route("/projects/<project_id>/topics/<topic_id>/events", methods=["GET"])
 def get_topic_events(project_id, topic_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        for event in jdata["Events"]:
-                            if (event["topic_guid"]) == topic_id:
-                                return jsonify(event)
+        if find_topic(project_id, topic_id):
+            for event in jdata["Events"]:
+                if (event["topic_guid"]) == topic_id:
+                    return jsonify(event)
         return invalid_project()
     return invalid_user()
 
@@ -626,9 +671,8 @@ def get_topic_events(project_id, topic_id):
 @bcf.route("/projects/<project_id>/topics/comments/events", methods=["GET"])
 def get_comments_events(project_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                return jsonify(jdata["EventComments"])
+        if find_project(project_id):
+            return jsonify(jdata["EventComments"])
         return invalid_project()
     return invalid_user()
 
@@ -639,12 +683,9 @@ def get_comments_events(project_id):
 )
 def get_comment_events(project_id, topic_id, comment_id):
     if validate_client(request) and request.method == "GET":
-        for project in jdata["Projects"]:
-            if (project["project_id"]) == project_id:
-                for topic in jdata["Topics"]:
-                    if (topic["guid"]) == topic_id:
-                        for comment in jdata["EventComments"]:
-                            if (comment["comment_guid"]) == comment_id:
-                                return jsonify(comment)
+        if find_topic(project_id, topic_id):
+            for comment in jdata["EventComments"]:
+                if (comment["comment_guid"]) == comment_id:
+                    return jsonify(comment)
         return invalid_project()
     return invalid_user()
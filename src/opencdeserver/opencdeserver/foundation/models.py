@@ -25,6 +25,7 @@ from authlib.integrations.sqla_oauth2 import (
     OAuth2TokenMixin,
 )
 from flask_login import UserMixin
+from sqlalchemy import event
 
 
 @login_manager.user_loader
@@ -86,3 +87,35 @@ class OAuth2Token(db.Model, OAuth2TokenMixin):
             return False
         expires_at = self.issued_at + self.expires_in * 2
         return expires_at >= time.time()
+
+
+# Access token to the time until which it is trusted without querying the database again
+token_cache = {}
+token_cache_ttl = 60
+token_cache_size = 10000
+
+
+def cache_token(access_token):
+    now = time.time()
+    if len(token_cache) >= token_cache_size:
+        for key, expires_at in list(token_cache.items()):
+            if expires_at <= now:
+                del token_cache[key]
+    if len(token_cache) < token_cache_size:
+        token_cache[access_token] = now + token_cache_ttl
+
+
+def is_token_cached(access_token):
+    return token_cache.get(access_token, 0) > time.time()
+
+
+def evict_tokens(access_tokens):
+    for access_token in access_tokens:
+        token_cache.pop(access_token, None)
+
+
+@event.listens_for(OAuth2Token, "after_update")
+@event.listens_for(OAuth2Token, "after_delete")
+def evict_changed_token(mapper, connection, target):
+    # Revoking or deleting a token must not leave it trusted until the cache expires
+    evict_tokens([target.access_token])
@@ -22,7 +22,7 @@ from flask import render_template, redirect, url_for, flash, request
 from werkzeug import datastructures
 from .forms import RegisterForm, LoginForm, OauthForm
 from flask_login import login_user, logout_user, login_required, current_user
-from .models import User, OAuth2Client, OAuth2AuthorizationCode, OAuth2Token
+from .models import User, OAuth2Client, OAuth2AuthorizationCode, OAuth2Token, evict_tokens
 import base64
 from werkzeug.security import gen_salt
 import time
@@ -139,6 +139,9 @@ def login_page():
 
 @foundation_obj.route("/logout")
 def logoutpage():
+    if current_user.is_authenticated:
+        tokens = OAuth2Token.query.filter_by(user_id=current_user.id)
+        evict_tokens([t.access_token for t in tokens])
     logout_user()
     flash("You have been logged out!", category="info")
     return redirect(url_for("foundation_obj.homepage"))
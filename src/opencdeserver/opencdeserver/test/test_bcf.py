@@ -0,0 +1,190 @@
+import pytest
+from run import app, db
+from foundation.models import User, OAuth2Token, token_cache
+from bcf.models import Project, Topic, Comment, Viewpoint, load_sample_data
+from bcf.routes import jdata
+
+app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, SQLALCHEMY_DATABASE_URI="sqlite://")
+HEADERS = {"Authorization": "Bearer token"}
+PROJECT = "F445F4F2-4D02-4B2A-B612-5E456BEF9137"
+OLD_TOPIC = "A245F4F2-2C01-B43B-B612-5E456BEF8116"
+MIDDLE_TOPIC = "A211FCC2-3A3B-EAA4-C321-DE22ABC8414"
+OPEN_TOPIC = "B345F4F2-3A04-B43B-A713-5E456BEF8228"
+TOPICS = f"/bcf/3.0/projects/{PROJECT}/topics"
+
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        load_sample_data(jdata)
+        user = User(username="user", email_address="user@example.com", password="password")
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(
+            OAuth2Token(client_id="client", user_id=user.id, access_token="token", token_type="Bearer", expires_in=3600)
+        )
+        db.session.commit()
+    yield app.test_client()
+    token_cache.clear()
+    with app.app_context():
+        db.drop_all()
+
+
+def get_topics(client, **args):
+    response = client.get(TOPICS, headers=HEADERS, query_string=args)
+    assert response.status_code == 200
+    return [t["guid"] for t in response.get_json()]
+
+
+class TestLoadSampleData:
+    def test_seeding_every_project_with_the_sample_topics(self, client):
+        with app.app_context():
+            assert Project.query.count() == len(jdata["Projects"])
+            assert Topic.query.count() == len(jdata["Projects"]) * len(jdata["Topics"])
+            topic = Topic.query.join(Project).filter(Project.project_id == PROJECT, Topic.guid == OPEN_TOPIC).first()
+            assert topic.topic_status == "open"
+            assert topic.to_dict()["topic_type"] == "Clash"
+            assert {c.guid for c in topic.comments} == {
+                c["guid"] for c in jdata["Comments"] if c["topic_guid"] == OPEN_TOPIC
+            }
+            assert {v.guid for v in topic.viewpoints} == {v["guid"] for v in jdata["Viewpoints"]}
+
+    def test_only_seeding_empty_tables(self, client):
+        with app.app_context():
+            topics, comments, viewpoints = Topic.query.count(), Comment.query.count(), Viewpoint.query.count()
+            load_sample_data(jdata)
+            assert (Topic.query.count(), Comment.query.count(), Viewpoint.query.count()) == (
+                topics,
+                comments,
+                viewpoints,
+            )
+
+
+class TestFilterTopics:
+    def test_getting_all_topics_without_query_options(self, client):
+        assert get_topics(client) == [OLD_TOPIC, MIDDLE_TOPIC, OPEN_TOPIC]
+
+    def test_filtering_by_equality(self, client):
+        assert get_topics(client, **{"$filter": "topic_status eq 'open'"}) == [OPEN_TOPIC]
+        assert get_topics(client, **{"$filter": "topic_status ne 'open'"}) == []
+        assert get_topics(client, **{"$filter": "topic_status eq null"}) == [OLD_TOPIC, MIDDLE_TOPIC]
+
+    def test_filtering_by_comparison(self, client):
+        assert get_topics(client, **{"$filter": "creation_date gt '2014-01-01'"}) == [MIDDLE_TOPIC, OPEN_TOPIC]
+        assert get_topics(client, **{"$filter": "creation_date le '2014-11-19T14:24:11.316Z'"}) == [
+            OLD_TOPIC,
+            MIDDLE_TOPIC,
+        ]
+
+    def test_filtering_by_a_conjunction(self, client):
+        expression = "creation_date gt '2014-01-01' and priority eq 'high'"
+        assert get_topics(client, **{"$filter": expression}) == [OPEN_TOPIC]
+
+    def test_filtering_by_integers_and_escaped_quotes(self, client):
+        body = {"title": "Quoted", "assigned_to": "O'Brien", "index": 5}
+        assert client.post(f"{TOPICS}/quoted", headers=HEADERS, json=body).status_code == 201
+        assert get_topics(client, **{"$filter": "assigned_to eq 'O''Brien'"}) == ["quoted"]
+        assert get_topics(client, **{"$filter": "index ge 5"}) == ["quoted"]
+
+    def test_ordering_topics(self, client):
+        assert get_topics(client, **{"$orderby": "creation_date desc"}) == [OPEN_TOPIC, MIDDLE_TOPIC, OLD_TOPIC]
+        assert get_topics(client, **{"$orderby": "creation_date asc"}) == [OLD_TOPIC, MIDDLE_TOPIC, OPEN_TOPIC]
+        assert get_topics(client, **{"$orderby": "topic_status desc,creation_date desc"}) == [
+            OPEN_TOPIC,
+            MIDDLE_TOPIC,
+            OLD_TOPIC,
+        ]
+
+    def test_paging_topics(self, client):
+        assert get_topics(client, **{"$orderby": "creation_date desc", "$top": "2"}) == [OPEN_TOPIC, MIDDLE_TOPIC]
+        assert get_topics(client, **{"$orderby": "creation_date desc", "$skip": "1", "$top": "1"}) == [MIDDLE_TOPIC]
+        assert get_topics(client, **{"$skip": "3"}) == []
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            {"$filter": "topic_status eq"},
+            {"$filter": "topic_status eq open"},
+            {"$filter": "title eq 'Foo'"},
+            {"$filter": "topic_status eq 'open' or priority eq 'high'"},
+            {"$orderby": "title"},
+            {"$orderby": "creation_date sideways"},
+            {"$skip": "one"},
+            {"$top": "1.5"},
+        ],
+    )
+    def test_rejecting_malformed_queries(self, client, args):
+        response = client.get(TOPICS, headers=HEADERS, query_string=args)
+        assert response.status_code == 400
+        assert response.get_json()["message"]
+
+
+class TestTopics:
+    def test_creating_reading_updating_and_deleting_a_topic(self, client):
+        url = f"{TOPICS}/new"
+        response = client.post(url, headers=HEADERS, json={"title": "New", "topic_status": "open"})
+        assert response.status_code == 201
+        assert response.get_json()["guid"] == "new"
+        assert client.post(url, headers=HEADERS, json={"title": "New"}).status_code == 409
+        assert client.get(url, headers=HEADERS).get_json()["title"] == "New"
+        assert get_topics(client, **{"$filter": "topic_status eq 'open'"}) == [OPEN_TOPIC, "new"]
+
+        response = client.put(url, headers=HEADERS, json={"title": "Renamed", "topic_status": "closed"})
+        assert response.status_code == 200
+        assert response.get_json()["guid"] == "new"
+        assert client.get(url, headers=HEADERS).get_json()["title"] == "Renamed"
+        assert get_topics(client, **{"$filter": "topic_status eq 'open'"}) == [OPEN_TOPIC]
+        assert get_topics(client, **{"$filter": "topic_status eq 'closed'"}) == ["new"]
+
+        assert client.delete(url, headers=HEADERS).status_code == 200
+        assert client.get(url, headers=HEADERS).status_code == 404
+        assert "new" not in get_topics(client)
+
+    def test_deleting_the_comments_and_viewpoints_of_a_deleted_topic(self, client):
+        with app.app_context():
+            comments, viewpoints = Comment.query.count(), Viewpoint.query.count()
+        assert client.delete(f"{TOPICS}/{OPEN_TOPIC}", headers=HEADERS).status_code == 200
+        with app.app_context():
+            assert Comment.query.count() == comments - 2
+            assert Viewpoint.query.count() == viewpoints - len({v["guid"] for v in jdata["Viewpoints"]})
+
+
+class TestComments:
+    def test_creating_reading_updating_and_deleting_a_comment(self, client):
+        url = f"{TOPICS}/{OLD_TOPIC}/comments"
+        response = client.post(url, headers=HEADERS, json={"comment": "Foo"})
+        assert response.status_code == 201
+        guid = response.get_json()["guid"]
+        assert response.get_json()["topic_guid"] == OLD_TOPIC
+        assert [c["guid"] for c in client.get(url, headers=HEADERS).get_json()] == [guid]
+        assert client.get(f"{url}/{guid}", headers=HEADERS).get_json()["comment"] == "Foo"
+
+        response = client.put(f"{url}/{guid}", headers=HEADERS, json={"comment": "Bar"})
+        assert response.status_code == 200
+        assert client.get(f"{url}/{guid}", headers=HEADERS).get_json()["comment"] == "Bar"
+
+        assert client.delete(f"{url}/{guid}", headers=HEADERS).status_code == 200
+        assert client.get(f"{url}/{guid}", headers=HEADERS).status_code == 404
+        assert client.get(url, headers=HEADERS).get_json() == []
+
+    def test_only_finding_comments_of_the_topic(self, client):
+        comment = next(c for c in jdata["Comments"] if c["topic_guid"] == OPEN_TOPIC)
+        assert client.get(f"{TOPICS}/{OPEN_TOPIC}/comments/{comment['guid']}", headers=HEADERS).status_code == 200
+        assert client.get(f"{TOPICS}/{OLD_TOPIC}/comments/{comment['guid']}", headers=HEADERS).status_code == 404
+
+
+class TestViewpoints:
+    def test_creating_reading_and_deleting_a_viewpoint(self, client):
+        url = f"{TOPICS}/{OLD_TOPIC}/viewpoints"
+        existing = [v["guid"] for v in client.get(url, headers=HEADERS).get_json()]
+        response = client.post(url, headers=HEADERS, json={"guid": "viewpoint", "index": 1})
+        assert response.status_code == 201
+        assert [v["guid"] for v in client.get(url, headers=HEADERS).get_json()] == existing + ["viewpoint"]
+        assert client.get(f"{url}/viewpoint", headers=HEADERS).get_json()["index"] == 1
+
+        response = client.delete(f"{url}/viewpoint", headers=HEADERS)
+        assert response.status_code == 200
+        assert response.get_json()["guid"] == "viewpoint"
+        assert client.get(f"{url}/viewpoint", headers=HEADERS).status_code == 404
+        assert [v["guid"] for v in client.get(url, headers=HEADERS).get_json()] == existing
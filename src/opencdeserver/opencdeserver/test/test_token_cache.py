@@ -0,0 +1,58 @@
+import pytest
+from run import app, db
+from foundation.models import User, OAuth2Token, token_cache
+
+app.config.update(TESTING=True, WTF_CSRF_ENABLED=False, SQLALCHEMY_DATABASE_URI="sqlite://")
+HEADERS = {"Authorization": "Bearer token"}
+
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        user = User(username="user", email_address="user@example.com", password="password")
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(
+            OAuth2Token(client_id="client", user_id=user.id, access_token="token", token_type="Bearer", expires_in=3600)
+        )
+        db.session.commit()
+    yield app.test_client()
+    token_cache.clear()
+    with app.app_context():
+        db.drop_all()
+
+
+def get_token():
+    return OAuth2Token.query.filter_by(access_token="token").first()
+
+
+class TestTokenCache:
+    def test_trusting_a_validated_token(self, client):
+        assert client.get("/bcf/3.0/projects", headers=HEADERS).status_code == 200
+        assert "token" in token_cache
+        assert client.get("/bcf/3.0/projects", headers={"Authorization": "Bearer other"}).status_code == 401
+        assert "other" not in token_cache
+
+    def test_rejecting_a_revoked_token(self, client):
+        assert client.get("/bcf/3.0/projects", headers=HEADERS).status_code == 200
+        with app.app_context():
+            get_token().revoked = True
+            db.session.commit()
+        assert "token" not in token_cache
+        assert client.get("/bcf/3.0/projects", headers=HEADERS).status_code == 401
+
+    def test_rejecting_a_deleted_token(self, client):
+        assert client.get("/bcf/3.0/projects", headers=HEADERS).status_code == 200
+        with app.app_context():
+            db.session.delete(get_token())
+            db.session.commit()
+        assert "token" not in token_cache
+        assert client.get("/bcf/3.0/projects", headers=HEADERS).status_code == 401
+
+    def test_evicting_the_tokens_of_a_user_on_logout(self, client):
+        client.post("/login", data={"username": "user", "password": "password"})
+        assert client.get("/bcf/3.0/projects", headers=HEADERS).status_code == 200
+        assert "token" in token_cache
+        client.get("/logout")
+        assert "token" not in token_cache